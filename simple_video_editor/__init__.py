@@ -0,0 +1,69 @@
+"""A small, NumPy-based video editing toolkit built on PyAV."""
+
+from ._version import __version__
+from .audio import AudioMixer
+from .cache import DEFAULT_CACHE_BYTES, CacheStats, FrameCache
+from .decoder import DEFAULT_BUFFER_SIZE, Frame, FrameDecoder, FrameRing, iter_frames
+from .effects import Brightness, Contrast, Crop, Effect, FadeIn, FadeOut, Gamma, Region
+from .errors import MediaError, VideoEditorError
+from .export import ExportSettings, export
+from .framestore import SharedFrameStore, render_parallel
+from .graph import TimelineGraph
+from .keyframes import KeyframeIndex
+from .lut import LUT3D, ColorLUT, LUTError
+from .media import VideoInfo, probe_video
+from .peaks import PeakSummary
+from .project import Project, ProjectError
+from .proxy import ProxyManager, ProxySettings
+from .render_cache import RenderCache
+from .scenes import SceneScores, detect_scenes
+from .source import VideoSource
+from .thumbnails import ThumbnailCache
+from .timeline import Clip, Envelope, Timeline, Transition
+
+__all__ = [
+    "AudioMixer",
+    "Brightness",
+    "CacheStats",
+    "Clip",
+    "ColorLUT",
+    "Contrast",
+    "Crop",
+    "DEFAULT_BUFFER_SIZE",
+    "DEFAULT_CACHE_BYTES",
+    "Effect",
+    "Envelope",
+    "ExportSettings",
+    "FadeIn",
+    "FadeOut",
+    "Frame",
+    "FrameCache",
+    "FrameDecoder",
+    "FrameRing",
+    "Gamma",
+    "KeyframeIndex",
+    "LUT3D",
+    "LUTError",
+    "MediaError",
+    "PeakSummary",
+    "Project",
+    "ProjectError",
+    "ProxyManager",
+    "ProxySettings",
+    "Region",
+    "RenderCache",
+    "SceneScores",
+    "SharedFrameStore",
+    "ThumbnailCache",
+    "Timeline",
+    "TimelineGraph",
+    "Transition",
+    "VideoEditorError",
+    "VideoInfo",
+    "VideoSource",
+    "detect_scenes",
+    "export",
+    "iter_frames",
+    "probe_video",
+    "render_parallel",
+]
@@ -0,0 +1,197 @@
+"""Throughput benchmarks for decoding, seeking, effects and export.
+
+Run ``python -m simple_video_editor.bench --output results.json`` to generate
+synthetic clips in a temporary directory, time each stage and write the
+results as JSON.  ``--compare old.json`` prints the relative change of every
+metric against an earlier run, so two versions can be compared on the same
+machine.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from fractions import Fraction
+
+import av
+import numpy as np
+
+from . import effects
+from ._version import __version__
+from .decoder import iter_frames
+from .export import export
+from .keyframes import KeyframeIndex
+from .source import VideoSource
+from .timeline import Timeline
+
+# Metrics where a smaller value is better; all others are rates.
+_LOWER_IS_BETTER = ("_ms", "_s")
+
+
+def make_test_clip(
+    path: str,
+    *,
+    width: int = 1280,
+    height: int = 720,
+    frames: int = 240,
+    fps: int = 24,
+    gop_size: int = 48,
+    codec: str = "libx264",
+) -> str:
+    """Encode a synthetic clip of moving gradients and noise to ``path``."""
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 24, size=(height, width), dtype=np.uint8)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    with av.open(path, "w") as output:
+        stream = output.add_stream(codec, rate=fps)
+        stream.width, stream.height, stream.pix_fmt = width, height, "yuv420p"
+        stream.codec_context.gop_size = gop_size
+        for i in range(frames):
+            image[..., 0] = (x + 4 * i) % 256
+            image[..., 1] = (y + 2 * i) % 256
+            image[..., 2] = ((x + y) / 2 + i) % 256
+            image[..., 2] ^= noise
+            frame = av.VideoFrame.from_ndarray(image, format="rgb24")
+            frame.pts = i
+            output.mux(stream.encode(frame))
+        output.mux(stream.encode())
+    return path
+
+
+def bench_decode(path: str, buffer_size: int = 4) -> dict:
+    start = time.perf_counter()
+    count = sum(1 for _ in iter_frames(path, buffer_size=buffer_size))
+    elapsed = time.perf_counter() - start
+    return {"frames": count, "decode_fps": count / elapsed}
+
+
+def bench_seek(path: str, seeks: int = 50, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    latencies = []
+    with VideoSource(path) as source:
+        targets = [rng.randrange(len(source)) for _ in range(seeks)]
+        for target in targets:
+            start = time.perf_counter()
+            source.frame(target)
+            latencies.append((time.perf_counter() - start) * 1000)
+            source.close()  # Every seek starts cold, without a positioned decoder.
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {"seeks": seeks, "seek_p50_ms": p50, "seek_p90_ms": p90, "seek_p99_ms": p99}
+
+
+def bench_effects(width: int, height: int, batch: int = 8, repeat: int = 5) -> dict:
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 256, size=(batch, height, width, 3), dtype=np.uint8)
+    other = rng.integers(0, 256, size=frames.shape, dtype=np.uint8)
+    out = np.empty_like(frames)
+    weights = np.linspace(0.0, 1.0, batch)
+    positions = np.arange(batch)
+    grade = [effects.Brightness(0.1), effects.Contrast(1.2), effects.Gamma(1.8), effects.FadeIn(batch)]
+    megapixels = batch * width * height / 1e6
+    cases = {
+        "brightness": lambda: effects.brightness(frames, 0.1, out),
+        "contrast": lambda: effects.contrast(frames, 1.2, out),
+        "gamma": lambda: effects.gamma(frames, 1.8, out),
+        "fade": lambda: effects.fade(frames, weights, out),
+        "cross_dissolve": lambda: effects.cross_dissolve(frames, other, weights, out),
+        "grade_chain": lambda: effects.apply_chain(grade, out, positions, batch),
+    }
+    results = {}
+    for name, run in cases.items():
+        run()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            run()
+        elapsed = (time.perf_counter() - start) / repeat
+        results[f"{name}_mpx_per_s"] = megapixels / elapsed
+    return results
+
+
+def bench_export(clip: str, width: int, height: int, fps: int, workers: int, tmp: str) -> dict:
+    frames = len(KeyframeIndex.for_source(clip))
+    half = frames // 2
+    timeline = Timeline(width, height, Fraction(fps))
+    timeline.append(clip, 1, half, effects=[effects.Gamma(1.2)])
+    timeline.append(clip, half, frames, effects=[effects.FadeOut(12)])
+    results = {}
+    for n in sorted({1, workers}):
+        start = time.perf_counter()
+        export(timeline, os.path.join(tmp, f"export-{n}.mp4"), workers=n, stream_copy=False)
+        results[f"export_workers{n}_s"] = time.perf_counter() - start
+    results["export_frames"] = timeline.duration
+    return results
+
+
+def run(
+    *, width: int = 1280, height: int = 720, seconds: float = 10.0, fps: int = 24, workers: int | None = None
+) -> dict:
+    """Run every benchmark and return the results as a JSON-serialisable dict."""
+    workers = workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory(prefix="sve-bench-") as tmp:
+        clip = make_test_clip(
+            os.path.join(tmp, "clip.mp4"), width=width, height=height, frames=int(seconds * fps), fps=fps
+        )
+        results: dict = {}
+        results.update(bench_decode(clip))
+        results.update(bench_seek(clip))
+        results.update(bench_effects(width, height))
+        results.update(bench_export(clip, width, height, fps, workers, tmp))
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "av": av.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "config": {"width": width, "height": height, "seconds": seconds, "fps": fps, "workers": workers},
+        "results": results,
+    }
+
+
+def compare(old: dict, new: dict) -> dict[str, float]:
+    """Relative change of each shared metric, signed so that positive means faster."""
+    changes = {}
+    for name, value in new["results"].items():
+        before = old["results"].get(name)
+        if not before or not isinstance(value, float):
+            continue
+        ratio = before / value if name.endswith(_LOWER_IS_BETTER) else value / before
+        changes[name] = ratio - 1.0
+    return changes
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m simple_video_editor.bench", description=__doc__.split("\n")[0])
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(width=args.width, height=args.height, seconds=args.seconds, fps=args.fps, workers=args.workers)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as fh:
+            old = json.load(fh)
+        for name, change in compare(old, report).items():
+            print(f"{name:32} {change:+.1%}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""An in-memory LRU cache of decoded frames bounded by total size in bytes."""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable
+
+import numpy as np
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+FrameKey = tuple[Hashable, int]
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """A snapshot of a :class:`FrameCache`'s counters."""
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    nbytes: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class FrameCache:
+    """Least-recently-used cache of decoded frames keyed by ``(source, frame index)``.
+
+    Entries are evicted oldest-first whenever the summed ``nbytes`` of the
+    cached arrays would exceed ``max_bytes``, so frames of different sizes are
+    accounted for correctly.  Cached arrays are stored read-only; callers that
+    want to modify a frame must copy it.  All methods are thread-safe.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        if max_bytes < 0:
+            raise ValueError("max_bytes must not be negative")
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[FrameKey, np.ndarray] = OrderedDict()
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(source: Hashable, index: int) -> FrameKey:
+        if isinstance(source, os.PathLike):
+            source = os.fspath(source)
+        return (source, int(index))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: FrameKey) -> bool:
+        return self.key(*key) in self._entries
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the cached frames in bytes."""
+        return self._nbytes
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                nbytes=self._nbytes,
+                max_bytes=self.max_bytes,
+            )
+
+    def get(self, source: Hashable, index: int) -> np.ndarray | None:
+        """Return the cached frame, or ``None`` on a miss.  Updates the hit/miss counters."""
+        key = self.key(source, index)
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return image
+
+    def put(self, source: Hashable, index: int, image: np.ndarray, *, copy: bool = True) -> np.ndarray:
+        """Cache ``image`` and return the stored array.
+
+        With ``copy=False`` the caller hands ownership of ``image`` to the cache;
+        it must not be written to afterwards.  Frames larger than the whole
+        budget are returned without being cached.
+        """
+        stored = np.array(image, copy=True) if copy else image
+        stored.flags.writeable = False
+        key = self.key(source, index)
+        with self._lock:
+            if stored.nbytes > self.max_bytes:
+                return stored
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._nbytes -= previous.nbytes
+            self._entries[key] = stored
+            self._nbytes += stored.nbytes
+            self._evict()
+        return stored
+
+    def get_or_load(self, source: Hashable, index: int, load: Callable[[], np.ndarray]) -> np.ndarray:
+        """Return the cached frame, calling ``load()`` and caching its result on a miss."""
+        image = self.get(source, index)
+        if image is None:
+            image = self.put(source, index, load())
+        return image
+
+    def invalidate(self, source: Hashable, start: int | None = None, stop: int | None = None) -> int:
+        """Drop cached frames of ``source`` (only those in ``[start, stop)`` if given); returns the count."""
+        source = self.key(source, 0)[0]
+        lo = -1 if start is None else start
+        hi = float("inf") if stop is None else stop
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == source and lo <= key[1] < hi]
+            for key in stale:
+                self._nbytes -= self._entries.pop(key).nbytes
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def _evict(self) -> None:
+        while self._nbytes > self.max_bytes:
+            _, image = self._entries.popitem(last=False)
+            self._nbytes -= image.nbytes
+            self._evictions += 1
@@ -0,0 +1,149 @@
+"""Stacking the clips that cover a frame into one picture.
+
+Clips on higher tracks are drawn over lower ones.  A clip fills the frame
+unless it has a ``box`` (``x, y, width, height`` in fractions of the frame),
+and hides what is below it unless its ``opacity`` is below 1 or a transition
+is fading it in.
+
+Before anything is decoded, :func:`stack` culls the layers nobody would see:
+every opaque layer records the region it covers, and a layer lying inside the
+region of an opaque layer above it is dropped.  A full-frame opaque clip
+therefore hides everything below it, and a template of many full-frame
+layers costs as much as the one or two that show.  Coverage is tracked one
+rectangle per layer, so a layer hidden only by several smaller ones together
+is still drawn; that is wasted work, never a wrong picture.
+
+Layers are blended with premultiplied alpha.  :func:`draw` first scales a
+layer's frames towards black by its alpha, which for ``yuv420p`` means luma
+towards black level and chroma towards neutral, just as
+:func:`~simple_video_editor.effects.fade` and
+:func:`~simple_video_editor.effects.fade_planar` do; :func:`over` then adds
+what is below, weighted by ``1 - alpha``.  Both touch only the layer's box.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import numpy as np
+
+from .effects import _CHUNK, Region, _output, fade, fade_planar
+from .timeline import Clip, Transition
+from .yuv import BLACK_LUMA, NEUTRAL_CHROMA, RGB24, YUV420P, planes
+
+
+class Layer(NamedTuple):
+    """A clip as the compositor draws it: the pixels it covers, and whether it hides what is below them."""
+
+    clip: Clip
+    region: Region
+    opaque: bool
+
+
+def place(clip: Clip, width: int, height: int, pixel_format: str = RGB24) -> Region:
+    """The pixels of a ``width`` x ``height`` frame that ``clip`` covers.
+
+    Edges are rounded to whole pixels, and to even ones for ``yuv420p`` so
+    that boxes line up with the chroma planes.  The region may be empty.
+    """
+    if clip.box is None:
+        return Region.full(width, height)
+    x, y, w, h = clip.box
+    step = 2 if pixel_format == YUV420P else 1
+
+    def edge(fraction: float, size: int) -> int:
+        return min(size, step * round(fraction * size / step))
+
+    return Region(edge(x, width), edge(y, height), edge(x + w, width), edge(y + h, height))
+
+
+def stack(
+    clips: list[Clip], width: int, height: int, pixel_format: str = RGB24, fading: Clip | None = None
+) -> list[Layer]:
+    """The layers of ``clips`` (bottom track first) that show, bottom first.
+
+    ``fading`` is a clip being faded in by a transition, which hides nothing
+    while it does.
+    """
+    full = Region.full(width, height)
+    layers: list[Layer] = []
+    cover: list[Region] = []
+    for clip in reversed(clips):
+        region = place(clip, width, height, pixel_format)
+        if region.width <= 0 or region.height <= 0 or any(c.contains(region) for c in cover):
+            continue
+        opaque = clip.opacity >= 1 and clip is not fading
+        layers.append(Layer(clip, region, opaque))
+        if opaque:
+            if region == full:
+                break
+            cover.append(region)
+    layers.reverse()
+    return layers
+
+
+def alpha(layer: Layer, frames: np.ndarray, transition: Transition | None = None) -> np.ndarray:
+    """Per-frame alpha of ``layer`` at timeline ``frames``, with ``transition`` fading it in if given."""
+    weights = np.full(len(frames), layer.clip.opacity, dtype=np.float32)
+    if transition is not None:
+        weights *= transition.weights(frames)
+    return weights
+
+
+def over(
+    dst: np.ndarray, src: np.ndarray, alpha: np.ndarray | float, out: np.ndarray | None = None, black: int = 0
+) -> np.ndarray:
+    """Composite premultiplied ``src`` over ``dst``: frame ``n`` is ``src + (dst - black) * (1 - alpha[n])``.
+
+    Args:
+        dst: The batch underneath; may be a view, such as a box of a frame.
+        src: The batch on top, premultiplied about ``black``.
+        alpha: Opacity of ``src``, per frame.
+        out: Optional output, ``out=dst`` working in place.
+        black: The value of no light: 0 for RGB, the black level for luma
+            and neutral for chroma.
+    """
+    if dst.shape != src.shape or dst.dtype != src.dtype:
+        raise ValueError("over needs two batches of the same shape and dtype")
+    out = _output(dst, out)
+    keep = 1.0 - np.broadcast_to(np.asarray(alpha, dtype=np.float32), (len(dst),))
+    if dst.dtype == np.float32:
+        np.subtract(dst, np.float32(black), out=out)
+        np.multiply(out, keep.reshape(-1, *([1] * (dst.ndim - 1))), out=out)
+        return np.add(out, src, out=out)
+    # uint8: blend a few rows at a time through float32, so boxes of a frame need no copies.
+    rows = max(1, _CHUNK // max(1, dst[0, 0].size))
+    for n, weight in enumerate(keep):
+        for r in range(0, dst.shape[1], rows):
+            s = dst[n, r : r + rows].astype(np.float32)
+            s -= black
+            s *= weight
+            s += src[n, r : r + rows]
+            np.clip(np.rint(s, out=s), 0.0, 255.0, out=s)
+            out[n, r : r + rows] = s
+    return out
+
+
+def draw(
+    canvas: np.ndarray, frames: np.ndarray, region: Region, alpha: np.ndarray, pixel_format: str = RGB24
+) -> np.ndarray:
+    """Composite a layer's ``frames``, covering ``region`` of ``canvas``, onto ``canvas`` in place.
+
+    ``frames`` are premultiplied in place.  Layers with an alpha of 1 are
+    copied in without blending.
+    """
+    if pixel_format == YUV420P:
+        # Regions are even, so they halve exactly onto the chroma planes.
+        pairs = zip(planes(canvas), planes(frames), (BLACK_LUMA, NEUTRAL_CHROMA, NEUTRAL_CHROMA), (1, 2, 2))
+    else:
+        pairs = [(canvas, frames, 0, 1)]
+    opaque = bool(np.all(alpha >= 1))
+    if not opaque:
+        (fade_planar if pixel_format == YUV420P else fade)(frames, alpha, out=frames)
+    for dst, src, black, scale in pairs:
+        box = dst[:, region.top // scale : region.bottom // scale, region.left // scale : region.right // scale]
+        if opaque:
+            box[...] = src
+        else:
+            over(box, src, alpha, out=box, black=black)
+    return canvas
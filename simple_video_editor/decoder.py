@@ -0,0 +1,279 @@
+"""Streaming frame decoding over a bounded ring of preallocated buffers.
+
+A :class:`FrameDecoder` runs the demuxer and codec on a background thread that
+reads ahead into a fixed number of frame slots.  The consumer iterates over
+:class:`Frame` objects whose ``image`` is a view into one of those slots, so the
+memory held by a decoder is ``buffer_size`` frames no matter how long the clip
+is.  A slot is handed back to the reader as soon as the consumer asks for the
+next frame; callers that need to keep a frame around must copy it.
+
+Decoding can start at any frame: the reader seeks to the nearest preceding
+keyframe through the source's :class:`~simple_video_editor.keyframes.KeyframeIndex`
+and discards the few frames before the requested one.
+
+Frames can also be scaled on the way out: libswscale converts and resizes in
+the same pass, so no full-size frame is ever copied out of the codec.  Each
+decoder keeps one scaler context, whose filter tables are built for the first
+frame and reused for every later one.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from typing import Iterator, NamedTuple
+
+import av
+import numpy as np
+from av.video.reformatter import VideoReformatter
+
+from .errors import MediaError
+from .keyframes import KeyframeIndex
+from .media import VideoInfo, open_container, probe_video, video_stream
+from .scale import SWSCALE_FILTERS
+from .yuv import RGB24, frame_shape
+
+DEFAULT_BUFFER_SIZE = 4
+
+_END = object()
+
+
+class Frame(NamedTuple):
+    """One decoded frame.
+
+    ``image`` is an ``(height, width, 3)`` ``uint8`` array, or a packed
+    ``(height * 3 // 2, width)`` one when decoding to ``yuv420p``.  When the
+    frame comes from a :class:`FrameDecoder` it is only valid until the next
+    frame is requested.
+    """
+
+    index: int
+    time: float
+    image: np.ndarray
+
+
+class FrameRing:
+    """A fixed set of preallocated frame slots shared by one producer and one consumer.
+
+    The producer claims a free slot with :meth:`acquire`, fills it and publishes
+    it with :meth:`publish`; the consumer receives published slots from
+    :meth:`receive` and returns them with :meth:`release`.
+    """
+
+    def __init__(self, depth: int, shape: tuple[int, ...], dtype: np.dtype = np.uint8):
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self.depth = depth
+        self.slots = np.empty((depth, *shape), dtype=dtype)
+        self._free: queue.SimpleQueue[int | None] = queue.SimpleQueue()
+        self._ready: queue.SimpleQueue[tuple] = queue.SimpleQueue()
+        for slot in range(depth):
+            self._free.put(slot)
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the preallocated slots in bytes."""
+        return self.slots.nbytes
+
+    def acquire(self) -> int | None:
+        """Block until a slot is free and return it, or ``None`` once the ring is closed."""
+        return self._free.get()
+
+    def publish(self, slot: int, index: int, time: float) -> None:
+        self._ready.put((slot, index, time))
+
+    def finish(self, error: BaseException | None = None) -> None:
+        """Tell the consumer that no more slots will be published."""
+        self._ready.put((_END, error))
+
+    def receive(self) -> tuple:
+        return self._ready.get()
+
+    def release(self, slot: int) -> None:
+        self._free.put(slot)
+
+    def close(self) -> None:
+        """Wake a producer blocked in :meth:`acquire` so it can exit."""
+        self._free.put(None)
+
+
+class FrameDecoder:
+    """Iterate over the frames of a video file with bounded read-ahead.
+
+    Args:
+        path: Media file to decode.
+        buffer_size: Number of decoded frames the reader may run ahead of the
+            consumer.  Memory use is ``buffer_size`` times the size of one
+            decoded frame plus whatever the codec keeps internally.
+        thread_type: Codec threading mode passed to PyAV (``"AUTO"``,
+            ``"FRAME"``, ``"SLICE"`` or ``"NONE"``).
+        start: Index of the first frame to yield.
+        stop: Index one past the last frame to yield, or ``None`` for the end
+            of the clip.
+        index: Keyframe index used to seek to ``start``; loaded (or built) from
+            the source's sidecar when needed and not given.
+        pixel_format: ``"rgb24"``, or ``"yuv420p"`` to skip the colour
+            conversion for the many sources already stored that way (see
+            :mod:`simple_video_editor.yuv`).
+        size: ``(width, height)`` to scale frames to; the source size by
+            default.
+        filter: Scaling filter, one of
+            :data:`~simple_video_editor.scale.FILTERS`.
+
+    The decoder can be iterated once; use it as a context manager (or call
+    :meth:`close`) to stop the reader thread early.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        *,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        thread_type: str = "AUTO",
+        start: int = 0,
+        stop: int | None = None,
+        index: KeyframeIndex | None = None,
+        pixel_format: str = RGB24,
+        size: tuple[int, int] | None = None,
+        filter: str = "bilinear",
+    ):
+        if start < 0:
+            raise ValueError("start must not be negative")
+        if filter not in SWSCALE_FILTERS:
+            raise ValueError(f"unknown filter {filter!r}; expected one of {tuple(SWSCALE_FILTERS)}")
+        self.path = os.fspath(path)
+        self.info: VideoInfo = probe_video(self.path)
+        self.pixel_format = pixel_format
+        self.size = size or (self.info.width, self.info.height)
+        self.filter = filter
+        self.ring = FrameRing(buffer_size, frame_shape(*self.size, pixel_format))
+        self.thread_type = thread_type
+        self.start = start
+        self.stop = stop
+        self.index = index
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> FrameDecoder:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[Frame]:
+        if self._thread is not None:
+            raise RuntimeError("a FrameDecoder can only be iterated once")
+        self._thread = threading.Thread(target=self._read, name=f"decode:{self.path}", daemon=True)
+        self._thread.start()
+        held: int | None = None
+        try:
+            while True:
+                # Hand the previous slot back first: with one slot the reader needs it to publish the next frame.
+                if held is not None:
+                    self.ring.release(held)
+                    held = None
+                item = self.ring.receive()
+                if item[0] is _END:
+                    error = item[1]
+                    if isinstance(error, (MediaError, av.FFmpegError)):
+                        raise MediaError(f"failed to decode {self.path!r}: {error}") from error
+                    if error is not None:
+                        raise error
+                    return
+                held, index, time = item
+                yield Frame(index, time, self.ring.slots[held])
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Stop the reader thread and wait for it to exit."""
+        self._stop.set()
+        self.ring.close()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _read(self) -> None:
+        error: BaseException | None = None
+        try:
+            with open_container(self.path) as container:
+                stream = video_stream(container)
+                stream.thread_type = self.thread_type
+                if self.start and self.index is None:
+                    self.index = KeyframeIndex.for_source(self.path)
+                scaler = VideoReformatter()
+                width, height = self.size
+                interpolation = SWSCALE_FILTERS[self.filter]
+                for index, frame in decode_from(container, stream, self.start, self.index):
+                    if self.stop is not None and index >= self.stop:
+                        return
+                    slot = self.ring.acquire()
+                    if slot is None or self._stop.is_set():
+                        return
+                    scaled = scaler.reformat(frame, width, height, self.pixel_format, interpolation=interpolation)
+                    _copy_frame(scaled, self.ring.slots[slot])
+                    self.ring.publish(slot, index, float(frame.time or 0.0))
+        except BaseException as exc:
+            # Anything that stops the reader early must reach the consumer, or it would look like the end of the clip.
+            error = exc
+        finally:
+            self.ring.finish(error)
+
+
+def _copy_frame(frame: av.VideoFrame, out: np.ndarray) -> None:
+    """Copy the planes of an ``rgb24`` or ``yuv420p`` ``frame`` one after another into ``out``, without row padding."""
+    flat = out.reshape(-1)
+    offset = 0
+    for plane in frame.planes:
+        width = plane.width * 3 if frame.format.name == RGB24 else plane.width
+        rows = np.frombuffer(plane, dtype=np.uint8, count=plane.line_size * plane.height)
+        size = width * plane.height
+        np.copyto(flat[offset : offset + size].reshape(plane.height, width), rows.reshape(plane.height, -1)[:, :width])
+        offset += size
+
+
+def decode_from(
+    container: av.container.InputContainer,
+    stream: av.video.stream.VideoStream,
+    start: int = 0,
+    index: KeyframeIndex | None = None,
+) -> Iterator[tuple[int, av.VideoFrame]]:
+    """Decode ``stream`` from frame ``start`` on, yielding ``(frame index, frame)`` pairs.
+
+    When ``index`` is given the container is first seeked to the keyframe
+    preceding ``start``, and frames before ``start`` are decoded but not
+    yielded; without an index decoding starts wherever the container is.
+    """
+    position = 0
+    if start and index is None:
+        raise ValueError("seeking requires a KeyframeIndex")
+    if index is not None:
+        if start >= len(index):
+            return
+        position = index.keyframe_before(start)
+        container.seek(int(index.pts[position]), stream=stream, backward=True, any_frame=False)
+    for frame in container.decode(stream):
+        if index is not None and frame.pts is not None:
+            position = index.frame_of_pts(frame.pts)
+        if position >= start:
+            yield position, frame
+        position += 1
+
+
+def iter_frames(
+    path: str | os.PathLike,
+    *,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    thread_type: str = "AUTO",
+    start: int = 0,
+    stop: int | None = None,
+) -> Iterator[Frame]:
+    """Yield the frames ``start`` to ``stop`` of ``path`` in presentation order.
+
+    A convenience wrapper around :class:`FrameDecoder`; see there for the
+    meaning of the arguments and the lifetime of the yielded images.
+    """
+    with FrameDecoder(
+        path, buffer_size=buffer_size, thread_type=thread_type, start=start, stop=stop
+    ) as decoder:
+        yield from decoder
@@ -0,0 +1,560 @@
+"""Vectorised per-pixel effects over batches of frames.
+
+Every function takes a batch shaped ``(N, H, W, C)`` (a single ``(H, W, C)``
+frame also works where no per-frame weights are involved) of either
+``uint8`` or ``float32`` values in ``[0, 1]``, and an optional ``out`` array of
+the same shape and dtype.  Passing ``out=frames`` applies the effect in place;
+passing a preallocated buffer keeps hot loops free of frame-sized
+allocations.  Without ``out`` a new array is returned.
+
+``uint8`` batches go through 256-entry lookup tables, applied in chunks so the
+index temporaries NumPy needs stay small.  ``float32`` batches use in-place
+ufuncs and are clipped to ``[0, 1]``.
+
+The :class:`Effect` subclasses wrap these functions with their parameters so
+they can be attached to clips and applied by the renderer.
+
+Effects also take part in region-of-interest rendering: given the
+:class:`Region` of its output that is wanted, an effect reports through
+:meth:`Effect.input_region` the region of its input it needs, and
+:meth:`Effect.apply_region` computes just that output from just that input.
+Pointwise effects need exactly the region they produce; effects that do not
+say otherwise need the whole frame.  :func:`chain_region` runs the question
+back through a chain of effects, so a zoomed preview or a crop only decodes
+into, and filters, the pixels that end up on screen.
+
+Effects list the pixel formats they accept in ``formats``: ``rgb24`` batches
+as above, and for fades and crops also planar ``yuv420p`` batches shaped
+``(N, H * 3 // 2, W)`` (see :mod:`simple_video_editor.yuv`).
+:func:`apply_chain` runs a ``yuv420p`` batch through a chain in YUV as far as
+the effects allow, converting to ``rgb24`` and back only once if one of them
+needs it.
+
+Effects that amount to a per-value mapping (brightness, contrast, gamma and
+the fades) also provide it as lookup tables through :meth:`Effect.lut`.
+:func:`apply_chain` composes the tables of consecutive such effects (see
+:func:`fuse`), so a stack of them reads and writes each ``uint8`` frame once
+rather than once per effect.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, is_dataclass
+from typing import ClassVar
+
+import numpy as np
+
+from .scale import FILTERS, Kernel, kernel, resample
+from .yuv import BLACK_LUMA, NEUTRAL_CHROMA, PIXEL_FORMATS, RGB24, YUV420P, convert, planes
+
+_CHUNK = 1 << 16
+
+
+def _output(frames: np.ndarray, out: np.ndarray | None) -> np.ndarray:
+    if frames.dtype not in (np.uint8, np.float32):
+        raise TypeError(f"unsupported frame dtype {frames.dtype}; expected uint8 or float32")
+    if out is None:
+        return np.empty_like(frames)
+    if out.shape != frames.shape or out.dtype != frames.dtype:
+        raise ValueError(f"out has shape {out.shape} {out.dtype}, expected {frames.shape} {frames.dtype}")
+    return out
+
+
+def _u8_lut(curve: np.ndarray) -> np.ndarray:
+    """Quantise a curve sampled at the 256 ``uint8`` levels (as floats in ``[0, 1]``) to a LUT."""
+    return np.rint(np.clip(curve, 0.0, 1.0) * 255.0).astype(np.uint8)
+
+
+_LEVELS = np.arange(256, dtype=np.float64) / 255.0
+
+
+def apply_lut(frames: np.ndarray, lut: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """Map every value of a ``uint8`` array through the 256-entry table ``lut``."""
+    if frames.dtype != np.uint8 or lut.shape != (256,):
+        raise ValueError("apply_lut needs uint8 frames and a (256,) table")
+    out = _output(frames, out)
+    if not (frames.flags.c_contiguous and out.flags.c_contiguous):
+        out[...] = lut[frames]
+        return out
+    src, dst = frames.reshape(-1), out.reshape(-1)
+    for i in range(0, src.size, _CHUNK):
+        np.take(lut, src[i : i + _CHUNK], out=dst[i : i + _CHUNK])
+    return out
+
+
+def _brightness_table(amount: float) -> np.ndarray:
+    return _u8_lut(_LEVELS + amount)
+
+
+def _contrast_table(factor: float) -> np.ndarray:
+    return _u8_lut((_LEVELS - 0.5) * factor + 0.5)
+
+
+def _gamma_table(value: float) -> np.ndarray:
+    return _u8_lut(_LEVELS ** (1.0 / value))
+
+
+def brightness(frames: np.ndarray, amount: float, out: np.ndarray | None = None) -> np.ndarray:
+    """Add ``amount`` (a fraction of full scale, ``-1`` to ``1``) to every value."""
+    if frames.dtype == np.uint8:
+        return apply_lut(frames, _brightness_table(amount), out)
+    out = _output(frames, out)
+    np.add(frames, np.float32(amount), out=out)
+    return np.clip(out, 0.0, 1.0, out=out)
+
+
+def contrast(frames: np.ndarray, factor: float, out: np.ndarray | None = None) -> np.ndarray:
+    """Scale the distance of every value from mid-grey by ``factor``."""
+    if frames.dtype == np.uint8:
+        return apply_lut(frames, _contrast_table(factor), out)
+    out = _output(frames, out)
+    np.subtract(frames, np.float32(0.5), out=out)
+    np.multiply(out, np.float32(factor), out=out)
+    np.add(out, np.float32(0.5), out=out)
+    return np.clip(out, 0.0, 1.0, out=out)
+
+
+def gamma(frames: np.ndarray, value: float, out: np.ndarray | None = None) -> np.ndarray:
+    """Apply gamma correction ``x ** (1 / value)``; values above 1 brighten mid-tones."""
+    if value <= 0:
+        raise ValueError("gamma must be positive")
+    if frames.dtype == np.uint8:
+        return apply_lut(frames, _gamma_table(value), out)
+    out = _output(frames, out)
+    np.clip(frames, 0.0, 1.0, out=out)
+    return np.power(out, np.float32(1.0 / value), out=out)
+
+
+def _fade_tables(weights: np.ndarray, pixel_format: str = RGB24) -> np.ndarray:
+    """Per-frame ``uint8`` tables fading by ``weights``: ``(n, 256)``, or ``(n, 2, 256)`` luma and chroma."""
+    weights = weights[:, None]
+    if pixel_format == RGB24:
+        return _u8_lut(_LEVELS * weights)
+    levels = np.arange(256, dtype=np.float64)
+    luma = np.rint(BLACK_LUMA + (levels - BLACK_LUMA) * weights).astype(np.uint8)
+    chroma = np.rint(NEUTRAL_CHROMA + (levels - NEUTRAL_CHROMA) * weights).astype(np.uint8)
+    return np.stack([luma, chroma], axis=1)
+
+
+def _apply_tables(frames: np.ndarray, tables: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """Map frame ``n`` of a ``uint8`` batch through ``tables[n]`` (see :meth:`Effect.lut`)."""
+    out = _output(frames, out)
+    if frames.ndim == 4:
+        for n, table in enumerate(tables):
+            apply_lut(frames[n], table, out[n])
+        return out
+    height = frames.shape[1] * 2 // 3
+    for n, (luma, chroma) in enumerate(tables):
+        apply_lut(frames[n, :height], luma, out[n, :height])
+        apply_lut(frames[n, height:], chroma, out[n, height:])
+    return out
+
+
+def fade(frames: np.ndarray, weights: np.ndarray | float, out: np.ndarray | None = None) -> np.ndarray:
+    """Fade towards black, scaling frame ``n`` of the batch by ``weights[n]``."""
+    out = _output(frames, out)
+    weights = np.broadcast_to(np.asarray(weights, dtype=np.float32), (len(frames),))
+    if frames.dtype == np.uint8:
+        return _apply_tables(frames, _fade_tables(weights), out)
+    return np.multiply(frames, weights.reshape(-1, *([1] * (frames.ndim - 1))), out=out)
+
+
+def fade_planar(frames: np.ndarray, weights: np.ndarray | float, out: np.ndarray | None = None) -> np.ndarray:
+    """:func:`fade` for a ``yuv420p`` batch: luma towards black level, chroma towards neutral."""
+    if frames.dtype != np.uint8 or frames.ndim != 3:
+        raise ValueError("fade_planar needs a (N, H * 3 // 2, W) uint8 batch")
+    weights = np.broadcast_to(np.asarray(weights, dtype=np.float32), (len(frames),))
+    return _apply_tables(frames, _fade_tables(weights, YUV420P), out)
+
+
+def cross_dissolve(
+    a: np.ndarray, b: np.ndarray, weights: np.ndarray | float, out: np.ndarray | None = None
+) -> np.ndarray:
+    """Blend batch ``a`` into batch ``b``: frame ``n`` is ``a + (b - a) * weights[n]``.
+
+    The blend is linear, so it works on ``yuv420p`` batches as they are.
+    """
+    if a.shape != b.shape or a.dtype != b.dtype:
+        raise ValueError("cross_dissolve needs two batches of the same shape and dtype")
+    out = _output(a, out)
+    weights = np.broadcast_to(np.asarray(weights, dtype=np.float32), (len(a),))
+    if a.dtype == np.float32:
+        np.subtract(b, a, out=out)
+        np.multiply(out, weights.reshape(-1, *([1] * (a.ndim - 1))), out=out)
+        return np.add(out, a, out=out)
+    # uint8: blend in float32 chunks through one small scratch buffer.
+    scratch = np.empty(_CHUNK, dtype=np.float32)
+    for n, weight in enumerate(weights):
+        src_a, src_b, dst = a[n].reshape(-1), b[n].reshape(-1), out[n].reshape(-1)
+        for i in range(0, dst.size, _CHUNK):
+            s = scratch[: min(_CHUNK, dst.size - i)]
+            np.subtract(src_b[i : i + _CHUNK], src_a[i : i + _CHUNK], out=s, dtype=np.float32)
+            np.multiply(s, weight, out=s)
+            np.add(s, src_a[i : i + _CHUNK], out=s)
+            np.rint(s, out=s)
+            dst[i : i + _CHUNK] = s
+    return out
+
+
+@dataclass(frozen=True)
+class Region:
+    """A rectangle of pixels, ``left`` to ``right - 1`` by ``top`` to ``bottom - 1``."""
+
+    left: int
+    top: int
+    right: int
+    bottom: int
+
+    @classmethod
+    def full(cls, width: int, height: int) -> Region:
+        return cls(0, 0, width, height)
+
+    @property
+    def width(self) -> int:
+        return self.right - self.left
+
+    @property
+    def height(self) -> int:
+        return self.bottom - self.top
+
+    def slices(self, origin: Region | None = None) -> tuple[slice, slice]:
+        """Row and column slices selecting this region from an array covering ``origin`` (the frame by default)."""
+        top, left = (origin.top, origin.left) if origin is not None else (0, 0)
+        return slice(self.top - top, self.bottom - top), slice(self.left - left, self.right - left)
+
+    def union(self, other: Region) -> Region:
+        return Region(
+            min(self.left, other.left),
+            min(self.top, other.top),
+            max(self.right, other.right),
+            max(self.bottom, other.bottom),
+        )
+
+    def intersection(self, other: Region) -> Region | None:
+        """The pixels in both regions, or None if they do not overlap."""
+        region = Region(
+            max(self.left, other.left),
+            max(self.top, other.top),
+            min(self.right, other.right),
+            min(self.bottom, other.bottom),
+        )
+        return region if region.width > 0 and region.height > 0 else None
+
+    def contains(self, other: Region) -> bool:
+        return (
+            self.left <= other.left
+            and self.top <= other.top
+            and other.right <= self.right
+            and other.bottom <= self.bottom
+        )
+
+    def relative_to(self, origin: Region) -> Region:
+        """This region in the coordinates of an array covering ``origin``."""
+        left, top = origin.left, origin.top
+        return Region(self.left - left, self.top - top, self.right - left, self.bottom - top)
+
+
+class Effect:
+    """A per-pixel operation attached to a clip.
+
+    ``apply`` receives a batch of consecutive frames of the clip, the
+    clip-local frame numbers of that batch (``positions``) and the clip length,
+    so time-varying effects can compute their parameters per frame.
+
+    Subclasses whose output pixel depends only on the input pixel at the same
+    place set ``pointwise = True``; others that can work on part of a frame
+    override :meth:`input_region` and :meth:`apply_region`.  Subclasses that
+    can also work on ``yuv420p`` batches (told apart by having three
+    dimensions) list it in ``formats``.
+    """
+
+    pointwise: ClassVar[bool] = False
+    formats: ClassVar[tuple[str, ...]] = (RGB24,)
+
+    def apply(
+        self, frames: np.ndarray, positions: np.ndarray, length: int, out: np.ndarray | None = None
+    ) -> np.ndarray:
+        raise NotImplementedError
+
+    def input_region(self, region: Region, width: int, height: int) -> Region:
+        """The part of a ``width`` x ``height`` input frame needed to produce ``region`` of the output."""
+        return region if self.pointwise else Region.full(width, height)
+
+    def apply_region(
+        self, frames: np.ndarray, positions: np.ndarray, length: int, region: Region, width: int, height: int
+    ) -> np.ndarray:
+        """Return ``region`` of the output, given ``frames`` covering :meth:`input_region` of the input.
+
+        ``frames`` may be modified in place.  The default applies the effect
+        to the input it was given and cuts ``region`` out of the result.
+        """
+        source = self.input_region(region, width, height)
+        out = self.apply(frames, positions, length, out=frames)
+        return out[(slice(None), *region.slices(source))]
+
+    def lut(self, positions: np.ndarray, length: int, pixel_format: str = RGB24) -> np.ndarray | None:
+        """Lookup tables that do what this effect does to ``uint8`` frames, or ``None``.
+
+        One row per frame of ``positions``: ``(n, 256)`` tables applied to
+        every channel of ``rgb24`` frames, or ``(n, 2, 256)`` luma and chroma
+        tables for ``yuv420p``.  Effects that have them are fused with their
+        neighbours by :func:`fuse`.
+        """
+        return None
+
+    def cache_token(self) -> str | None:
+        """A string that identifies this effect and its parameters across processes and sessions.
+
+        Used to key rendered frames on disk.  The default covers dataclass
+        effects, whose ``repr`` lists every parameter; other effects return
+        ``None`` and their output is never cached.
+        """
+        if not is_dataclass(self):
+            return None
+        return f"{type(self).__module__}.{self!r}"
+
+
+@dataclass(frozen=True)
+class Brightness(Effect):
+    pointwise = True
+
+    amount: float
+
+    def apply(self, frames, positions, length, out=None):
+        return brightness(frames, self.amount, out)
+
+    def lut(self, positions, length, pixel_format=RGB24):
+        if pixel_format != RGB24:
+            return None
+        return np.broadcast_to(_brightness_table(self.amount), (len(positions), 256))
+
+
+@dataclass(frozen=True)
+class Contrast(Effect):
+    pointwise = True
+
+    factor: float
+
+    def apply(self, frames, positions, length, out=None):
+        return contrast(frames, self.factor, out)
+
+    def lut(self, positions, length, pixel_format=RGB24):
+        if pixel_format != RGB24:
+            return None
+        return np.broadcast_to(_contrast_table(self.factor), (len(positions), 256))
+
+
+@dataclass(frozen=True)
+class Gamma(Effect):
+    pointwise = True
+
+    value: float
+
+    def apply(self, frames, positions, length, out=None):
+        return gamma(frames, self.value, out)
+
+    def lut(self, positions, length, pixel_format=RGB24):
+        if pixel_format != RGB24 or self.value <= 0:
+            return None  # An invalid value is reported by apply.
+        return np.broadcast_to(_gamma_table(self.value), (len(positions), 256))
+
+
+@dataclass(frozen=True)
+class FadeIn(Effect):
+    """Fade up from black over the first ``frames`` frames of the clip."""
+
+    pointwise = True
+    formats = (RGB24, YUV420P)
+
+    frames: int
+
+    def _weights(self, positions: np.ndarray, length: int) -> np.ndarray:
+        return np.clip((positions + 1) / (self.frames + 1), 0.0, 1.0)
+
+    def apply(self, frames, positions, length, out=None):
+        return (fade_planar if frames.ndim == 3 else fade)(frames, self._weights(positions, length), out)
+
+    def lut(self, positions, length, pixel_format=RGB24):
+        return _fade_tables(self._weights(positions, length).astype(np.float32), pixel_format)
+
+
+@dataclass(frozen=True)
+class FadeOut(Effect):
+    """Fade down to black over the last ``frames`` frames of the clip."""
+
+    pointwise = True
+    formats = (RGB24, YUV420P)
+
+    frames: int
+
+    def _weights(self, positions: np.ndarray, length: int) -> np.ndarray:
+        return np.clip((length - positions) / (self.frames + 1), 0.0, 1.0)
+
+    def apply(self, frames, positions, length, out=None):
+        return (fade_planar if frames.ndim == 3 else fade)(frames, self._weights(positions, length), out)
+
+    def lut(self, positions, length, pixel_format=RGB24):
+        return _fade_tables(self._weights(positions, length).astype(np.float32), pixel_format)
+
+
+@dataclass(frozen=True)
+class Crop(Effect):
+    """Zoom into a rectangle of the frame so that it fills the frame.
+
+    The rectangle is given in fractions of the frame size, so the effect
+    looks the same on proxies.  It is scaled up with ``filter`` (one of
+    :data:`~simple_video_editor.scale.FILTERS`) in a single pass that reads
+    only the pixels inside it, and near its edges.
+    """
+
+    formats = (RGB24, YUV420P)
+
+    x: float
+    y: float
+    width: float
+    height: float
+    filter: str = "nearest"
+
+    def __post_init__(self):
+        if not (0 <= self.x and 0 <= self.y and 0 < self.width and 0 < self.height):
+            raise ValueError("crop offsets must not be negative and its size must be positive")
+        if self.x + self.width > 1 or self.y + self.height > 1:
+            raise ValueError("crop rectangle must lie within the frame")
+        if self.filter not in FILTERS:
+            raise ValueError(f"unknown filter {self.filter!r}; expected one of {FILTERS}")
+
+    def _kernels(self, region: Region, width: int, height: int) -> tuple[Kernel, Kernel]:
+        window = (self.y * height, self.height * height)
+        rows = kernel(height, height, self.filter, window, (region.top, region.bottom))
+        window = (self.x * width, self.width * width)
+        columns = kernel(width, width, self.filter, window, (region.left, region.right))
+        return rows, columns
+
+    def input_region(self, region: Region, width: int, height: int) -> Region:
+        rows, columns = self._kernels(region, width, height)
+        (top, bottom), (left, right) = rows.span(), columns.span()
+        return Region(left, top, right, bottom)
+
+    def apply_region(self, frames, positions, length, region, width, height):
+        return resample(frames, *self._kernels(region, width, height))
+
+    def apply(self, frames, positions, length, out=None):
+        result = np.empty_like(frames) if out is None or out is frames else out
+        pairs = zip(planes(frames), planes(result)) if frames.ndim == 3 else [(frames, result)]
+        for plane, target in pairs:
+            if plane.ndim == 3:
+                plane, target = plane[..., None], target[..., None]
+            height, width = plane.shape[1:3]
+            rows, columns = self._kernels(Region.full(width, height), width, height)
+            (top, bottom), (left, right) = rows.span(), columns.span()
+            resample(plane[:, top:bottom, left:right], rows, columns, out=target)
+        if out is frames:
+            out[...] = result
+            return out
+        return result
+
+
+class _Fused(Effect):
+    """Consecutive effects with lookup tables, applied as one composed table per frame."""
+
+    pointwise = True
+
+    def __init__(self, effects: list[Effect]):
+        self.effects = effects
+        self.formats = tuple(f for f in PIXEL_FORMATS if all(f in effect.formats for effect in effects))
+
+    def lut(self, positions, length, pixel_format=RGB24):
+        tables = None
+        for effect in self.effects:
+            table = effect.lut(positions, length, pixel_format)
+            if table is None:
+                return None
+            tables = table if tables is None else np.take_along_axis(table, tables.astype(np.intp), axis=-1)
+        return tables
+
+    def apply(self, frames, positions, length, out=None):
+        if frames.dtype == np.uint8:
+            tables = self.lut(positions, length, YUV420P if frames.ndim == 3 else RGB24)
+            if tables is not None:
+                return _apply_tables(frames, tables, out)
+        for effect in self.effects:
+            frames = effect.apply(frames, positions, length, out)
+        return frames
+
+    def __repr__(self) -> str:
+        return f"_Fused({self.effects!r})"
+
+
+def fuse(effects: list[Effect] | tuple[Effect, ...]) -> list[Effect]:
+    """``effects`` with each run of consecutive effects that have :meth:`~Effect.lut` tables merged into one.
+
+    On ``uint8`` frames a merged run makes a single pass over the pixels
+    through the composition of its tables, which gives exactly what applying
+    the effects one after another would, since each of those rounds to
+    ``uint8`` too.  Other frames go through the effects one by one.
+    """
+    fused: list[Effect] = []
+    run: list[Effect] = []
+    for effect in [*effects, None]:
+        if effect is not None and type(effect).lut is not Effect.lut:
+            run.append(effect)
+            continue
+        fused.extend(run if len(run) < 2 else [_Fused(run)])
+        run = []
+        if effect is not None:
+            fused.append(effect)
+    return fused
+
+
+def chain_region(effects: list[Effect] | tuple[Effect, ...], region: Region, width: int, height: int) -> Region:
+    """The input region ``effects`` need, applied in order, to produce ``region`` of their output."""
+    for effect in reversed(effects):
+        region = effect.input_region(region, width, height)
+    return region
+
+
+def apply_chain(
+    effects: list[Effect] | tuple[Effect, ...],
+    frames: np.ndarray,
+    positions: np.ndarray,
+    length: int,
+    *,
+    region: Region | None = None,
+    size: tuple[int, int] | None = None,
+    pixel_format: str = RGB24,
+) -> np.ndarray:
+    """Apply ``effects`` in order, in place on ``frames``.
+
+    With ``region``, ``frames`` cover only :func:`chain_region` of the
+    ``size`` (``(width, height)``) input frame, and ``region`` of the output
+    is returned; it may be a view of ``frames`` or a new array.
+
+    With ``pixel_format="yuv420p"``, effects that do not list ``yuv420p`` in
+    their ``formats`` get the batch converted to ``rgb24``, and so do all the
+    effects after them; the result is converted back into ``frames``.
+
+    Runs of table-driven effects are merged by :func:`fuse` first.
+    """
+    if pixel_format == YUV420P:
+        if region is not None:
+            raise ValueError("regions of interest are only supported for rgb24 frames")
+        planar = next((i for i, effect in enumerate(effects) if YUV420P not in effect.formats), len(effects))
+        for effect in fuse(effects[:planar]):
+            effect.apply(frames, positions, length, out=frames)
+        if planar < len(effects):
+            rgb = convert(frames, YUV420P, RGB24)
+            apply_chain(effects[planar:], rgb, positions, length)
+            convert(rgb, RGB24, YUV420P, out=frames)
+        return frames
+    effects = fuse(effects)
+    if region is None:
+        for effect in effects:
+            effect.apply(frames, positions, length, out=frames)
+        return frames
+    width, height = size
+    regions = [region]
+    for effect in reversed(effects[1:]):
+        regions.append(effect.input_region(regions[-1], width, height))
+    for effect, wanted in zip(effects, reversed(regions)):
+        frames = effect.apply_region(frames, positions, length, wanted, width, height)
+    return frames
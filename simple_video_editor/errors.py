@@ -0,0 +1,11 @@
+"""Exception hierarchy for simple_video_editor."""
+
+from __future__ import annotations
+
+
+class VideoEditorError(Exception):
+    """Base class for every error raised by simple_video_editor."""
+
+
+class MediaError(VideoEditorError):
+    """A media file could not be opened, probed or decoded."""
@@ -0,0 +1,528 @@
+"""Encoding a timeline to a file, rendering independent segments in parallel.
+
+The timeline is split into segments at its cut points (and every
+``max_segment_frames`` frames inside long clips).  Each segment is rendered and
+encoded on its own by a worker process into a temporary file that starts with
+a keyframe, and the encoded segments are then joined by copying their packets
+into the output with shifted timestamps, without re-encoding.
+
+Segment boundaries depend only on the timeline and ``max_segment_frames``, and
+every segment is encoded with the same single-threaded encoder settings, so
+the output is byte-identical from run to run and whatever the number of
+workers, provided the codec is deterministic.  libx264 is, for a fixed thread
+count, once its macroblock-tree rate control is turned off: with it on, the
+same frames were seen to encode differently from one run to the next on
+AVX-512 hosts.  The default options therefore pass ``mbtree=0``, at a small
+cost in compression; options that turn it back on give up byte-identity.
+
+Stream copy
+-----------
+Spans showing an unmodified clip whose source already has the export's codec,
+size, pixel format and frame rate are not re-encoded at all.  The planner
+finds the first and last keyframes of the source inside the span; the
+compressed packets between them are copied straight from the source, and only
+the partial GOPs before the first and after the last keyframe are rendered
+and encoded.  Copied and encoded pieces can only be joined when they share
+codec parameters (the same H.264 SPS/PPS, for instance), so the planner
+encodes a one-frame sample with the export's settings and only copies from
+sources whose parameters match it; spans of other sources are re-encoded
+from the start, and nothing is encoded twice.  The source GOPs are assumed to
+be closed, as is the default for libx264 and most cameras.
+
+Pipelining
+----------
+With ``pipeline_depth`` set, each segment is encoded through a
+:func:`~simple_video_editor.pipeline.pipeline`: decoding (already on its own
+thread), rendering, encoding and writing each get a thread, with at most
+``pipeline_depth`` frames or packets queued between them, and joining reads
+source packets on a thread while the output is written.  This keeps the
+encoder busy while storage is slow, such as on network mounts.  The output is
+the same either way.
+
+Pixel format
+------------
+Segments are rendered in planar ``yuv420p`` when the encoder takes
+``yuv420p`` and the frame size is even, so sources stored that way are not
+converted to RGB and back unless an effect needs RGB.  Set
+``ExportSettings.render_format`` to force a format.
+
+Audio
+-----
+When any clip's source has audio, the timeline is mixed by an
+:class:`~simple_video_editor.audio.AudioMixer` while the video segments are
+joined, and encoded block by block, interleaved with the video packets.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import tempfile
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from fractions import Fraction
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+import av
+import numpy as np
+
+from .audio import DEFAULT_BLOCK_SAMPLES, DEFAULT_SAMPLE_RATE, AudioMixer
+from .errors import MediaError
+from .keyframes import KeyframeIndex
+from .media import has_audio, open_container, probe_video, video_stream
+from .pipeline import pipeline
+from .render import render_range
+from .render_cache import RenderCache
+from .timeline import Clip, Timeline
+from .yuv import RGB24, YUV420P, fill_black, frame_shape
+
+DEFAULT_SEGMENT_FRAMES = 300
+
+
+@dataclass(frozen=True)
+class ExportSettings:
+    """Encoder configuration shared by every segment of an export.
+
+    ``render_format`` is the pixel format frames are rendered in (``"rgb24"``
+    or ``"yuv420p"``); ``None`` picks ``yuv420p`` where it saves conversions.
+    ``scale_filter`` scales sources that are not the timeline size (see
+    :mod:`simple_video_editor.scale`).
+    ``audio_codec=None`` leaves the audio out.
+
+    The default ``options`` turn off libx264's macroblock-tree rate control,
+    which makes its output vary between runs; see the module docstring.
+    """
+
+    codec: str = "libx264"
+    pix_fmt: str = "yuv420p"
+    render_format: str | None = None
+    scale_filter: str = "bilinear"
+    gop_size: int = 48
+    encoder_threads: int = 1
+    options: dict[str, str] = field(
+        default_factory=lambda: {"crf": "20", "preset": "medium", "x264-params": "mbtree=0"}
+    )
+    audio_codec: str | None = "aac"
+    audio_sample_rate: int = DEFAULT_SAMPLE_RATE
+    audio_layout: str = "stereo"
+    audio_block_samples: int = DEFAULT_BLOCK_SAMPLES
+    audio_options: dict[str, str] = field(default_factory=lambda: {"b": "192k"})
+
+
+@dataclass(frozen=True)
+class Segment:
+    """Timeline frames ``start`` to ``stop - 1``, produced as one unit.
+
+    Segments with ``copy_from`` set are stream-copied from that source
+    starting at its keyframe ``source_start``; all others are rendered and
+    encoded.
+    """
+
+    index: int
+    start: int
+    stop: int
+    copy_from: str | None = None
+    source_start: int = 0
+
+    @property
+    def frames(self) -> int:
+        return self.stop - self.start
+
+    @property
+    def copy(self) -> bool:
+        return self.copy_from is not None
+
+
+class SegmentPiece(NamedTuple):
+    """Packets of ``path`` with timestamps in ``[first_pts, stop_pts)``, placed at timeline frame ``start``.
+
+    ``first_pts=None`` takes the whole file and ``stop_pts=None`` runs to its end.
+    """
+
+    path: str
+    start: int
+    first_pts: int | None = None
+    stop_pts: int | None = None
+
+
+def plan_segments(timeline: Timeline, max_segment_frames: int | None = DEFAULT_SEGMENT_FRAMES) -> list[Segment]:
+    """Split the timeline at its cut points, then split spans longer than ``max_segment_frames``."""
+    return plan_export(timeline, max_segment_frames=max_segment_frames, stream_copy=False)
+
+
+def plan_export(
+    timeline: Timeline,
+    settings: ExportSettings | None = None,
+    *,
+    max_segment_frames: int | None = DEFAULT_SEGMENT_FRAMES,
+    stream_copy: bool = True,
+    suffix: str = ".mp4",
+) -> list[Segment]:
+    """Plan the segments of an export, marking spans that can be stream-copied.
+
+    Re-encoded spans are split every ``max_segment_frames`` frames; copied
+    spans are never split, since copying is not worth parallelising.
+    Whether a source's codec parameters match the encoder's is checked
+    against a one-frame sample encoded into a ``suffix`` file, the container
+    the segments will use.
+    """
+    settings = settings or ExportSettings()
+    ranges: list[tuple[int, int, str | None, int]] = []
+
+    def encode(lo: int, hi: int) -> None:
+        step = max_segment_frames or hi - lo
+        ranges.extend((a, min(a + step, hi), None, 0) for a in range(lo, hi, step))
+
+    copyable: dict[str, bool] = {}
+    points = timeline.cut_points()
+    with tempfile.TemporaryDirectory(prefix="sve-plan-") as tmp:
+        sample = functools.cache(lambda: _encode_sample(timeline, settings, os.path.join(tmp, f"sample{suffix}")))
+        for lo, hi in zip(points, points[1:]):
+            active = timeline.active(lo)
+            clip = active[-1] if active else None
+            if (
+                not stream_copy
+                or clip is None
+                or timeline.transition_at(lo) is not None
+                or not _can_copy(timeline, clip, settings, copyable, sample)
+            ):
+                encode(lo, hi)
+                continue
+            index = KeyframeIndex.for_source(clip.source)
+            first = clip.source_frame(lo)
+            last = min(clip.source_frame(hi), len(index))
+            head = index.keyframe_after(first)
+            tail = last if last == len(index) else index.keyframe_before(last)
+            if head >= tail:
+                encode(lo, hi)
+                continue
+            encode(lo, lo + head - first)
+            ranges.append((lo + head - first, lo + tail - first, clip.source, head))
+            encode(lo + tail - first, hi)
+    return [Segment(i, *r) for i, r in enumerate(ranges)]
+
+
+def encode_segment(
+    timeline: Timeline,
+    segment: Segment,
+    settings: ExportSettings,
+    path: str,
+    render_cache: RenderCache | None = None,
+    pipeline_depth: int | None = None,
+) -> str:
+    """Render ``segment`` of ``timeline`` and encode it to ``path``; returns ``path``.
+
+    With ``pipeline_depth`` set, rendering, encoding and writing overlap on
+    separate threads.
+    """
+    with av.open(path, "w") as output:
+        stream = _add_video_stream(output, timeline, settings)
+        pixel_format = _render_format(timeline, settings)
+        images = render_range(
+            timeline,
+            segment.start,
+            segment.stop,
+            render_cache=render_cache,
+            pixel_format=pixel_format,
+            scale_filter=settings.scale_filter,
+        )
+        # Converting copies out of the renderer's reused buffer, so frames can be queued.
+        frames = (_video_frame(image, i, pixel_format) for i, image in enumerate(images))
+        if pipeline_depth:
+            output.start_encoding()  # Write the header before the encoder thread starts.
+            with closing(pipeline(frames, lambda frames: _encode(stream, frames), depth=pipeline_depth)) as packets:
+                for packet in packets:
+                    output.mux_one(packet)
+        else:
+            for packet in _encode(stream, frames):
+                output.mux_one(packet)
+    return path
+
+
+def concat_segments(
+    pieces: list[SegmentPiece],
+    output_path: str | os.PathLike,
+    fps: Fraction,
+    *,
+    pipeline_depth: int | None = None,
+    audio: AudioMixer | None = None,
+    settings: ExportSettings | None = None,
+) -> None:
+    """Join encoded segments and copied source ranges into ``output_path`` by copying packets.
+
+    All pieces must share codec parameters; see :func:`compatible`.  With
+    ``pipeline_depth`` set, packets are read on a separate thread while the
+    output is written.  The mix of ``audio``, if given, is encoded with the
+    audio settings of ``settings`` and interleaved with the video.
+    """
+    settings = settings or ExportSettings()
+    with av.open(os.fspath(output_path), "w") as output:
+        out_stream = None
+        last_dts: int | None = None
+        write_audio = None
+        for piece in pieces:
+            with open_container(piece.path) as container:
+                in_stream = video_stream(container)
+                if out_stream is None:
+                    out_stream = output.add_stream_from_template(in_stream)
+                    out_stream.time_base = in_stream.time_base
+                    time_base = Fraction(in_stream.time_base)
+                    if audio is not None:
+                        write_audio = _audio_writer(output, audio, settings)
+                last_dts = _copy_packets(
+                    output,
+                    out_stream,
+                    time_base,
+                    container,
+                    in_stream,
+                    piece,
+                    fps,
+                    last_dts,
+                    pipeline_depth,
+                    write_audio,
+                )
+        if write_audio is not None:
+            write_audio(None)
+
+
+def compatible(paths: list[str]) -> bool:
+    """Whether the video streams of ``paths`` can be joined into one stream by copying packets."""
+    signatures = set()
+    for path in paths:
+        with open_container(path) as container:
+            ctx = video_stream(container).codec_context
+            signatures.add((ctx.name, ctx.width, ctx.height, ctx.pix_fmt, bytes(ctx.extradata or b"")))
+    return len(signatures) <= 1
+
+
+def export(
+    timeline: Timeline,
+    path: str | os.PathLike,
+    *,
+    workers: int | None = None,
+    settings: ExportSettings | None = None,
+    max_segment_frames: int | None = DEFAULT_SEGMENT_FRAMES,
+    stream_copy: bool = True,
+    render_cache: RenderCache | None = None,
+    tmp_dir: str | os.PathLike | None = None,
+    pipeline_depth: int | None = None,
+) -> list[Segment]:
+    """Render ``timeline`` to the video file ``path`` and return the segments used.
+
+    Args:
+        workers: Number of worker processes; ``None`` uses one per CPU and
+            ``1`` renders in the calling process.
+        settings: Encoder settings; defaults to :class:`ExportSettings`.
+        max_segment_frames: Longest span rendered by one worker.  Changing it
+            changes the keyframe placement, so keep it fixed when comparing
+            outputs.
+        stream_copy: Copy compressed packets for untouched keyframe-aligned
+            spans instead of re-encoding them.
+        render_cache: On-disk cache of clip frames with effects applied,
+            reused by later exports of the same clips.
+        tmp_dir: Directory for the intermediate segment files.
+        pipeline_depth: Run reading, decoding, rendering, encoding and
+            writing concurrently, with at most this many frames or packets
+            queued between stages; ``None`` runs them in turn.
+            :data:`~simple_video_editor.pipeline.DEFAULT_PIPELINE_DEPTH` is
+            a good starting point.
+    """
+    if not timeline.duration:
+        raise MediaError("cannot export an empty timeline")
+    settings = settings or ExportSettings()
+    workers = workers or os.cpu_count() or 1
+    suffix = os.path.splitext(os.fspath(path))[1] or ".mp4"
+    with tempfile.TemporaryDirectory(prefix="sve-export-", dir=tmp_dir) as tmp:
+        segments = plan_export(
+            timeline, settings, max_segment_frames=max_segment_frames, stream_copy=stream_copy, suffix=suffix
+        )
+        pieces = _encode_all(timeline, segments, settings, workers, tmp, suffix, render_cache, pipeline_depth)
+        if any(s.copy for s in segments) and not compatible(sorted({p.path for p in pieces})):
+            # The sample matched but a segment did not: encode just the copied spans, keeping the rest.
+            redo = [replace(s, copy_from=None, source_start=0) for s in segments if s.copy]
+            redone = iter(_encode_all(timeline, redo, settings, workers, tmp, suffix, render_cache, pipeline_depth))
+            pieces = [next(redone) if s.copy else piece for s, piece in zip(segments, pieces)]
+            segments = [replace(s, copy_from=None, source_start=0) for s in segments]
+        audio = None
+        if settings.audio_codec and any(has_audio(source) for source in {c.source for c in timeline.clips}):
+            audio = AudioMixer(
+                timeline,
+                sample_rate=settings.audio_sample_rate,
+                layout=settings.audio_layout,
+                block_samples=settings.audio_block_samples,
+            )
+        concat_segments(pieces, path, timeline.fps, pipeline_depth=pipeline_depth, audio=audio, settings=settings)
+    return segments
+
+
+def _encode_all(
+    timeline: Timeline,
+    segments: list[Segment],
+    settings: ExportSettings,
+    workers: int,
+    tmp: str,
+    suffix: str,
+    render_cache: RenderCache | None,
+    pipeline_depth: int | None,
+) -> list[SegmentPiece]:
+    pieces: list[SegmentPiece] = []
+    jobs = []
+    for segment in segments:
+        if segment.copy:
+            index = KeyframeIndex.for_source(segment.copy_from)
+            end = segment.source_start + segment.frames
+            pieces.append(
+                SegmentPiece(
+                    segment.copy_from,
+                    segment.start,
+                    int(index.pts[segment.source_start]),
+                    int(index.pts[end]) if end < len(index) else None,
+                )
+            )
+        else:
+            path = os.path.join(tmp, f"segment-{segment.start:08d}-{segment.stop:08d}{suffix}")
+            pieces.append(SegmentPiece(path, segment.start))
+            jobs.append((timeline, segment, settings, path, render_cache, pipeline_depth))
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            encode_segment(*job)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            list(pool.map(encode_segment, *zip(*jobs)))
+    return pieces
+
+
+def _encode_sample(timeline: Timeline, settings: ExportSettings, path: str) -> str:
+    """Encode one black frame with the export's settings to ``path``, to compare codec parameters against."""
+    pixel_format = _render_format(timeline, settings)
+    black = np.zeros(frame_shape(timeline.width, timeline.height, pixel_format), dtype=np.uint8)
+    if pixel_format == YUV420P:
+        fill_black(black)
+    with av.open(path, "w") as output:
+        stream = _add_video_stream(output, timeline, settings)
+        for packet in _encode(stream, [_video_frame(black, 0, pixel_format)]):
+            output.mux_one(packet)
+    return path
+
+
+def _can_copy(
+    timeline: Timeline, clip: Clip, settings: ExportSettings, memo: dict[str, bool], sample: Callable[[], str]
+) -> bool:
+    # Only an unmodified clip filling the frame hides everything below it.
+    if clip.effects or clip.box is not None or clip.opacity < 1:
+        return False
+    if clip.source not in memo:
+        info = probe_video(clip.source)
+        memo[clip.source] = (
+            info.codec == av.codec.Codec(settings.codec, "w").canonical_name
+            and (info.width, info.height) == (timeline.width, timeline.height)
+            and info.pix_fmt == settings.pix_fmt
+            and info.fps == timeline.fps
+            and compatible([sample(), clip.source])
+        )
+    return memo[clip.source]
+
+
+def _copy_packets(
+    output: av.container.OutputContainer,
+    out_stream: av.video.stream.VideoStream,
+    out_time_base: Fraction,
+    container: av.container.InputContainer,
+    in_stream: av.video.stream.VideoStream,
+    piece: SegmentPiece,
+    fps: Fraction,
+    last_dts: int | None,
+    pipeline_depth: int | None = None,
+    write_audio: Callable[[float | None], None] | None = None,
+) -> int | None:
+    in_time_base = Fraction(in_stream.time_base)
+    scale = in_time_base / out_time_base
+    offset = round(Fraction(piece.start) / fps / out_time_base)
+    base = 0
+    if piece.first_pts is not None:
+        base = piece.first_pts
+        container.seek(piece.first_pts, stream=in_stream, backward=True, any_frame=False)
+    packets = container.demux(in_stream)
+    if pipeline_depth:
+        packets = pipeline(packets, depth=pipeline_depth)
+    with closing(packets):
+        for packet in packets:
+            if packet.dts is None or packet.pts is None:
+                continue
+            if piece.stop_pts is not None and packet.dts >= piece.stop_pts:
+                break
+            if packet.pts < base or (piece.stop_pts is not None and packet.pts >= piece.stop_pts):
+                continue
+            pts = offset + round((packet.pts - base) * scale)
+            dts = offset + round((packet.dts - base) * scale)
+            if last_dts is not None and dts <= last_dts:
+                # Pieces with different reorder delays can overlap by a tick or two.
+                dts = min(last_dts + 1, pts)
+            packet.time_base = out_time_base
+            packet.pts, packet.dts = pts, dts
+            if packet.duration:
+                packet.duration = round(packet.duration * scale)
+            packet.stream = out_stream
+            output.mux(packet)
+            last_dts = dts
+            if write_audio is not None:
+                write_audio(float(dts * out_time_base))
+    return last_dts
+
+
+def _audio_writer(
+    output: av.container.OutputContainer, audio: AudioMixer, settings: ExportSettings
+) -> Callable[[float | None], None]:
+    """Add an audio stream to ``output`` and return a function that writes the mix up to a time.
+
+    Calling it with seconds encodes and muxes audio packets up to that point,
+    so audio stays interleaved with the video; ``None`` writes the rest.
+    """
+    stream = output.add_stream(
+        settings.audio_codec, rate=audio.sample_rate, layout=audio.layout, options=dict(settings.audio_options)
+    )
+    packets = _encode(stream, audio.frames())
+    pending = [next(packets, None)]
+
+    def write(until: float | None) -> None:
+        while pending[0] is not None:
+            packet = pending[0]
+            if until is not None and packet.pts is not None and packet.pts * packet.time_base > until:
+                return
+            output.mux_one(packet)
+            pending[0] = next(packets, None)
+
+    return write
+
+
+def _render_format(timeline: Timeline, settings: ExportSettings) -> str:
+    if settings.render_format is not None:
+        return settings.render_format
+    even = not (timeline.width % 2 or timeline.height % 2)
+    return YUV420P if settings.pix_fmt == YUV420P and even else RGB24
+
+
+def _video_frame(image, pts: int, pixel_format: str = RGB24) -> av.VideoFrame:
+    frame = av.VideoFrame.from_ndarray(image, format=pixel_format)
+    frame.pts = pts
+    return frame
+
+
+def _encode(stream: av.stream.Stream, frames: Iterable[av.frame.Frame]) -> Iterator[av.Packet]:
+    for frame in frames:
+        yield from stream.encode(frame)
+    yield from stream.encode()
+
+
+def _add_video_stream(
+    output: av.container.OutputContainer, timeline: Timeline, settings: ExportSettings
+) -> av.video.stream.VideoStream:
+    stream = output.add_stream(settings.codec, rate=timeline.fps, options=dict(settings.options))
+    stream.width = timeline.width
+    stream.height = timeline.height
+    stream.pix_fmt = settings.pix_fmt
+    stream.time_base = Fraction(1) / timeline.fps
+    stream.codec_context.gop_size = settings.gop_size
+    stream.codec_context.thread_count = settings.encoder_threads
+    return stream
@@ -0,0 +1,205 @@
+"""Shared frame storage for moving frames between worker processes without copying.
+
+A :class:`SharedFrameStore` is a fixed array of frame slots backed by a POSIX
+shared-memory segment, or by a memory-mapped file when a ``path`` is given
+(for stores larger than RAM, or on systems with a small ``/dev/shm``).  Any
+process can attach to it from its picklable :attr:`~SharedFrameStore.handle`
+and read or write slots as ordinary NumPy views, so only slot numbers travel
+through the task queues of a process pool, never pixel data.
+
+:func:`render_parallel` is the standard way to get rendered frames out of
+worker processes: workers render chunks of the timeline straight into store
+slots, and the caller receives views of those slots in timeline order.  The
+timeline is sent to each worker once, when the pool starts, so a chunk job
+carries only its frame range and slot.  (Export workers encode the frames
+they render, so only encoded segment files leave them; see
+:mod:`simple_video_editor.export`.)
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Iterator
+
+import numpy as np
+
+from .render import render_batches, render_range, spans
+from .render_cache import RenderCache
+from .timeline import Timeline
+
+DEFAULT_CHUNK_FRAMES = 24
+
+
+@dataclass(frozen=True)
+class FrameStoreHandle:
+    """Everything a process needs to attach to a :class:`SharedFrameStore`."""
+
+    name: str
+    slots: int
+    shape: tuple[int, ...]
+    dtype: str
+    path: str | None = None
+
+
+# The timeline and render cache of the render_parallel call this worker process serves.
+_worker_state: tuple[Timeline, RenderCache | None] | None = None
+
+
+class SharedFrameStore:
+    """``slots`` frames of ``shape`` and ``dtype`` in memory shared between processes.
+
+    The creating process owns the store and removes the segment (or file) on
+    :meth:`close`.  Other processes map it with :meth:`attach` and unmap it
+    with :meth:`close` once they are done with it.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        shape: tuple[int, ...],
+        dtype: np.dtype | str = np.uint8,
+        *,
+        path: str | os.PathLike | None = None,
+        _handle: FrameStoreHandle | None = None,
+    ):
+        dtype = np.dtype(dtype)
+        full_shape = (slots, *shape)
+        self._shm: shared_memory.SharedMemory | None = None
+        self.owner = _handle is None
+        if path is not None or (_handle is not None and _handle.path is not None):
+            path = os.fspath(path if path is not None else _handle.path)
+            mode = "w+" if self.owner else "r+"
+            self.frames = np.memmap(path, dtype=dtype, mode=mode, shape=full_shape)
+            name = path
+        else:
+            size = max(math.prod(full_shape) * dtype.itemsize, 1)
+            if self.owner:
+                self._shm = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                self._shm = shared_memory.SharedMemory(name=_handle.name)
+            self.frames = np.ndarray(full_shape, dtype=dtype, buffer=self._shm.buf)
+            name = self._shm.name
+        self.handle = FrameStoreHandle(name, slots, tuple(shape), dtype.str, os.fspath(path) if path else None)
+
+    @classmethod
+    def attach(cls, handle: FrameStoreHandle) -> SharedFrameStore:
+        """Map the store described by ``handle`` into this process; :meth:`close` unmaps it again."""
+        return cls(handle.slots, handle.shape, handle.dtype, _handle=handle)
+
+    def __enter__(self) -> SharedFrameStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.handle.slots
+
+    def __getitem__(self, slot: int | slice) -> np.ndarray:
+        return self.frames[slot]
+
+    def __setitem__(self, slot: int | slice, images: np.ndarray) -> None:
+        self.frames[slot] = images
+
+    @property
+    def nbytes(self) -> int:
+        return self.frames.nbytes
+
+    def close(self) -> None:
+        """Unmap the store; the owner also deletes the backing segment or file."""
+        frames, self.frames = self.frames, None
+        if isinstance(frames, np.memmap):
+            frames.flush()
+        del frames
+        if self._shm is not None:
+            self._shm.close()
+            if self.owner:
+                self._shm.unlink()
+            self._shm = None
+        elif self.owner and self.handle.path is not None:
+            try:
+                os.remove(self.handle.path)
+            except FileNotFoundError:
+                pass
+
+
+def _init_worker(timeline: Timeline, render_cache: RenderCache | None) -> None:
+    global _worker_state
+    _worker_state = (timeline, render_cache)
+
+
+def _render_into(start: int, stop: int, handle: FrameStoreHandle, slot: int) -> int:
+    timeline, render_cache = _worker_state
+    # Mapped for this chunk only, so a long-lived worker holds no mapping between jobs.
+    with SharedFrameStore.attach(handle) as store:
+        for batch in render_batches(timeline, start, stop, render_cache=render_cache):
+            store[slot : slot + len(batch)] = batch
+            slot += len(batch)
+    return stop - start
+
+
+def _chunks(timeline: Timeline, start: int, stop: int, chunk_frames: int) -> list[tuple[int, int]]:
+    return [
+        (lo, min(lo + chunk_frames, hi))
+        for span_lo, hi in spans(timeline, start, stop)
+        for lo in range(span_lo, hi, chunk_frames)
+    ]
+
+
+def render_parallel(
+    timeline: Timeline,
+    start: int = 0,
+    stop: int | None = None,
+    *,
+    workers: int | None = None,
+    chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+    depth: int | None = None,
+    path: str | os.PathLike | None = None,
+    render_cache: RenderCache | None = None,
+) -> Iterator[np.ndarray]:
+    """Render timeline frames ``start`` to ``stop`` in a process pool, yielding them in order.
+
+    The range is cut into chunks of at most ``chunk_frames`` frames (never
+    across a cut point), and up to ``depth`` chunks (default ``workers + 1``)
+    are rendered ahead into a :class:`SharedFrameStore`, optionally backed by
+    a file at ``path``.  Memory use is ``depth * chunk_frames`` frames.  The
+    yielded arrays are views into the store, valid until the next frame is
+    requested.
+    """
+    stop = timeline.duration if stop is None else stop
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from render_range(timeline, start, stop, render_cache=render_cache)
+        return
+    depth = depth or workers + 1
+    chunks = deque(_chunks(timeline, start, stop, chunk_frames))
+    shape = (timeline.height, timeline.width, 3)
+    with (
+        SharedFrameStore(depth * chunk_frames, shape, path=path) as store,
+        ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(timeline, render_cache)) as pool,
+    ):
+        free = deque(range(depth))
+        in_flight: deque[tuple[Future, int, int]] = deque()
+
+        def submit() -> None:
+            while free and chunks:
+                region = free.popleft()
+                lo, hi = chunks.popleft()
+                job = pool.submit(_render_into, lo, hi, store.handle, region * chunk_frames)
+                in_flight.append((job, region, hi - lo))
+
+        submit()
+        while in_flight:
+            job, region, count = in_flight.popleft()
+            job.result()
+            base = region * chunk_frames
+            for i in range(count):
+                yield store[base + i]
+            free.append(region)
+            submit()
+
@@ -0,0 +1,367 @@
+"""Lazy, per-frame evaluation of a timeline with dirty-range invalidation.
+
+A :class:`TimelineGraph` turns the timeline into a graph of nodes -- a
+:class:`SourceNode` per clip feeding an :class:`EffectNode` for the clip's
+effects, and :class:`CompositeNode` objects stacking the clip nodes that show
+(see :mod:`~simple_video_editor.composite`) -- and evaluates only the node
+chain needed for each requested frame.  Results are kept in a
+:class:`~simple_video_editor.cache.FrameCache`.
+
+Edits go through the graph (``add_clip``, ``update_clip``, ...).  Each one
+returns the frame ranges whose output it changed and drops only those frames
+from the cache.  A clip's footprint is the part of its extent that is not
+hidden by an opaque clip on a higher track whose box contains its own, plus
+any transitions it takes part in, so editing a fully covered clip
+invalidates nothing.
+
+Frame ranges are lists of half-open ``(start, stop)`` tuples, sorted and
+non-overlapping.
+
+:meth:`TimelineGraph.frame` can also evaluate just a :class:`Region` of a
+frame, for a zoomed or cropped preview.  Nodes pass the region down, each
+effect chain asking for only the input its effects need (see
+:func:`~simple_video_editor.effects.chain_region`), so scaling, effects and
+blends run on the visible pixels only.  Region results are cached separately from whole
+frames and invalidated with them.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Hashable, Iterable
+
+import numpy as np
+
+from .cache import FrameCache
+from .composite import Layer, alpha, draw, place, stack
+from .effects import Region, apply_chain, chain_region
+from .proxy import ProxyManager
+from .scale import kernel, resample
+from .source import VideoSource
+from .timeline import Clip, Timeline, Transition
+
+FrameRanges = list[tuple[int, int]]
+
+_REGIONS = 8  # Regions whose results stay cached; older ones are dropped.
+
+
+def merge_ranges(ranges: Iterable[tuple[int, int]]) -> FrameRanges:
+    """Sort ``ranges`` and merge overlapping or touching ones, dropping empty ones."""
+    merged: FrameRanges = []
+    for lo, hi in sorted(r for r in ranges if r[0] < r[1]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def subtract_ranges(ranges: Iterable[tuple[int, int]], holes: Iterable[tuple[int, int]]) -> FrameRanges:
+    """Remove every frame in ``holes`` from ``ranges``."""
+    holes = merge_ranges(holes)
+    result: FrameRanges = []
+    for lo, hi in merge_ranges(ranges):
+        for h_lo, h_hi in holes:
+            if h_hi <= lo or h_lo >= hi:
+                continue
+            if h_lo > lo:
+                result.append((lo, h_lo))
+            lo = max(lo, h_hi)
+        if lo < hi:
+            result.append((lo, hi))
+    return result
+
+
+def intersect_ranges(a: Iterable[tuple[int, int]], b: Iterable[tuple[int, int]]) -> FrameRanges:
+    b = merge_ranges(b)
+    return merge_ranges(
+        (max(lo, b_lo), min(hi, b_hi)) for lo, hi in merge_ranges(a) for b_lo, b_hi in b
+    )
+
+
+class Node:
+    """A node of the evaluation graph."""
+
+    def evaluate(self, frame: int, region: Region | None = None) -> np.ndarray:
+        """Return the ``(height, width, 3)`` ``uint8`` image of this node at timeline ``frame``.
+
+        With ``region``, return only that part of it.  The result may be
+        read-only.
+        """
+        raise NotImplementedError
+
+
+class BlankNode(Node):
+    def __init__(self, width: int, height: int):
+        self.image = np.zeros((height, width, 3), dtype=np.uint8)
+        self.image.flags.writeable = False
+
+    def evaluate(self, frame: int, region: Region | None = None) -> np.ndarray:
+        return self.image if region is None else self.image[region.slices()]
+
+
+class SourceNode(Node):
+    """The source frames of one clip, scaled to the size it is drawn at."""
+
+    def __init__(self, clip: Clip, source: VideoSource, width: int, height: int):
+        self.clip = clip
+        self.source = source
+        self.size = (width, height)
+
+    def evaluate(self, frame: int, region: Region | None = None) -> np.ndarray:
+        region = region or Region.full(*self.size)
+        index = self.clip.source_frame(frame)
+        if index >= len(self.source):
+            return np.zeros((region.height, region.width, 3), dtype=np.uint8)
+        image = self.source.frame(index)
+        height, width = image.shape[:2]
+        if (width, height) == self.size:
+            return image[region.slices()]
+        # Scale just the region, from just the source pixels under it.
+        rows = kernel(height, self.size[1], "bilinear", outputs=(region.top, region.bottom))
+        columns = kernel(width, self.size[0], "bilinear", outputs=(region.left, region.right))
+        (top, bottom), (left, right) = rows.span(), columns.span()
+        return resample(image[top:bottom, left:right], rows, columns)
+
+
+class EffectNode(Node):
+    """A clip's effect chain applied to the output of ``input``."""
+
+    def __init__(self, input: SourceNode, clip: Clip):
+        self.input = input
+        self.clip = clip
+        self.size = input.size
+
+    def evaluate(self, frame: int, region: Region | None = None) -> np.ndarray:
+        positions = np.array([frame - self.clip.start])
+        effects = self.clip.effects
+        if region is None:
+            batch = self.input.evaluate(frame)[None].copy()
+            return apply_chain(effects, batch, positions, self.clip.duration)[0]
+        batch = self.input.evaluate(frame, chain_region(effects, region, *self.size))[None].copy()
+        return apply_chain(effects, batch, positions, self.clip.duration, region=region, size=self.size)[0]
+
+
+class CompositeNode(Node):
+    """The ``layers`` of a frame, drawn by their ``nodes`` bottom first over black.
+
+    ``fading`` is the clip that ``transition`` fades in, if any.
+    """
+
+    def __init__(
+        self,
+        layers: list[Layer],
+        nodes: list[Node],
+        width: int,
+        height: int,
+        transition: Transition | None = None,
+        fading: Clip | None = None,
+    ):
+        self.layers = layers
+        self.nodes = nodes
+        self.size = (width, height)
+        self.transition = transition
+        self.fading = fading
+
+    def evaluate(self, frame: int, region: Region | None = None) -> np.ndarray:
+        region = region or Region.full(*self.size)
+        canvas = np.zeros((1, region.height, region.width, 3), dtype=np.uint8)
+        frames = np.array([frame])
+        for layer, node in zip(self.layers, self.nodes):
+            # Each layer computes only the part of its box inside the region.
+            part = layer.region.intersection(region)
+            if part is None:
+                continue
+            local = part.relative_to(layer.region) if part != layer.region else None
+            image = node.evaluate(frame, local)[None].copy()
+            weights = alpha(layer, frames, self.transition if layer.clip is self.fading else None)
+            draw(canvas, image, part.relative_to(region), weights)
+        return canvas[0]
+
+
+class TimelineGraph:
+    """Evaluate timeline frames on demand and track which frames edits invalidate.
+
+    Args:
+        timeline: The timeline to evaluate.  Edit it through the graph's
+            methods so cached frames stay correct; after editing it directly,
+            call :meth:`invalidate_all`.
+        cache: Cache for composited output frames; a default-sized one is
+            created if not given.
+        source_cache: Optional cache for decoded source frames, shared by all
+            sources of the graph.
+        proxies: When given, sources are read from their proxies where one
+            exists.  Call :meth:`invalidate_source` once a proxy is ready
+            (e.g. from ``ProxyManager.generate(on_ready=...)``, handing the
+            call over to the thread that owns the graph) to switch to it.
+    """
+
+    def __init__(
+        self,
+        timeline: Timeline,
+        *,
+        cache: FrameCache | None = None,
+        source_cache: FrameCache | None = None,
+        proxies: ProxyManager | None = None,
+    ):
+        self.timeline = timeline
+        self.cache = cache if cache is not None else FrameCache()
+        self.source_cache = source_cache
+        self.proxies = proxies
+        self._sources: dict[str, VideoSource] = {}
+        self._clip_nodes: dict[Clip, Node] = {}
+        self._blank = BlankNode(timeline.width, timeline.height)
+        self._regions: OrderedDict[Region, None] = OrderedDict()
+
+    def __enter__(self) -> TimelineGraph:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for source in self._sources.values():
+            source.close()
+        self._sources.clear()
+        self._clip_nodes.clear()
+
+    def source(self, path: str) -> VideoSource:
+        if path not in self._sources:
+            media = self.proxies.resolve(path) if self.proxies is not None else path
+            self._sources[path] = VideoSource(media, cache=self.source_cache)
+        return self._sources[path]
+
+    def clip_node(self, clip: Clip) -> Node:
+        node = self._clip_nodes.get(clip)
+        if node is None:
+            region = place(clip, self.timeline.width, self.timeline.height)
+            node = SourceNode(clip, self.source(clip.source), region.width, region.height)
+            if clip.effects:
+                node = EffectNode(node, clip)
+            self._clip_nodes[clip] = node
+        return node
+
+    def node(self, frame: int) -> Node:
+        """The root node producing timeline ``frame``."""
+        active = self.timeline.active(frame)
+        if not active:
+            return self._blank
+        width, height = self.timeline.width, self.timeline.height
+        transition = self.timeline.transition_at(frame)
+        fading = active[-1] if transition is not None and len(active) > 1 else None
+        layers = stack(active, width, height, fading=fading)
+        if not layers:
+            return self._blank
+        if len(layers) == 1 and layers[0].opaque and layers[0].region == Region.full(width, height):
+            return self.clip_node(layers[0].clip)
+        nodes = [self.clip_node(layer.clip) for layer in layers]
+        return CompositeNode(layers, nodes, width, height, transition, fading)
+
+    def frame(self, frame: int, region: Region | None = None) -> np.ndarray:
+        """Return timeline ``frame``, evaluating it only if it is not cached.  The result is read-only.
+
+        With ``region``, return only that part of the frame, computing only
+        what it depends on unless the whole frame is cached already.
+        """
+        if not 0 <= frame < self.timeline.duration:
+            raise IndexError(f"frame {frame} out of range for {self.timeline.duration} frames")
+        if region is None or region == Region.full(self.timeline.width, self.timeline.height):
+            return self.cache.get_or_load(self, frame, lambda: self.node(frame).evaluate(frame))
+        if not (0 <= region.left < region.right <= self.timeline.width) or not (
+            0 <= region.top < region.bottom <= self.timeline.height
+        ):
+            raise ValueError(f"{region} is empty or outside the {self.timeline.width}x{self.timeline.height} frame")
+        whole = self.cache.get(self, frame)
+        if whole is not None:
+            return whole[region.slices()]
+        self._regions[region] = None
+        self._regions.move_to_end(region)
+        while len(self._regions) > _REGIONS:
+            self.cache.invalidate((self, self._regions.popitem(last=False)[0]))
+        return self.cache.get_or_load((self, region), frame, lambda: self.node(frame).evaluate(frame, region))
+
+    def _keys(self) -> list[Hashable]:
+        """Cache sources under which this graph stores frames: itself, and itself with each recent region."""
+        return [self, *((self, region) for region in self._regions)]
+
+    def invalidate(self, ranges: Iterable[tuple[int, int]]) -> FrameRanges:
+        """Drop the cached frames in ``ranges`` and return them merged."""
+        ranges = merge_ranges(ranges)
+        for key in self._keys():
+            for lo, hi in ranges:
+                self.cache.invalidate(key, lo, hi)
+        return ranges
+
+    def invalidate_all(self) -> FrameRanges:
+        self._clip_nodes.clear()
+        for key in self._keys():
+            self.cache.invalidate(key)
+        return [(0, self.timeline.duration)] if self.timeline.duration else []
+
+    def invalidate_source(self, path: str) -> FrameRanges:
+        """Forget everything decoded from ``path``, e.g. after the file changed on disk."""
+        source = self._sources.pop(path, None)
+        if source is not None:
+            source.close()
+        if self.source_cache is not None:
+            self.source_cache.invalidate(path)
+            if source is not None:
+                self.source_cache.invalidate(source.path)
+        clips = [clip for clip in self.timeline.clips if clip.source == path]
+        for clip in clips:
+            self._clip_nodes.pop(clip, None)
+        return self.invalidate(r for clip in clips for r in self.footprint(clip))
+
+    def footprint(self, clip: Clip) -> FrameRanges:
+        """Frames whose output currently depends on ``clip``."""
+        width, height = self.timeline.width, self.timeline.height
+        region = place(clip, width, height)
+        covered = (
+            (other.start, other.end)
+            for other in self.timeline.overlapping(clip.start, clip.end)
+            if other.track > clip.track
+            and other is not clip
+            and other.opacity >= 1
+            and place(other, width, height).contains(region)
+        )
+        visible = subtract_ranges([(clip.start, clip.end)], covered)
+        transitions = self.timeline.transitions_overlapping(clip.start, clip.end)
+        blended = intersect_ranges([(clip.start, clip.end)], ((t.start, t.stop) for t in transitions))
+        return merge_ranges(visible + blended)
+
+    def add_clip(self, clip: Clip) -> FrameRanges:
+        self.timeline.add(clip)
+        return self.invalidate(self.footprint(clip))
+
+    def remove_clip(self, clip: Clip) -> FrameRanges:
+        dirty = self.footprint(clip)
+        self.timeline.remove(clip)
+        self._clip_nodes.pop(clip, None)
+        return self.invalidate(dirty)
+
+    def update_clip(self, clip: Clip, **changes) -> FrameRanges:
+        """Change attributes of ``clip`` (``start``, ``in_frame``, ``effects``, ...) and invalidate.
+
+        Returns the frame ranges whose output changed.
+        """
+        before = self.footprint(clip)
+        previous = {name: getattr(clip, name) for name in changes}
+        for name, value in changes.items():
+            setattr(clip, name, value)
+        try:
+            clip.__post_init__()
+        except ValueError:
+            for name, value in previous.items():
+                setattr(clip, name, value)
+            raise
+        self.timeline.moved(clip)
+        self._clip_nodes.pop(clip, None)
+        return self.invalidate(before + self.footprint(clip))
+
+    def add_transition(self, start: int, stop: int) -> tuple[Transition, FrameRanges]:
+        transition = self.timeline.add_transition(start, stop)
+        return transition, self.invalidate([(start, stop)])
+
+    def remove_transition(self, transition: Transition) -> FrameRanges:
+        self.timeline.remove_transition(transition)
+        return self.invalidate([(transition.start, transition.stop)])
@@ -0,0 +1,167 @@
+"""An interval tree for finding the timeline items that overlap a frame or range.
+
+:class:`IntervalTree` is an AVL tree ordered by interval start, where every
+node also records the largest stop in its subtree.  Insertion and removal
+take ``O(log n)``; point and range queries take ``O(log n + k)`` for ``k``
+results, which are returned in order of start.
+"""
+
+from __future__ import annotations
+
+import itertools
+from typing import Any, Hashable
+
+
+class _Node:
+    __slots__ = ("key", "stop", "item", "left", "right", "height", "max_stop")
+
+    def __init__(self, key: tuple[int, int], stop: int, item: Any):
+        self.key = key
+        self.stop = stop
+        self.item = item
+        self.left: _Node | None = None
+        self.right: _Node | None = None
+        self.height = 1
+        self.max_stop = stop
+
+
+def _height(node: _Node | None) -> int:
+    return node.height if node is not None else 0
+
+
+def _update(node: _Node) -> None:
+    node.height = 1 + max(_height(node.left), _height(node.right))
+    node.max_stop = node.stop
+    if node.left is not None and node.left.max_stop > node.max_stop:
+        node.max_stop = node.left.max_stop
+    if node.right is not None and node.right.max_stop > node.max_stop:
+        node.max_stop = node.right.max_stop
+
+
+def _rotate_right(node: _Node) -> _Node:
+    top = node.left
+    node.left = top.right
+    top.right = node
+    _update(node)
+    _update(top)
+    return top
+
+
+def _rotate_left(node: _Node) -> _Node:
+    top = node.right
+    node.right = top.left
+    top.left = node
+    _update(node)
+    _update(top)
+    return top
+
+
+def _balance(node: _Node) -> _Node:
+    _update(node)
+    skew = _height(node.left) - _height(node.right)
+    if skew > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if skew < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+
+def _insert(node: _Node | None, new: _Node) -> _Node:
+    if node is None:
+        return new
+    if new.key < node.key:
+        node.left = _insert(node.left, new)
+    else:
+        node.right = _insert(node.right, new)
+    return _balance(node)
+
+
+def _pop_min(node: _Node) -> tuple[_Node | None, _Node]:
+    if node.left is None:
+        return node.right, node
+    node.left, smallest = _pop_min(node.left)
+    return _balance(node), smallest
+
+
+def _delete(node: _Node | None, key: tuple[int, int]) -> _Node | None:
+    if node is None:
+        raise KeyError(key)
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    elif key > node.key:
+        node.right = _delete(node.right, key)
+    else:
+        if node.left is None or node.right is None:
+            return node.left or node.right
+        node.right, successor = _pop_min(node.right)
+        successor.left, successor.right = node.left, node.right
+        node = successor
+    return _balance(node)
+
+
+class IntervalTree:
+    """Half-open ``[start, stop)`` intervals, each attached to a hashable item."""
+
+    def __init__(self):
+        self._root: _Node | None = None
+        self._keys: dict[Hashable, tuple[int, int]] = {}
+        self._order = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._keys
+
+    def add(self, item: Hashable, start: int, stop: int) -> None:
+        """Insert ``item`` covering ``[start, stop)``; items with equal starts keep insertion order."""
+        if item in self._keys:
+            raise ValueError(f"{item!r} is already in the tree")
+        key = (start, next(self._order))
+        self._keys[item] = key
+        self._root = _insert(self._root, _Node(key, stop, item))
+
+    def remove(self, item: Hashable) -> None:
+        self._root = _delete(self._root, self._keys.pop(item))
+
+    def move(self, item: Hashable, start: int, stop: int) -> None:
+        """Change the interval of ``item``, which keeps its place among items with equal starts."""
+        key = self._keys[item]
+        self._root = _delete(self._root, key)
+        key = (start, key[1])
+        self._keys[item] = key
+        self._root = _insert(self._root, _Node(key, stop, item))
+
+    def order(self, item: Hashable) -> int:
+        """Position of ``item`` in insertion order (unchanged by :meth:`move`)."""
+        return self._keys[item][1]
+
+    def at(self, point: int) -> list[Any]:
+        """Items whose interval contains ``point``."""
+        return self.overlapping(point, point + 1)
+
+    def overlapping(self, start: int, stop: int) -> list[Any]:
+        """Items whose interval overlaps ``[start, stop)``, in order of start."""
+        found: list[Any] = []
+        stack: list[_Node] = []
+        node = self._root
+        # In-order walk that skips subtrees ending before ``start`` or starting after ``stop``.
+        while stack or node is not None:
+            if node is not None:
+                if node.max_stop <= start:
+                    node = None
+                    continue
+                stack.append(node)
+                node = node.left
+                continue
+            node = stack.pop()
+            if node.key[0] >= stop:
+                break
+            if node.stop > start:
+                found.append(node.item)
+            node = node.right
+        return found
@@ -0,0 +1,125 @@
+"""Per-source keyframe/PTS index for random-access seeking.
+
+The index is built by demuxing packets only, without decoding, and is saved
+as a small ``.npz`` sidecar next to the media file so later sessions can load
+it instead of rescanning.  Frame ``i`` of a source is the ``i``-th frame in
+presentation order; all lookups are binary searches over sorted arrays.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from fractions import Fraction
+
+import av
+import numpy as np
+
+from .errors import MediaError
+from .media import open_container, video_stream
+from .sidecar import Sidecar, load_or_build
+
+SIDECAR_SUFFIX = ".keyframes.npz"
+_SIDECAR = Sidecar(SIDECAR_SUFFIX, version=1)
+
+
+def sidecar_path(path: str | os.PathLike) -> str:
+    """Return the sidecar file used to persist the index of ``path``."""
+    return _SIDECAR.path(path)
+
+
+@dataclass(frozen=True, eq=False)
+class KeyframeIndex:
+    """Presentation timestamps of every frame of a video stream and which are keyframes.
+
+    Attributes:
+        pts: Sorted ``int64`` presentation timestamps, one per frame, in
+            ``time_base`` units.
+        keyframes: Sorted ``int64`` frame indices of the keyframes.
+        time_base: Unit of ``pts`` in seconds.
+    """
+
+    pts: np.ndarray
+    keyframes: np.ndarray
+    time_base: Fraction
+
+    def __len__(self) -> int:
+        return len(self.pts)
+
+    @classmethod
+    def build(cls, path: str | os.PathLike) -> KeyframeIndex:
+        """Scan the packets of ``path`` and build its index."""
+        pts: list[int] = []
+        key_pts: list[int] = []
+        with open_container(path) as container:
+            stream = video_stream(container)
+            time_base = Fraction(stream.time_base)
+            try:
+                for packet in container.demux(stream):
+                    if packet.pts is None or packet.size == 0:
+                        continue
+                    pts.append(packet.pts)
+                    if packet.is_keyframe:
+                        key_pts.append(packet.pts)
+            except av.FFmpegError as exc:
+                raise MediaError(f"cannot index {os.fspath(path)!r}: {exc}") from exc
+        if not pts:
+            raise MediaError(f"{os.fspath(path)!r} has no timestamped video packets")
+        sorted_pts = np.unique(np.asarray(pts, dtype=np.int64))
+        keyframes = np.searchsorted(sorted_pts, np.unique(np.asarray(key_pts, dtype=np.int64)))
+        if not len(keyframes) or keyframes[0] != 0:
+            # Streams whose first packet is not flagged still have to be decoded from the start.
+            keyframes = np.union1d([0], keyframes)
+        return cls(sorted_pts, keyframes.astype(np.int64), time_base)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> KeyframeIndex | None:
+        """Load the sidecar of ``path`` if it exists and still matches the media file."""
+
+        def parse(data) -> KeyframeIndex:
+            num, den = data["time_base"].tolist()
+            return cls(data["pts"], data["keyframes"], Fraction(num, den))
+
+        return _SIDECAR.load(path, parse)
+
+    def save(self, path: str | os.PathLike) -> None:
+        """Write the index of ``path`` to its sidecar file, atomically."""
+        _SIDECAR.save(
+            path,
+            time_base=np.array([self.time_base.numerator, self.time_base.denominator], dtype=np.int64),
+            pts=self.pts,
+            keyframes=self.keyframes,
+        )
+
+    @classmethod
+    def for_source(cls, path: str | os.PathLike, *, persist: bool = True) -> KeyframeIndex:
+        """Return the index of ``path``, loading its sidecar or building (and saving) it."""
+        return load_or_build(lambda: cls.load(path), lambda: cls.build(path), lambda index: index.save(path), persist)
+
+    def frame_at(self, seconds: float) -> int:
+        """Index of the frame displayed at ``seconds`` (clamped to the first frame)."""
+        # Round to the nearest tick: a float time just short of a frame's timestamp still means that frame.
+        target = round(Fraction(seconds) / self.time_base)
+        return max(int(np.searchsorted(self.pts, target, side="right")) - 1, 0)
+
+    def frame_of_pts(self, pts: int) -> int:
+        """Index of the frame whose timestamp is ``pts`` (or the last one before it)."""
+        return max(int(np.searchsorted(self.pts, pts, side="right")) - 1, 0)
+
+    def time_of(self, frame: int) -> float:
+        return float(self.pts[frame] * self.time_base)
+
+    def keyframe_before(self, frame: int) -> int:
+        """Index of the nearest keyframe at or before ``frame``."""
+        if not 0 <= frame < len(self.pts):
+            raise IndexError(f"frame {frame} out of range for {len(self.pts)} frames")
+        return int(self.keyframes[np.searchsorted(self.keyframes, frame, side="right") - 1])
+
+    def keyframe_after(self, frame: int) -> int:
+        """Index of the nearest keyframe at or after ``frame``, or ``len(self)`` if there is none."""
+        i = np.searchsorted(self.keyframes, frame)
+        return int(self.keyframes[i]) if i < len(self.keyframes) else len(self.pts)
+
+    def is_keyframe(self, frame: int) -> bool:
+        i = np.searchsorted(self.keyframes, frame)
+        return bool(i < len(self.keyframes) and self.keyframes[i] == frame)
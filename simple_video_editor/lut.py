@@ -0,0 +1,300 @@
+"""3D colour lookup tables loaded from ``.cube`` files.
+
+A :class:`LUT3D` maps RGB to RGB through an ``N x N x N`` lattice of output
+colours, interpolating between the eight lattice points around each input
+colour.  Both common schemes are vectorised over whole batches, a chunk of
+pixels at a time so temporaries stay small:
+
+``"trilinear"``
+    blends all eight corners of the surrounding cube.
+``"tetrahedral"``
+    splits the cube into six tetrahedra along its grey diagonal and blends the
+    four corners of the one the colour falls in.  Cheaper, and keeps neutral
+    colours on the LUT's grey axis, which is why grading tools default to it.
+
+For ``uint8`` frames, :meth:`LUT3D.table_u8` evaluates the LUT once for all
+256³ input colours (48 MiB); applying it is then a single table lookup per
+pixel.  Building the table takes seconds, as long as interpolating 256³
+pixels directly, so it is only worth it for long renders.  A table built for
+a LUT loaded from a file is saved next to it as a ``.<method>.u8.npz``
+sidecar, and processes that need it at the same time take turns building it,
+so each LUT is evaluated once however many export workers use it.  The
+:class:`ColorLUT` effect interpolates ``uint8`` batches directly until the
+table exists or the LUT has graded 256³ pixels, then switches to the table.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+import numpy as np
+
+from .effects import _CHUNK, Effect, _output
+from .errors import VideoEditorError
+from .sidecar import Sidecar, load_or_build
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+METHODS = ("tetrahedral", "trilinear")
+_U8_CHUNK = 1 << 20
+_U8_COLOURS = 256**3
+_TABLE_SIDECARS = {method: Sidecar(f".{method}.u8.npz", version=1) for method in METHODS}
+
+
+class LUTError(VideoEditorError):
+    """A LUT file cannot be read."""
+
+
+def _tetrahedral(flat: np.ndarray, size: int, base: np.ndarray, frac: np.ndarray) -> np.ndarray:
+    strides = np.array([size * size, size, 1], dtype=np.intp)
+    order = np.argsort(-frac, axis=1, kind="stable")
+    ranked = np.take_along_axis(frac, order, axis=1)
+    first = base @ strides
+    second = first + strides[order[:, 0]]
+    third = second + strides[order[:, 1]]
+    out = flat[first] * (1.0 - ranked[:, :1])
+    out += flat[second] * (ranked[:, :1] - ranked[:, 1:2])
+    out += flat[third] * (ranked[:, 1:2] - ranked[:, 2:])
+    out += flat[first + strides.sum()] * ranked[:, 2:]
+    return out
+
+
+def _trilinear(flat: np.ndarray, size: int, base: np.ndarray, frac: np.ndarray) -> np.ndarray:
+    strides = np.array([size * size, size, 1], dtype=np.intp)
+    first = base @ strides
+    out = np.zeros((len(base), 3), dtype=np.float32)
+    for corner in range(8):
+        bits = np.array([(corner >> 2) & 1, (corner >> 1) & 1, corner & 1])
+        weight = np.prod(np.where(bits, frac, 1.0 - frac), axis=1, keepdims=True)
+        out += flat[first + bits @ strides] * weight
+    return out
+
+
+@dataclass(frozen=True, eq=False)
+class LUT3D:
+    """A 3D LUT.
+
+    Attributes:
+        table: ``float32`` array shaped ``(N, N, N, 3)``, indexed
+            ``[red, green, blue]``.
+        domain_min: Input value mapped to the first lattice point, per channel.
+        domain_max: Input value mapped to the last lattice point, per channel.
+        title: The ``TITLE`` of the ``.cube`` file.
+        path: The file the LUT was loaded from, next to which its
+            :meth:`table_u8` tables are saved; ``None`` keeps them in memory.
+    """
+
+    table: np.ndarray
+    domain_min: tuple[float, float, float] = (0.0, 0.0, 0.0)
+    domain_max: tuple[float, float, float] = (1.0, 1.0, 1.0)
+    title: str = ""
+    path: str | None = None
+    _u8: dict[str, np.ndarray] = field(default_factory=dict, init=False, repr=False)
+    _graded: dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        size = self.table.shape[0]
+        if self.table.shape != (size, size, size, 3) or size < 2:
+            raise ValueError(f"a 3D LUT table must be shaped (N, N, N, 3) with N >= 2, not {self.table.shape}")
+
+    @property
+    def size(self) -> int:
+        return self.table.shape[0]
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> LUT3D:
+        """Read a ``.cube`` file (the Adobe / Resolve format)."""
+        path = os.fspath(path)
+        title, size = "", None
+        domain_min, domain_max = (0.0, 0.0, 0.0), (1.0, 1.0, 1.0)
+        data: list[str] = []
+        try:
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    line = line.split("#", 1)[0].strip()
+                    if not line:
+                        continue
+                    if line[0].isdigit() or line[0] in "-+.":
+                        data.append(line)
+                        continue
+                    keyword, _, value = line.partition(" ")
+                    if keyword == "TITLE":
+                        title = value.strip().strip('"')
+                    elif keyword == "LUT_3D_SIZE":
+                        size = int(value)
+                    elif keyword == "DOMAIN_MIN":
+                        domain_min = tuple(float(v) for v in value.split())
+                    elif keyword == "DOMAIN_MAX":
+                        domain_max = tuple(float(v) for v in value.split())
+                    elif keyword == "LUT_1D_SIZE":
+                        raise LUTError(f"{path!r} is a 1D LUT; only 3D LUTs are supported")
+                    elif keyword not in ("LUT_3D_INPUT_RANGE", "LUT_IN_VIDEO_RANGE", "LUT_OUT_VIDEO_RANGE"):
+                        raise LUTError(f"unknown keyword {keyword!r} in {path!r}")
+            if size is None:
+                raise LUTError(f"{path!r} has no LUT_3D_SIZE")
+            values = np.array(" ".join(data).split(), dtype=np.float32)
+        except (OSError, ValueError) as exc:
+            raise LUTError(f"cannot read LUT {path!r}: {exc}") from exc
+        if values.size != size**3 * 3:
+            raise LUTError(f"{path!r} has {values.size // 3} entries, expected {size**3}")
+        # Red varies fastest in the file, so the rows come out indexed [blue, green, red].
+        table = np.ascontiguousarray(values.reshape(size, size, size, 3).transpose(2, 1, 0, 3))
+        return cls(table, domain_min, domain_max, title, path)
+
+    def apply(self, frames: np.ndarray, method: str = "tetrahedral", out: np.ndarray | None = None) -> np.ndarray:
+        """Map a ``uint8`` or ``float32`` RGB batch (or frame) through the LUT by interpolation."""
+        if method not in METHODS:
+            raise ValueError(f"unknown interpolation {method!r}; expected one of {METHODS}")
+        out = _output(frames, out)
+        if not out.flags.c_contiguous:
+            out[...] = self.apply(frames, method)
+            return out
+        interpolate = _tetrahedral if method == "tetrahedral" else _trilinear
+        flat = self.table.reshape(-1, 3)
+        low = np.asarray(self.domain_min, dtype=np.float32)
+        scale = (self.size - 1) / (np.asarray(self.domain_max, dtype=np.float32) - low)
+        src, dst = frames.reshape(-1, 3), out.reshape(-1, 3)
+        for i in range(0, len(src), _CHUNK):
+            x = src[i : i + _CHUNK].astype(np.float32)
+            if frames.dtype == np.uint8:
+                x /= 255.0
+            x = np.clip((x - low) * scale, 0.0, self.size - 1)
+            base = np.minimum(x.astype(np.intp), self.size - 2)
+            mapped = np.clip(interpolate(flat, self.size, base, x - base), 0.0, 1.0)
+            if frames.dtype == np.uint8:
+                mapped = np.rint(mapped * 255.0)
+            dst[i : i + _CHUNK] = mapped
+        return out
+
+    def table_u8(self, method: str = "tetrahedral") -> np.ndarray:
+        """The LUT evaluated at every ``uint8`` colour: ``(256 ** 3, 3)`` ``uint8``, indexed ``r << 16 | g << 8 | b``.
+
+        Loaded from the LUT file's sidecar, or built on first use (a few
+        seconds) and saved there; kept for the lifetime of the LUT.
+        """
+        with self._lock:
+            table = self._u8.get(method)
+            if table is None:
+                if self.path is None:
+                    table = self._build_u8(method)
+                else:
+                    with _exclusive(self.path):
+                        table = load_or_build(
+                            lambda: self._load_u8(method),
+                            lambda: self._build_u8(method),
+                            lambda table: _TABLE_SIDECARS[method].save(self.path, table=table),
+                        )
+                self._u8[method] = table
+            return table
+
+    def has_table_u8(self, method: str = "tetrahedral") -> bool:
+        """Whether :meth:`table_u8` is ready without building anything, loading it from the sidecar if need be."""
+        with self._lock:
+            if method not in self._u8 and self.path is not None:
+                table = self._load_u8(method)
+                if table is not None:
+                    self._u8[method] = table
+            return method in self._u8
+
+    def _load_u8(self, method: str) -> np.ndarray | None:
+        return _TABLE_SIDECARS[method].load(self.path, lambda data: data["table"])
+
+    def _build_u8(self, method: str) -> np.ndarray:
+        codes = np.arange(_U8_COLOURS, dtype=np.uint32)
+        colours = np.empty((_U8_COLOURS, 3), dtype=np.uint8)
+        colours[:, 0] = codes >> 16
+        colours[:, 1] = (codes >> 8) & 0xFF
+        colours[:, 2] = codes & 0xFF
+        return self.apply(colours, method, out=colours)
+
+    def apply_u8(self, frames: np.ndarray, method: str = "tetrahedral", out: np.ndarray | None = None) -> np.ndarray:
+        """:meth:`apply` for ``uint8`` frames through the precomputed :meth:`table_u8`."""
+        if frames.dtype != np.uint8:
+            raise ValueError("apply_u8 needs uint8 frames")
+        table = self.table_u8(method)
+        out = _output(frames, out)
+        if not out.flags.c_contiguous:
+            out[...] = self.apply_u8(frames, method)
+            return out
+        src, dst = frames.reshape(-1, 3), out.reshape(-1, 3)
+        for i in range(0, len(src), _U8_CHUNK):
+            pixels = src[i : i + _U8_CHUNK]
+            codes = pixels[:, 0].astype(np.int32) << 16
+            codes |= pixels[:, 1].astype(np.int32) << 8
+            codes |= pixels[:, 2]
+            np.take(table, codes, axis=0, out=dst[i : i + _U8_CHUNK])
+        return out
+
+
+@contextmanager
+def _exclusive(path: str) -> Iterator[None]:
+    """Hold an advisory lock on ``path`` against other processes; does nothing where ``flock`` is not available."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "rb") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        yield
+
+
+_loaded: dict[tuple[str, int, int], LUT3D] = {}
+_loaded_lock = threading.Lock()
+
+
+def load_lut(path: str | os.PathLike) -> LUT3D:
+    """Load ``path``, reusing the copy already loaded in this process while the file is unchanged."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    with _loaded_lock:
+        lut = _loaded.get(key)
+        if lut is None:
+            for stale in [k for k in _loaded if k[0] == path]:
+                del _loaded[stale]
+            lut = _loaded[key] = LUT3D.load(path)
+        return lut
+
+
+@dataclass(frozen=True)
+class ColorLUT(Effect):
+    """Grade through the ``.cube`` LUT at ``path``.
+
+    ``float32`` batches are interpolated directly.  ``uint8`` batches go
+    through the precomputed 256³ table if ``precompute`` is true, and never
+    if it is false; by default they use it once it has been built (by any
+    process) or the LUT has graded as many pixels as building it costs, so
+    short renders never pay for it.
+    """
+
+    pointwise = True
+
+    path: str
+    method: str = "tetrahedral"
+    precompute: bool | None = None
+
+    def __post_init__(self):
+        if self.method not in METHODS:
+            raise ValueError(f"unknown interpolation {self.method!r}; expected one of {METHODS}")
+
+    def apply(self, frames, positions, length, out=None):
+        lut = load_lut(self.path)
+        if frames.dtype == np.uint8 and self.precompute is not False:
+            if self.precompute or lut.has_table_u8(self.method):
+                return lut.apply_u8(frames, self.method, out)
+            graded = lut._graded.get(self.method, 0) + frames.size // 3
+            lut._graded[self.method] = graded
+            if graded > _U8_COLOURS:
+                return lut.apply_u8(frames, self.method, out)
+        return lut.apply(frames, self.method, out)
+
+    def cache_token(self) -> str | None:
+        st = os.stat(self.path)
+        return f"{super().cache_token()}:{st.st_size}:{st.st_mtime_ns}"
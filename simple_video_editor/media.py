@@ -0,0 +1,82 @@
+"""Opening media files and describing their streams."""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from fractions import Fraction
+
+import av
+
+from .errors import MediaError
+
+
+@dataclass(frozen=True)
+class VideoInfo:
+    """Static properties of the first video stream of a media file."""
+
+    path: str
+    width: int
+    height: int
+    fps: Fraction
+    frame_count: int
+    time_base: Fraction
+    codec: str
+    pix_fmt: str
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds, derived from ``frame_count`` and ``fps``."""
+        return float(self.frame_count / self.fps) if self.fps else 0.0
+
+    @property
+    def frame_shape(self) -> tuple[int, int, int]:
+        """Shape of one decoded RGB frame as ``(height, width, 3)``."""
+        return (self.height, self.width, 3)
+
+
+def open_container(path: str | os.PathLike) -> av.container.InputContainer:
+    """Open ``path`` for reading, translating PyAV failures into :class:`MediaError`."""
+    try:
+        return av.open(os.fspath(path))
+    except (OSError, av.FFmpegError) as exc:
+        raise MediaError(f"cannot open {os.fspath(path)!r}: {exc}") from exc
+
+
+def video_stream(container: av.container.InputContainer) -> av.video.stream.VideoStream:
+    """Return the first video stream of ``container``."""
+    if not container.streams.video:
+        raise MediaError(f"{container.name!r} has no video stream")
+    return container.streams.video[0]
+
+
+def audio_stream(container: av.container.InputContainer) -> av.audio.stream.AudioStream | None:
+    """Return the first audio stream of ``container``, or ``None`` if it has none."""
+    return container.streams.audio[0] if container.streams.audio else None
+
+
+def has_audio(path: str | os.PathLike) -> bool:
+    with open_container(path) as container:
+        return audio_stream(container) is not None
+
+
+def probe_video(path: str | os.PathLike) -> VideoInfo:
+    """Read the header of ``path`` and describe its first video stream."""
+    with open_container(path) as container:
+        stream = video_stream(container)
+        fps = stream.average_rate or stream.guessed_rate or Fraction(0)
+        frame_count = stream.frames
+        if not frame_count and stream.duration is not None and fps:
+            frame_count = round(stream.duration * stream.time_base * fps)
+        elif not frame_count and container.duration is not None and fps:
+            frame_count = round(Fraction(container.duration, av.time_base) * fps)
+        return VideoInfo(
+            path=os.fspath(path),
+            width=stream.codec_context.width,
+            height=stream.codec_context.height,
+            fps=Fraction(fps),
+            frame_count=int(frame_count),
+            time_base=Fraction(stream.time_base),
+            codec=stream.codec_context.name,
+            pix_fmt=stream.codec_context.pix_fmt or "",
+        )
@@ -0,0 +1,295 @@
+"""Multi-resolution min/max peak summaries of audio tracks, for drawing waveforms.
+
+Every audio stream of a file is decoded once, in a single streaming pass, and
+reduced to the minimum and maximum sample of each block of
+:data:`BASE_BUCKET` samples, per channel.  Coarser levels each merge
+:data:`LEVEL_FACTOR` buckets of the level below, down to a single bucket, so a
+waveform at any zoom level is drawn from at most a few thousand buckets
+instead of the PCM.  Every level is built on the fly, as buckets of the level
+below complete, and appended to a temporary file as it grows; only the current
+partial bucket and fewer than :data:`LEVEL_FACTOR` unmerged buckets per level
+are held in memory, however long the track.
+
+Peaks are stored as ``int16``.  Like the keyframe index they are cached next to
+the media file, but in two parts: a small ``.npz`` sidecar with the
+fingerprint and layout, and a raw ``.peaks.bin`` file with the levels that is
+memory-mapped when loaded, so long tracks are never read into memory whole.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from dataclasses import dataclass
+
+import av
+import numpy as np
+
+from .errors import MediaError
+from .media import open_container
+from .sidecar import Sidecar, load_or_build
+
+SIDECAR_SUFFIX = ".peaks.npz"
+DATA_SUFFIX = ".peaks.bin"
+BASE_BUCKET = 256
+LEVEL_FACTOR = 4
+_SIDECAR = Sidecar(SIDECAR_SUFFIX, version=2)
+_SCALE = 32767.0
+_COPY_BUCKETS = 1 << 16
+
+
+def sidecar_path(path: str | os.PathLike) -> str:
+    """Return the sidecar file used to persist the peak summaries of ``path``."""
+    return _SIDECAR.path(path)
+
+
+def data_path(path: str | os.PathLike) -> str:
+    """Return the file holding the peak levels of ``path``, next to its sidecar."""
+    return os.fspath(path) + DATA_SUFFIX
+
+
+def _reduce(peaks: np.ndarray, factor: int) -> np.ndarray:
+    """Merge every ``factor`` consecutive buckets of ``peaks`` (the last group may be short)."""
+    starts = np.arange(0, len(peaks), factor)
+    return np.stack(
+        [np.minimum.reduceat(peaks[:, :, 0], starts), np.maximum.reduceat(peaks[:, :, 1], starts)], axis=-1
+    )
+
+
+class _Level:
+    """One level being built: its buckets so far, on disk, and those not yet merged into the next level."""
+
+    def __init__(self, channels: int):
+        self.channels = channels
+        self.file = tempfile.TemporaryFile(prefix="peaks-")
+        self.count = 0
+        self.carry = np.empty((0, channels, 2), dtype=np.int16)
+
+    def append(self, peaks: np.ndarray) -> np.ndarray:
+        """Append ``peaks`` and return the buckets of the next level they complete."""
+        self.file.write(np.ascontiguousarray(peaks, dtype=np.int16).tobytes())
+        self.count += len(peaks)
+        pending = np.concatenate([self.carry, peaks])
+        whole = len(pending) // LEVEL_FACTOR * LEVEL_FACTOR
+        self.carry = pending[whole:].copy()
+        return _reduce(pending[:whole], LEVEL_FACTOR) if whole else pending[:0]
+
+    def flush(self) -> np.ndarray:
+        """Return the last, short bucket of the next level, if this level needs one."""
+        carry, self.carry = self.carry, self.carry[:0]
+        return _reduce(carry, LEVEL_FACTOR) if len(carry) and self.count > 1 else carry[:0]
+
+    def peaks(self) -> np.ndarray:
+        """Map the finished level read-only; the temporary file goes away with the mapping."""
+        self.file.flush()
+        try:
+            if not self.count:
+                return np.empty((0, self.channels, 2), dtype=np.int16)
+            return np.memmap(self.file, dtype=np.int16, mode="r", shape=(self.count, self.channels, 2))
+        finally:
+            self.file.close()
+
+
+class _Builder:
+    """Builds every level of one audio stream from decoded frames.
+
+    Level-0 buckets are pushed up through the levels as they are emitted, each
+    level appending to its own temporary file, so memory use does not depend
+    on the length of the stream.
+    """
+
+    def __init__(self, sample_rate: int, channels: int):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.samples = 0
+        self.partial = np.empty((channels, BASE_BUCKET), dtype=np.float32)
+        self.filled = 0
+        self.levels = [_Level(channels)]
+
+    def add(self, pcm: np.ndarray) -> None:
+        """Add planar ``float32`` samples shaped ``(channels, n)``."""
+        self.samples += pcm.shape[1]
+        if self.filled:
+            take = min(BASE_BUCKET - self.filled, pcm.shape[1])
+            self.partial[:, self.filled : self.filled + take] = pcm[:, :take]
+            self.filled += take
+            pcm = pcm[:, take:]
+            if self.filled < BASE_BUCKET:
+                return
+            self._emit(self.partial[None])
+            self.filled = 0
+        whole = pcm.shape[1] // BASE_BUCKET * BASE_BUCKET
+        if whole:
+            # (channels, buckets, BASE_BUCKET) -> (buckets, channels, BASE_BUCKET)
+            self._emit(pcm[:, :whole].reshape(self.channels, -1, BASE_BUCKET).transpose(1, 0, 2))
+        rest = pcm.shape[1] - whole
+        self.partial[:, :rest] = pcm[:, whole:]
+        self.filled = rest
+
+    def _emit(self, blocks: np.ndarray) -> None:
+        peaks = np.stack([blocks.min(axis=-1), blocks.max(axis=-1)], axis=-1)
+        peaks = np.clip(peaks, -1.0, 1.0) * _SCALE
+        # Round outwards so a summary never understates a peak.
+        peaks[..., 0] = np.floor(peaks[..., 0])
+        peaks[..., 1] = np.ceil(peaks[..., 1])
+        self._push(0, peaks.astype(np.int16))
+
+    def _push(self, level: int, peaks: np.ndarray) -> None:
+        while len(peaks):
+            if level == len(self.levels):
+                self.levels.append(_Level(self.channels))
+            peaks = self.levels[level].append(peaks)
+            level += 1
+
+    def finish(self) -> PeakSummary:
+        if self.filled:
+            self._emit(self.partial[None, :, : self.filled])
+            self.filled = 0
+        # Levels are only added while the one below still has more than one bucket.
+        level = 0
+        while level < len(self.levels):
+            self._push(level + 1, self.levels[level].flush())
+            level += 1
+        return PeakSummary(self.sample_rate, self.samples, tuple(built.peaks() for built in self.levels))
+
+
+@dataclass(frozen=True, eq=False)
+class PeakSummary:
+    """Min/max peaks of one audio stream at successively coarser resolutions.
+
+    Attributes:
+        sample_rate: Sample rate of the stream in Hz.
+        samples: Number of samples per channel.
+        levels: ``int16`` arrays shaped ``(buckets, channels, 2)`` holding the
+            minimum and maximum of each bucket, scaled to ``[-32767, 32767]``.
+            A bucket of level ``k`` covers ``BASE_BUCKET * LEVEL_FACTOR ** k``
+            samples.
+    """
+
+    sample_rate: int
+    samples: int
+    levels: tuple[np.ndarray, ...]
+
+    @property
+    def channels(self) -> int:
+        return self.levels[0].shape[1]
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.sample_rate
+
+    @staticmethod
+    def bucket_size(level: int) -> int:
+        return BASE_BUCKET * LEVEL_FACTOR**level
+
+    @classmethod
+    def build(cls, path: str | os.PathLike) -> list[PeakSummary]:
+        """Decode every audio stream of ``path`` in one pass and summarise each."""
+        with open_container(path) as container:
+            streams = list(container.streams.audio)
+            if not streams:
+                return []
+            builders = {s.index: _Builder(s.codec_context.sample_rate, s.codec_context.channels) for s in streams}
+            resamplers = {s.index: av.AudioResampler(format="fltp") for s in streams}
+            try:
+                for packet in container.demux(*streams):
+                    index = packet.stream.index
+                    for frame in packet.decode():
+                        for planar in resamplers[index].resample(frame):
+                            builders[index].add(planar.to_ndarray())
+                for index, resampler in resamplers.items():
+                    for planar in resampler.resample(None):
+                        builders[index].add(planar.to_ndarray())
+            except av.FFmpegError as exc:
+                raise MediaError(f"cannot read audio of {os.fspath(path)!r}: {exc}") from exc
+        return [builder.finish() for builder in builders.values()]
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> list[PeakSummary] | None:
+        """Load the sidecar of ``path`` if it exists and still matches the media file.
+
+        The levels are memory-mapped from the data file rather than read.
+        """
+
+        def parse(data) -> list[PeakSummary] | None:
+            counts = iter(data["counts"].tolist())
+            layout = [
+                (sample_rate, samples, [(next(counts), channels, 2) for _ in range(levels)])
+                for sample_rate, samples, channels, levels in data["tracks"].tolist()
+            ]
+            total = sum(count * channels * 2 for _, _, shapes in layout for count, channels, _ in shapes)
+            if os.path.getsize(data_path(path)) != total * np.dtype(np.int16).itemsize:
+                return None
+            flat = np.memmap(data_path(path), dtype=np.int16, mode="r") if total else np.empty(0, dtype=np.int16)
+            summaries, offset = [], 0
+            for sample_rate, samples, shapes in layout:
+                levels = []
+                for shape in shapes:
+                    size = shape[0] * shape[1] * 2
+                    levels.append(flat[offset : offset + size].reshape(shape))
+                    offset += size
+                summaries.append(cls(sample_rate, samples, tuple(levels)))
+            return summaries
+
+        return _SIDECAR.load(path, parse)
+
+    @staticmethod
+    def save(path: str | os.PathLike, summaries: list[PeakSummary]) -> None:
+        """Write the summaries of every audio stream of ``path`` to its data file and sidecar, atomically.
+
+        Levels are copied a slice at a time, so memory-mapped ones are never read in whole.
+        """
+        target = data_path(path)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            for summary in summaries:
+                for peaks in summary.levels:
+                    for start in range(0, len(peaks), _COPY_BUCKETS):
+                        fh.write(np.ascontiguousarray(peaks[start : start + _COPY_BUCKETS]).tobytes())
+        os.replace(tmp, target)
+        tracks = np.array(
+            [[s.sample_rate, s.samples, s.channels, len(s.levels)] for s in summaries], dtype=np.int64
+        ).reshape(-1, 4)
+        counts = np.array([len(peaks) for s in summaries for peaks in s.levels], dtype=np.int64)
+        # The data file goes first: a sidecar is only ever next to the levels it describes.
+        _SIDECAR.save(path, tracks=tracks, counts=counts)
+
+    @classmethod
+    def for_source(cls, path: str | os.PathLike, *, persist: bool = True) -> list[PeakSummary]:
+        """Return the summaries of every audio stream of ``path``, loading or building its sidecar."""
+        return load_or_build(
+            lambda: cls.load(path), lambda: cls.build(path), lambda summaries: cls.save(path, summaries), persist
+        )
+
+    def waveform(self, start: float, stop: float, columns: int) -> np.ndarray:
+        """Peaks of seconds ``start`` to ``stop`` for drawing ``columns`` pixels wide.
+
+        Returns a ``float32`` array shaped ``(columns, channels, 2)`` with the
+        minimum and maximum in ``[-1, 1]`` of each column, taken from the
+        coarsest level that still has at least one bucket per column.  Columns
+        narrower than :data:`BASE_BUCKET` samples repeat level-0 buckets.
+        """
+        if columns < 1 or stop <= start:
+            raise ValueError("waveform needs at least one column and stop > start")
+        first, last = start * self.sample_rate, stop * self.sample_rate
+        per_column = (last - first) / columns
+        level = 0
+        while level + 1 < len(self.levels) and self.bucket_size(level + 1) <= per_column:
+            level += 1
+        peaks = self.levels[level]
+        out = np.zeros((columns, self.channels, 2), dtype=np.float32)
+        if not len(peaks):
+            return out
+        size = self.bucket_size(level)
+        edges = first + per_column * np.arange(columns + 1)
+        lo = np.floor(edges[:-1] / size).astype(np.int64)
+        hi = np.maximum(np.ceil(edges[1:] / size).astype(np.int64), lo + 1)
+        inside = (lo < len(peaks)) & (hi > 0)
+        peaks = peaks[: max(min(int(hi[-1]), len(peaks)), 1)]
+        lo = np.clip(lo, 0, len(peaks) - 1)
+        last = np.clip(hi - 1, 0, len(peaks) - 1)
+        # reduceat covers lo[i] up to lo[i + 1]; add the bucket shared with the next column.
+        out[..., 0] = np.minimum(np.minimum.reduceat(peaks[:, :, 0], lo), peaks[last, :, 0]) / _SCALE
+        out[..., 1] = np.maximum(np.maximum.reduceat(peaks[:, :, 1], lo), peaks[last, :, 1]) / _SCALE
+        out[~inside] = 0.0
+        return out
@@ -0,0 +1,108 @@
+"""Threaded pipelines with bounded queues between stages.
+
+:func:`pipeline` runs an iterable and a chain of generator stages each in its
+own thread, connected by queues holding at most ``depth`` items.  A slow stage
+makes the queue in front of it fill up, which blocks the stages before it
+(backpressure), so memory stays bounded while reading, decoding, processing,
+encoding and writing overlap.  FFmpeg releases the GIL while it decodes,
+encodes and does file I/O, so the stages run concurrently in practice.
+
+The last stage's output is yielded in the calling thread.  An exception in
+any stage is re-raised there, and closing the returned generator early stops
+every thread.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator
+
+DEFAULT_PIPELINE_DEPTH = 8
+
+# How often blocked threads check whether the pipeline was stopped, in seconds.
+_POLL = 0.05
+
+Stage = Callable[[Iterator[Any]], Iterable[Any]]
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> None:
+    while True:
+        if stop.is_set():
+            raise _Stopped
+        try:
+            q.put(item, timeout=_POLL)
+            return
+        except queue.Full:
+            pass
+
+
+def _drain(q: queue.Queue, stop: threading.Event) -> Iterator[Any]:
+    while True:
+        try:
+            item = q.get(timeout=_POLL)
+        except queue.Empty:
+            if stop.is_set():
+                raise _Stopped from None
+            continue
+        if item is _END:
+            return
+        if isinstance(item, _Failure):
+            raise item.error
+        yield item
+
+
+def _feed(produce: Callable[[], Iterable[Any]], q: queue.Queue, stop: threading.Event) -> None:
+    try:
+        for item in produce():
+            _put(q, item, stop)
+        _put(q, _END, stop)
+    except _Stopped:
+        pass
+    except BaseException as error:
+        try:
+            _put(q, _Failure(error), stop)
+        except _Stopped:
+            pass
+
+
+def pipeline(items: Iterable[Any], *stages: Stage, depth: int = DEFAULT_PIPELINE_DEPTH) -> Iterator[Any]:
+    """Iterate ``items`` and pass them through ``stages``, each running in its own thread.
+
+    Args:
+        items: The input; iterated in a thread of its own, so a generator that
+            reads or decodes overlaps with the stages after it.
+        stages: Callables that take an iterator of the previous stage's
+            output and return an iterable of their own, usually generators.
+        depth: Maximum number of items waiting between two stages.
+    """
+    if depth < 1:
+        raise ValueError("pipeline depth must be at least 1")
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=depth) for _ in range(len(stages) + 1)]
+    producers: list[Callable[[], Iterable[Any]]] = [lambda: items]
+    for stage, inbox in zip(stages, queues):
+        producers.append(lambda stage=stage, inbox=inbox: stage(_drain(inbox, stop)))
+    threads = [
+        threading.Thread(target=_feed, args=(produce, q, stop), name=f"sve-pipeline-{i}", daemon=True)
+        for i, (produce, q) in enumerate(zip(producers, queues))
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        yield from _drain(queues[-1], stop)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,353 @@
+"""Project files saved as an append-only edit log.
+
+A project file is a text file of one record per line.  The first line holds
+the timeline settings; every later line records the state of one clip or
+transition, or its removal:
+
+.. code-block:: text
+
+    SVE-PROJECT 2 {"width": 1920, "height": 1080, "fps": "25"}
+    C <id> <start> <end> <track> {"source": ..., "in": ..., "out": ..., ...}
+    D <id>
+    T <id> <start> <stop>
+    X <id>
+
+The last record for an id wins.  :meth:`Project.save` appends one record per
+item changed since the previous save, so saving costs time proportional to
+the edit, not the project.  Once the log holds more than ``compact_after``
+records and twice as many records as live items, it is rewritten with one
+record per item (atomically, through a temporary file).  A line cut short by
+a crash is ignored on load.  Files in an older format are read, and rewritten in
+the current one by the first save.
+
+Clip records carry their placement in plain text before the JSON, so
+:meth:`Project.open` only splits lines; a clip's JSON is parsed when the clip
+is first needed, either through :meth:`Project.clips_between` for the visible
+part of the timeline or :attr:`Project.timeline` for all of it.
+"""
+
+from __future__ import annotations
+
+import importlib
+import json
+import os
+from dataclasses import fields, is_dataclass
+from fractions import Fraction
+
+import numpy as np
+
+from .effects import Effect
+from .errors import VideoEditorError
+from .timeline import Clip, Envelope, Timeline, Transition
+
+MAGIC = "SVE-PROJECT"
+FORMAT_VERSION = 2
+DEFAULT_COMPACT_AFTER = 1000
+
+
+class ProjectError(VideoEditorError):
+    """A project file cannot be read."""
+
+
+def _effect_to_json(effect: Effect) -> dict:
+    if not is_dataclass(effect):
+        raise TypeError(f"cannot save effect {effect!r}: only dataclass effects are serialisable")
+    cls = type(effect)
+    return {
+        "type": f"{cls.__module__}:{cls.__qualname__}",
+        "args": {f.name: getattr(effect, f.name) for f in fields(effect)},
+    }
+
+
+def _effect_from_json(data: dict) -> Effect:
+    module, _, name = data["type"].partition(":")
+    cls = importlib.import_module(module)
+    for part in name.split("."):
+        cls = getattr(cls, part)
+    if not (isinstance(cls, type) and issubclass(cls, Effect)):
+        raise ProjectError(f"{data['type']!r} is not an effect")
+    return cls(**data["args"])
+
+
+def clip_to_json(clip: Clip) -> str:
+    gain = clip.gain
+    record = {
+        "source": clip.source,
+        "in": clip.in_frame,
+        "out": clip.out_frame,
+        "effects": [_effect_to_json(effect) for effect in clip.effects],
+        "gain": gain,
+    }
+    if isinstance(gain, Envelope):
+        record["gain"] = {"frames": gain.frames.tolist(), "values": gain.values.tolist()}
+    if clip.opacity != 1.0:
+        record["opacity"] = clip.opacity
+    if clip.box is not None:
+        record["box"] = list(clip.box)
+    return json.dumps(record, separators=(",", ":"))
+
+
+def clip_from_json(text: str, start: int, track: int) -> Clip:
+    record = json.loads(text)
+    gain = record.get("gain", 1.0)
+    if isinstance(gain, dict) and "envelope" in gain:
+        gain = Envelope(map(tuple, gain["envelope"]))  # Format 1 stored a list of points.
+    elif isinstance(gain, dict):
+        gain = Envelope.from_arrays(gain["frames"], gain["values"])
+    return Clip(
+        record["source"],
+        record["in"],
+        record["out"],
+        start=start,
+        track=track,
+        effects=[_effect_from_json(e) for e in record.get("effects", [])],
+        gain=gain,
+        opacity=record.get("opacity", 1.0),
+        box=record.get("box"),
+    )
+
+
+class _ClipRecord:
+    """A clip as read from the log: its placement, and its JSON until it is parsed."""
+
+    __slots__ = ("start", "end", "track", "text", "clip")
+
+    def __init__(self, start: int, end: int, track: int, text: str | None, clip: Clip | None = None):
+        self.start = start
+        self.end = end
+        self.track = track
+        self.text = text
+        self.clip = clip
+
+    def materialise(self) -> Clip:
+        if self.clip is None:
+            self.clip = clip_from_json(self.text, self.start, self.track)
+            self.text = None
+        return self.clip
+
+
+class Project:
+    """A timeline backed by an edit-log project file.
+
+    Use :meth:`create` for a new file and :meth:`open` for an existing one.
+    Edit clips through :meth:`add_clip`, :meth:`update_clip` and friends, or
+    change them directly and call :meth:`touch`; :meth:`save` then appends
+    just those changes.
+    """
+
+    def __init__(self, path: str | os.PathLike, width: int, height: int, fps: Fraction, *, compact_after: int):
+        self.path = os.fspath(path)
+        self.width = width
+        self.height = height
+        self.fps = Fraction(fps)
+        self.compact_after = compact_after
+        self._records: dict[int, _ClipRecord] = {}
+        self._transitions: dict[int, Transition] = {}
+        self._ids: dict[Clip | Transition, int] = {}
+        self._dirty: set[int] = set()
+        self._removed: dict[int, str] = {}
+        self._next_id = 0
+        self._log_records = 0
+        self._timeline: Timeline | None = None
+        self._rewrite = False
+
+    @classmethod
+    def create(
+        cls, path: str | os.PathLike, timeline: Timeline, *, compact_after: int = DEFAULT_COMPACT_AFTER
+    ) -> Project:
+        """Write ``timeline`` to a new project file at ``path``."""
+        project = cls(path, timeline.width, timeline.height, timeline.fps, compact_after=compact_after)
+        project._timeline = timeline
+        for clip in timeline.clips:
+            project._register(clip)
+        for transition in timeline.transitions:
+            project._register(transition)
+        project.compact()
+        return project
+
+    @classmethod
+    def open(cls, path: str | os.PathLike, *, compact_after: int = DEFAULT_COMPACT_AFTER) -> Project:
+        """Read the log at ``path`` without parsing clip records."""
+        path = os.fspath(path)
+        try:
+            with open(path, encoding="utf-8") as fh:
+                header = fh.readline().split(" ", 2)
+                if len(header) != 3 or header[0] != MAGIC:
+                    raise ProjectError(f"{path!r} is not a project file")
+                if int(header[1]) > FORMAT_VERSION:
+                    raise ProjectError(f"{path!r} needs a newer version (format {header[1]})")
+                settings = json.loads(header[2])
+                project = cls(
+                    path, settings["width"], settings["height"], Fraction(settings["fps"]), compact_after=compact_after
+                )
+                project._rewrite = int(header[1]) < FORMAT_VERSION  # Upgrade rather than append.
+                for line in fh:
+                    if line.endswith("\n"):
+                        project._replay(line[:-1])
+                    else:
+                        project._rewrite = True  # Torn by a crash; rewrite rather than append after it.
+        except (OSError, ValueError, KeyError) as exc:
+            raise ProjectError(f"cannot read project {path!r}: {exc}") from exc
+        return project
+
+    def _replay(self, line: str) -> None:
+        kind, _, rest = line.partition(" ")
+        if kind == "C":
+            item, start, end, track, text = rest.split(" ", 4)
+            self._records[int(item)] = _ClipRecord(int(start), int(end), int(track), text)
+        elif kind == "D":
+            self._records.pop(int(rest), None)
+        elif kind == "T":
+            item, start, stop = map(int, rest.split(" "))
+            # A later record replaces the transition; its old object must not keep the id.
+            self._ids.pop(self._transitions.get(item), None)
+            self._transitions[item] = Transition(start, stop)
+            self._ids[self._transitions[item]] = item
+        elif kind == "X":
+            self._ids.pop(self._transitions.pop(int(rest), None), None)
+        else:
+            raise ValueError(f"unknown record {kind!r}")
+        self._next_id = max(self._next_id, int(rest.split(" ", 1)[0]) + 1)
+        self._log_records += 1
+
+    @property
+    def timeline(self) -> Timeline:
+        """The whole timeline; parses every clip not parsed yet on first access."""
+        if self._timeline is None:
+            clips = [record.materialise() for record in self._records.values()]
+            self._timeline = Timeline(self.width, self.height, self.fps, clips, list(self._transitions.values()))
+            self._ids.update((clip, item) for item, clip in zip(self._records, clips))
+            self._ids.update((t, item) for item, t in self._transitions.items())
+        return self._timeline
+
+    def placements(self) -> np.ndarray:
+        """``(start, end, track)`` of every clip as an ``(N, 3)`` array, without parsing any."""
+        return np.array([(r.start, r.end, r.track) for r in self._records.values()], dtype=np.int64).reshape(-1, 3)
+
+    def clips_between(self, start: int, stop: int) -> list[Clip]:
+        """Clips overlapping timeline frames ``start`` to ``stop``, parsing only those."""
+        clips = []
+        for item, record in self._records.items():
+            if record.start < stop and record.end > start:
+                clip = record.materialise()
+                self._ids[clip] = item
+                clips.append(clip)
+        return clips
+
+    def _register(self, item: Clip | Transition) -> int:
+        ident = self._next_id
+        self._next_id += 1
+        self._ids[item] = ident
+        if isinstance(item, Clip):
+            self._records[ident] = _ClipRecord(item.start, item.end, item.track, None, item)
+        else:
+            self._transitions[ident] = item
+        self._dirty.add(ident)
+        return ident
+
+    def touch(self, item: Clip | Transition) -> None:
+        """Mark a clip or transition changed outside the project's methods, so it is saved."""
+        ident = self._ids[item]
+        if isinstance(item, Clip):
+            record = self._records[ident]
+            record.start, record.end, record.track = item.start, item.end, item.track
+        if self._timeline is not None:
+            self._timeline.moved(item)
+        self._dirty.add(ident)
+
+    def add_clip(self, clip: Clip) -> Clip:
+        if self._timeline is not None:
+            self._timeline.add(clip)
+        self._register(clip)
+        return clip
+
+    def remove_clip(self, clip: Clip) -> None:
+        if self._timeline is not None:
+            self._timeline.remove(clip)
+        ident = self._ids.pop(clip)
+        del self._records[ident]
+        self._dirty.discard(ident)
+        self._removed[ident] = "D"
+
+    def update_clip(self, clip: Clip, **changes) -> None:
+        """Change attributes of ``clip`` (``start``, ``effects``, ``gain``, ...)."""
+        previous = {name: getattr(clip, name) for name in changes}
+        for name, value in changes.items():
+            setattr(clip, name, value)
+        try:
+            clip.__post_init__()
+        except ValueError:
+            for name, value in previous.items():
+                setattr(clip, name, value)
+            raise
+        self.touch(clip)
+
+    def add_transition(self, start: int, stop: int) -> Transition:
+        if self._timeline is not None:
+            transition = self._timeline.add_transition(start, stop)
+        else:
+            transition = Transition(start, stop)
+        self._register(transition)
+        return transition
+
+    def remove_transition(self, transition: Transition) -> None:
+        if self._timeline is not None:
+            self._timeline.remove_transition(transition)
+        ident = self._ids.pop(transition)
+        del self._transitions[ident]
+        self._dirty.discard(ident)
+        self._removed[ident] = "X"
+
+    def transitions(self) -> list[Transition]:
+        return list(self._transitions.values())
+
+    def save(self) -> int:
+        """Append the changes since the last save; returns the number of records written.
+
+        Compacts the file instead when the log has grown well past the
+        number of live items, or when it is torn or in an older format.
+        """
+        lines = [self._record_line(ident) for ident in sorted(self._dirty)]
+        lines += [f"{kind} {ident}" for ident, kind in sorted(self._removed.items())]
+        if not lines and not self._rewrite:
+            return 0
+        live = len(self._records) + len(self._transitions)
+        if self._rewrite or self._log_records + len(lines) > max(self.compact_after, 2 * live):
+            return self.compact()
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write("".join(line + "\n" for line in lines))
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._log_records += len(lines)
+        self._dirty.clear()
+        self._removed.clear()
+        return len(lines)
+
+    def compact(self) -> int:
+        """Rewrite the file with one record per live clip and transition; returns the record count."""
+        settings = {"width": self.width, "height": self.height, "fps": str(self.fps)}
+        lines = [f"{MAGIC} {FORMAT_VERSION} {json.dumps(settings)}"]
+        lines += [self._record_line(ident) for ident in sorted(self._records)]
+        lines += [self._record_line(ident) for ident in sorted(self._transitions)]
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write("".join(line + "\n" for line in lines))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+        self._log_records = len(lines) - 1
+        self._rewrite = False
+        self._dirty.clear()
+        self._removed.clear()
+        return self._log_records
+
+    def _record_line(self, ident: int) -> str:
+        transition = self._transitions.get(ident)
+        if transition is not None:
+            return f"T {ident} {transition.start} {transition.stop}"
+        record = self._records[ident]
+        if record.clip is None:
+            text = record.text  # Never parsed, so unchanged since it was read.
+        else:
+            text = clip_to_json(record.clip)
+        return f"C {ident} {record.start} {record.end} {record.track} {text}"
@@ -0,0 +1,254 @@
+"""Low-resolution, intra-frame proxy media for responsive previews.
+
+A :class:`ProxyManager` transcodes sources into small MJPEG files in a proxy
+directory.  Every proxy frame is a keyframe, so seeking in a proxy never
+decodes more than one frame.  Proxies keep the source's frame count, so frame
+``i`` of a proxy shows frame ``i`` of its source.
+
+Generation runs in a process pool, indexing and joining included, so starting
+it never blocks the caller.  Each source is transcoded in chunks of
+``chunk_frames`` frames that are written to their own files and joined by
+packet copy once all are done, so chunks of different files (and of one long
+file) are encoded in parallel, and an interrupted run resumes from the
+chunks it already finished.  Proxy names include the source's size and
+modification time, so editing a source makes its old proxy unused.
+
+Previews pick proxies up through :meth:`ProxyManager.resolve`; export keeps
+reading the original media.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from fractions import Fraction
+from typing import Callable, Iterable
+
+import av
+
+from .decoder import decode_from
+from .export import SegmentPiece, concat_segments
+from .keyframes import KeyframeIndex
+from .media import open_container, probe_video, video_stream
+
+DEFAULT_CHUNK_FRAMES = 1500
+
+
+@dataclass(frozen=True)
+class ProxySettings:
+    """How proxies are encoded."""
+
+    height: int = 360
+    codec: str = "mjpeg"
+    pix_fmt: str = "yuvj420p"
+    options: dict[str, str] = field(default_factory=lambda: {"qmin": "3", "qmax": "8"})
+    suffix: str = ".proxy.mkv"
+
+
+@dataclass(frozen=True)
+class _Chunk:
+    source: str
+    start: int
+    stop: int
+    path: str
+
+
+class ProxyJob:
+    """Handle on a running :meth:`ProxyManager.generate` call."""
+
+    def __init__(self, futures: dict[str, Future]):
+        self.futures = futures
+
+    def done(self) -> bool:
+        return all(f.done() for f in self.futures.values())
+
+    def wait(self) -> dict[str, str]:
+        """Block until every proxy is written; returns ``{source: proxy path}``.
+
+        Re-raises the first error of a failed source.
+        """
+        return {source: future.result() for source, future in self.futures.items()}
+
+
+class ProxyManager:
+    """Create proxies in ``proxy_dir`` and map sources to them.
+
+    Args:
+        proxy_dir: Directory holding the proxies and their partial chunks.
+        settings: Proxy encoding settings.
+        workers: Size of the process pool used by :meth:`generate`.
+        chunk_frames: Frames per independently encoded (and resumable) chunk.
+    """
+
+    def __init__(
+        self,
+        proxy_dir: str | os.PathLike,
+        settings: ProxySettings | None = None,
+        *,
+        workers: int | None = None,
+        chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+    ):
+        self.proxy_dir = os.fspath(proxy_dir)
+        self.settings = settings or ProxySettings()
+        self.workers = workers
+        self.chunk_frames = chunk_frames
+        self._pool: ProcessPoolExecutor | None = None
+        os.makedirs(self.proxy_dir, exist_ok=True)
+
+    def __enter__(self) -> ProxyManager:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self, wait: bool = True) -> None:
+        """Shut the worker pool down; unfinished chunks are picked up by the next run."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=not wait)
+            self._pool = None
+
+    def proxy_path(self, source: str | os.PathLike) -> str:
+        """Where the proxy of ``source`` is (or will be) stored."""
+        source = os.path.abspath(source)
+        st = os.stat(source)
+        digest = hashlib.sha1(f"{source}\0{st.st_size}\0{st.st_mtime_ns}".encode()).hexdigest()[:16]
+        stem = os.path.splitext(os.path.basename(source))[0]
+        return os.path.join(self.proxy_dir, f"{stem}-{digest}{self.settings.suffix}")
+
+    def has_proxy(self, source: str | os.PathLike) -> bool:
+        return os.path.exists(self.proxy_path(source))
+
+    def resolve(self, source: str | os.PathLike, *, preview: bool = True) -> str:
+        """The file to read for ``source``: its proxy when previewing and one exists, else the source."""
+        if preview:
+            proxy = self.proxy_path(source)
+            if os.path.exists(proxy):
+                return proxy
+        return os.fspath(source)
+
+    def generate(
+        self, sources: Iterable[str | os.PathLike], *, on_ready: Callable[[str], None] | None = None
+    ) -> ProxyJob:
+        """Start building proxies for ``sources`` in the background.
+
+        Sources that already have a proxy complete immediately.  Indexing,
+        encoding and joining all run in the worker pool, so this returns
+        straight away, and a source that fails only fails its own future.
+        ``on_ready`` is called with each source path once its proxy exists,
+        before its future completes; it runs on a worker-management thread.
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        futures: dict[str, Future] = {}
+        for source in dict.fromkeys(os.fspath(s) for s in sources):
+            futures[source] = self._generate_one(source, on_ready)
+        return ProxyJob(futures)
+
+    def _generate_one(self, source: str, on_ready: Callable[[str], None] | None) -> Future:
+        result: Future = Future()
+
+        def ready(target: str) -> None:
+            if on_ready is not None:
+                on_ready(source)
+            result.set_result(target)
+
+        def join(chunks: list[_Chunk]) -> None:
+            _then(self._pool.submit(_join_chunks, source, target, chunks), result, ready)
+
+        def encode(chunks: list[_Chunk]) -> None:
+            pending = [c for c in chunks if not os.path.exists(c.path)]
+            if not pending:
+                join(chunks)
+                return
+            remaining = len(pending)
+            lock = threading.Lock()  # Callbacks of chunks already done run on this thread, the rest on another.
+
+            def chunk_done(_: str) -> None:
+                nonlocal remaining
+                with lock:
+                    remaining -= 1
+                    last = remaining == 0
+                if last:
+                    join(chunks)
+
+            for chunk in pending:
+                _then(self._pool.submit(_encode_chunk, chunk, self.settings), result, chunk_done)
+
+        try:
+            target = self.proxy_path(source)
+            if os.path.exists(target):
+                ready(target)
+            else:
+                _then(self._pool.submit(_plan_chunks, source, target, self.chunk_frames), result, encode)
+        except Exception as exc:
+            result.set_exception(exc)
+        return result
+
+
+def _then(future: Future, result: Future, step: Callable) -> None:
+    """Once ``future`` is done, pass its value to ``step``, or its error (or ``step``'s) to ``result``."""
+
+    def callback(future: Future) -> None:
+        if result.done():
+            return
+        try:
+            step(future.result())
+        except Exception as exc:
+            if not result.done():
+                result.set_exception(exc)
+
+    future.add_done_callback(callback)
+
+
+def _plan_chunks(source: str, target: str, chunk_frames: int) -> list[_Chunk]:
+    frames = len(KeyframeIndex.for_source(source))
+    return [
+        _Chunk(source, start, min(start + chunk_frames, frames), f"{target}.part{n:05d}")
+        for n, start in enumerate(range(0, frames, chunk_frames))
+    ]
+
+
+def _join_chunks(source: str, target: str, chunks: list[_Chunk]) -> str:
+    tmp = f"{target}.tmp{os.path.splitext(target)[1]}"
+    fps = probe_video(source).fps or Fraction(25)
+    concat_segments([SegmentPiece(c.path, c.start) for c in chunks], tmp, fps)
+    os.replace(tmp, target)
+    for chunk in chunks:
+        os.remove(chunk.path)
+    return target
+
+
+def proxy_size(width: int, height: int, proxy_height: int) -> tuple[int, int]:
+    """Proxy dimensions for a ``width`` x ``height`` source: even, aspect-preserving, never upscaled."""
+    if height <= proxy_height:
+        return width - width % 2, height - height % 2
+    scaled = round(width * proxy_height / height)
+    return scaled - scaled % 2, proxy_height - proxy_height % 2
+
+
+def _encode_chunk(chunk: _Chunk, settings: ProxySettings) -> str:
+    info = probe_video(chunk.source)
+    width, height = proxy_size(info.width, info.height, settings.height)
+    fps = info.fps or Fraction(25)
+    time_base = Fraction(1) / fps
+    index = KeyframeIndex.for_source(chunk.source)
+    partial = f"{chunk.path}.tmp{os.path.splitext(settings.suffix)[1]}"
+    with open_container(chunk.source) as container, av.open(partial, "w") as output:
+        stream = video_stream(container)
+        stream.thread_type = "AUTO"
+        out = output.add_stream(settings.codec, rate=fps, options=dict(settings.options))
+        out.width, out.height, out.pix_fmt = width, height, settings.pix_fmt
+        out.time_base = time_base
+        for position, frame in decode_from(container, stream, chunk.start, index):
+            if position >= chunk.stop:
+                break
+            small = frame.reformat(width=width, height=height, format=settings.pix_fmt)
+            small.pts = position - chunk.start
+            small.time_base = time_base
+            output.mux(out.encode(small))
+        output.mux(out.encode())
+    os.replace(partial, chunk.path)
+    return chunk.path
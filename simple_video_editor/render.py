@@ -0,0 +1,261 @@
+"""Turning a range of a :class:`~simple_video_editor.timeline.Timeline` into frames.
+
+Frames are rendered as ``rgb24`` by default.  With ``pixel_format="yuv420p"``
+sources are decoded, scaled, blended and faded in planar YUV, and converted
+to RGB only around effects that need it (see :mod:`simple_video_editor.yuv`).
+Either way the decoder scales sources to the timeline size, or to the size of
+the clip's box, as it converts them out of the codec, so full-size frames
+never leave it.
+
+Where clips overlap, :func:`~simple_video_editor.composite.stack` decides
+which of them show before any is decoded; clips hidden by an opaque clip
+above them are never opened.  A bottom layer that fills the frame and is
+opaque is rendered straight into the output batch, and every other layer is
+blended over it within its own box.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator
+
+import numpy as np
+
+from .composite import alpha, draw, stack
+from .decoder import DEFAULT_BUFFER_SIZE, FrameDecoder
+from .effects import Region, apply_chain
+from .render_cache import RenderCache, frame_key
+from .scale import resize
+from .timeline import Clip, Timeline
+from .yuv import RGB24, YUV420P, fill_black, frame_shape
+
+DEFAULT_BATCH_SIZE = 8
+
+
+def spans(timeline: Timeline, start: int, stop: int) -> Iterator[tuple[int, int]]:
+    """Split ``[start, stop)`` at the timeline's cut points.
+
+    The set of active clips is constant within each yielded ``(start, stop)``.
+    """
+    points = [p for p in timeline.cut_points() if start < p < stop]
+    for lo, hi in zip([start, *points], [*points, stop]):
+        yield lo, hi
+
+
+def fit(image: np.ndarray, width: int, height: int, filter: str = "bilinear") -> np.ndarray:
+    """Return ``image`` resized to ``width`` x ``height`` if it is not that size already."""
+    if image.shape[:2] == (height, width):
+        return image
+    return resize(image, width, height, filter)
+
+
+def _blank(shape: tuple[int, ...], pixel_format: str) -> np.ndarray:
+    black = np.zeros(shape, dtype=np.uint8)
+    return fill_black(black) if pixel_format == YUV420P else black
+
+
+def _clip_frames(
+    timeline: Timeline,
+    clip: Clip,
+    start: int,
+    stop: int,
+    buffer_size: int,
+    pixel_format: str = RGB24,
+    scale_filter: str = "bilinear",
+    size: tuple[int, int] | None = None,
+) -> Iterator[np.ndarray]:
+    rendered = start
+    width, height = size if size is not None else (timeline.width, timeline.height)
+    # The decoder converts and scales in one pass, straight to the size the clip is drawn at.
+    with FrameDecoder(
+        clip.source,
+        buffer_size=buffer_size,
+        start=clip.source_frame(start),
+        stop=clip.source_frame(stop),
+        pixel_format=pixel_format,
+        size=(width, height),
+        filter=scale_filter,
+    ) as decoder:
+        for frame in decoder:
+            yield frame.image
+            rendered += 1
+    # Sources shorter than the clip claims are padded rather than shifting later frames.
+    black = _blank(frame_shape(width, height, pixel_format), pixel_format)
+    for _ in range(rendered, stop):
+        yield black
+
+
+class _Layer:
+    """The frames of one clip over a span, read from the render cache or decoded.
+
+    Frames are ``size``, the size of the clip's box; the timeline size by default.
+    """
+
+    def __init__(
+        self,
+        timeline: Timeline,
+        clip: Clip,
+        start: int,
+        stop: int,
+        buffer_size: int,
+        render_cache: RenderCache | None,
+        pixel_format: str = RGB24,
+        scale_filter: str = "bilinear",
+        size: tuple[int, int] | None = None,
+    ):
+        self.timeline = timeline
+        self.clip = clip
+        self.start = start
+        self.stop = stop
+        self.buffer_size = buffer_size
+        self.render_cache = render_cache
+        self.pixel_format = pixel_format
+        self.scale_filter = scale_filter
+        self.size = size = size if size is not None else (timeline.width, timeline.height)
+        self.keys: list[str | None] | None = None
+        if render_cache is not None and clip.effects:
+            keys = [frame_key(clip, frame, size, pixel_format, scale_filter) for frame in range(start, stop)]
+            if None not in keys:
+                self.keys = keys
+        self.frames: Iterator[np.ndarray] | None = None
+        if self.keys is None or not all(key in render_cache for key in self.keys):
+            self.frames = _clip_frames(timeline, clip, start, stop, buffer_size, pixel_format, scale_filter, size)
+
+    def fill(self, batch: np.ndarray, first: int) -> None:
+        """Write the frames ``first`` to ``first + len(batch) - 1`` of the clip into ``batch``."""
+        n = len(batch)
+        offset = first - self.start
+        i = 0
+        if self.frames is None:
+            while i < n and self.render_cache.read(self.keys[offset + i], batch[i]):
+                i += 1
+            if i == n:
+                return
+            # An entry vanished (pruned concurrently); decode from here on.
+            self.frames = _clip_frames(
+                self.timeline,
+                self.clip,
+                first + i,
+                self.stop,
+                self.buffer_size,
+                self.pixel_format,
+                self.scale_filter,
+                self.size,
+            )
+        for j in range(i, n):
+            batch[j] = next(self.frames)
+        clip = self.clip
+        if clip.effects:
+            positions = np.arange(first + i - clip.start, first + n - clip.start)
+            apply_chain(clip.effects, batch[i:], positions, clip.duration, pixel_format=self.pixel_format)
+            if self.keys is not None:
+                for j in range(i, n):
+                    self.render_cache.write(self.keys[offset + j], batch[j])
+
+    def close(self) -> None:
+        if self.frames is not None:
+            self.frames.close()
+
+
+def render_batches(
+    timeline: Timeline,
+    start: int = 0,
+    stop: int | None = None,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    render_cache: RenderCache | None = None,
+    pixel_format: str = RGB24,
+    scale_filter: str = "bilinear",
+) -> Iterator[np.ndarray]:
+    """Yield the timeline frames ``start`` to ``stop`` in ``(n, height, width, 3)`` batches.
+
+    With ``pixel_format="yuv420p"`` the batches are ``(n, height * 3 // 2,
+    width)`` planar YUV instead.  Sources of another size are scaled with
+    ``scale_filter`` (see :mod:`simple_video_editor.scale`).
+
+    A batch never spans a cut point, so each one comes from a fixed stack of
+    clips (or a gap), composited as described in
+    :mod:`simple_video_editor.composite`, and each clip's effects are applied
+    to the whole batch at once.  Every batch is a view into a reused
+    buffer and is only valid until the next one is requested.
+
+    With a ``render_cache``, the output of clips with effects is stored on
+    disk, and spans whose frames are all cached are read back without
+    decoding or applying effects.
+    """
+    stop = timeline.duration if stop is None else stop
+    shape = (batch_size, *frame_shape(timeline.width, timeline.height, pixel_format))
+    batch = np.empty(shape, dtype=np.uint8)
+    black = _blank(shape[1:], pixel_format)
+    # One buffer per layer size: layers are filled and drawn one at a time.
+    scratch: dict[tuple[int, int], np.ndarray] = {}
+    for lo, hi in spans(timeline, start, stop):
+        active = timeline.active(lo)
+        transition = timeline.transition_at(lo)
+        fading = active[-1] if transition is not None and len(active) > 1 else None
+        stacked = stack(active, timeline.width, timeline.height, pixel_format, fading)
+        if not stacked:
+            for first in range(lo, hi, batch_size):
+                n = min(batch_size, hi - first)
+                batch[:n] = black
+                yield batch[:n]
+            continue
+        # An opaque bottom layer covering the whole frame is rendered in place instead of over black.
+        bottom = stacked[0]
+        direct = bottom.opaque and bottom.region == Region.full(timeline.width, timeline.height)
+        layers: list[_Layer] = []
+        try:
+            for layer in stacked:
+                size = (layer.region.width, layer.region.height)
+                layers.append(
+                    _Layer(timeline, layer.clip, lo, hi, buffer_size, render_cache, pixel_format, scale_filter, size)
+                )
+                if size not in scratch and (layer is not bottom or not direct):
+                    scratch[size] = np.empty((batch_size, *frame_shape(*size, pixel_format)), dtype=np.uint8)
+            for first in range(lo, hi, batch_size):
+                n = min(batch_size, hi - first)
+                frames = np.arange(first, first + n)
+                if direct:
+                    layers[0].fill(batch[:n], first)
+                else:
+                    batch[:n] = black
+                for layer, source in zip(stacked[direct:], layers[direct:]):
+                    buffer = scratch[source.size][:n]
+                    source.fill(buffer, first)
+                    weights = alpha(layer, frames, transition if layer.clip is fading else None)
+                    draw(batch[:n], buffer, layer.region, weights, pixel_format)
+                yield batch[:n]
+        finally:
+            for layer in layers:
+                layer.close()
+
+
+def render_range(
+    timeline: Timeline,
+    start: int = 0,
+    stop: int | None = None,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    render_cache: RenderCache | None = None,
+    pixel_format: str = RGB24,
+    scale_filter: str = "bilinear",
+) -> Iterator[np.ndarray]:
+    """Yield the timeline frames ``start`` to ``stop`` one ``(height, width, 3)`` array at a time.
+
+    ``pixel_format`` and ``scale_filter`` are passed on to :func:`render_batches`.
+
+    Frames are views into the buffer of :func:`render_batches` and are only
+    valid until the next one is requested.
+    """
+    for batch in render_batches(
+        timeline,
+        start,
+        stop,
+        batch_size=batch_size,
+        buffer_size=buffer_size,
+        render_cache=render_cache,
+        pixel_format=pixel_format,
+        scale_filter=scale_filter,
+    ):
+        yield from batch
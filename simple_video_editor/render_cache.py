@@ -0,0 +1,133 @@
+"""On-disk cache of rendered clip frames, content-addressed by what produced them.
+
+The key of a frame is a SHA-256 hash of the source file's identity (absolute
+path, size and modification time), the source frame number, the frame's
+position within its clip and the clip length (for time-varying effects), the
+output size and scaling filter, the
+:meth:`~simple_video_editor.effects.Effect.cache_token` of every effect in
+the chain, and the package and cache format versions.  Any change to those
+produces a new key, so entries never need invalidating; old ones are removed
+by :meth:`RenderCache.prune`.
+
+Frames are stored as uncompressed ``.npy`` files sharded into 256
+subdirectories, written atomically, and read through a memory map straight
+into the caller's buffer.  A :class:`RenderCache` only holds a directory path,
+so it can be passed to worker processes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from ._version import __version__
+from .timeline import Clip
+from .yuv import RGB24
+
+CACHE_FORMAT = 2
+
+
+def source_fingerprint(path: str) -> tuple[str, int, int]:
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def frame_key(
+    clip: Clip, frame: int, size: tuple[int, int], pixel_format: str = RGB24, scale_filter: str = "bilinear"
+) -> str | None:
+    """Cache key of timeline ``frame`` of ``clip`` rendered at ``size``, or ``None`` if uncacheable."""
+    tokens = [effect.cache_token() for effect in clip.effects]
+    if any(token is None for token in tokens):
+        return None
+    payload = [
+        CACHE_FORMAT,
+        __version__,
+        source_fingerprint(clip.source),
+        clip.source_frame(frame),
+        frame - clip.start,
+        clip.duration,
+        list(size),
+        tokens,
+    ]
+    if pixel_format != RGB24:
+        payload.append(pixel_format)  # Keeps the keys of existing rgb24 entries unchanged.
+    if scale_filter != "bilinear":
+        payload.append(scale_filter)
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+
+class RenderCache:
+    """A directory of rendered frames keyed by :func:`frame_key`."""
+
+    def __init__(self, directory: str | os.PathLike):
+        self.directory = os.fspath(directory)
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __getstate__(self) -> dict:
+        return {"directory": self.directory}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["directory"])
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".npy")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def read(self, key: str, out: np.ndarray) -> bool:
+        """Copy the cached frame ``key`` into ``out``; returns whether it was found."""
+        try:
+            cached = np.load(self.path(key), mmap_mode="r")
+        except (OSError, ValueError):
+            self.misses += 1
+            return False
+        if cached.shape != out.shape or cached.dtype != out.dtype:
+            self.misses += 1
+            return False
+        out[...] = cached
+        self.hits += 1
+        return True
+
+    def write(self, key: str, image: np.ndarray) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            np.save(fh, image)
+        os.replace(tmp, path)
+
+    def nbytes(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def prune(self, max_bytes: int) -> int:
+        """Delete the least recently written entries until at most ``max_bytes`` remain; returns the count."""
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        removed = 0
+        for _, path, size in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def _entries(self) -> list[tuple[int, str, int]]:
+        entries = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".npy"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime_ns, entry.path, st.st_size))
+        return entries
@@ -0,0 +1,224 @@
+"""Resizing frames with separable filters.
+
+A resize is two one-dimensional passes, down the columns and then along the
+rows, over one colour channel at a time.  Each pass is described by a :class:`Kernel`: for every output pixel,
+the input pixels it reads and their weights.  Kernels depend only on the
+input size, the output size, the filter and the crop window, so
+:func:`kernel` builds each one once per process and every later frame of the
+same shape reuses it.  When downscaling, filters are widened by the scale
+factor so they average over every input pixel instead of skipping some.
+
+``"nearest"``
+    the input pixel under the centre of the output pixel.
+``"bilinear"``
+    a triangle over the two nearest pixels.
+``"bicubic"``
+    the Keys cubic (``a = -0.5``) over four pixels; sharper than bilinear.
+``"lanczos"``
+    a three-lobed Lanczos window over six pixels; the sharpest, with slight
+    ringing at hard edges.
+
+Decoded frames are scaled by libswscale instead, with the filter of the same
+name (:data:`SWSCALE_FILTERS`), while it converts them out of the codec's
+pixel format; see :class:`~simple_video_editor.decoder.FrameDecoder`.
+
+Cropping is part of the kernel: the window of the input to scale is given in
+(fractional) input pixels, and only the input rows and columns the kernels
+read are ever touched.  Kernels can likewise be restricted to a range of
+their outputs, which is how a region of interest is scaled without computing
+the rest of the frame.
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+FILTERS = ("nearest", "bilinear", "bicubic", "lanczos")
+SWSCALE_FILTERS = {"nearest": "POINT", "bilinear": "BILINEAR", "bicubic": "BICUBIC", "lanczos": "LANCZOS"}
+
+
+def _triangle(x: np.ndarray) -> np.ndarray:
+    return np.maximum(1.0 - np.abs(x), 0.0)
+
+
+def _keys(x: np.ndarray) -> np.ndarray:
+    x = np.abs(x)
+    near = (1.5 * x - 2.5) * x * x + 1.0
+    far = ((-0.5 * x + 2.5) * x - 4.0) * x + 2.0
+    return np.where(x < 1.0, near, np.where(x < 2.0, far, 0.0))
+
+
+def _lanczos(x: np.ndarray) -> np.ndarray:
+    return np.where(np.abs(x) < 3.0, np.sinc(x) * np.sinc(x / 3.0), 0.0)
+
+
+_SUPPORT = {"bilinear": (1.0, _triangle), "bicubic": (2.0, _keys), "lanczos": (3.0, _lanczos)}
+
+
+class Kernel(NamedTuple):
+    """One pass of a resize: output pixel ``i`` is ``sum(input[index[i]] * weights[i])``.
+
+    ``index`` is ``intp`` and ``weights`` ``float32``, both shaped
+    ``(outputs, taps)``; indices are clamped to the input, so edges repeat.
+    The same weights are also kept as dense ``(stop - start, inputs)``
+    matrices over runs of :data:`_BAND` outputs, one ``(start, stop, first,
+    matrix)`` per run with ``first`` the first input pixel read, which is how
+    a pass is computed: a handful of small matrix products instead of one
+    gather per tap.
+    """
+
+    index: np.ndarray
+    weights: np.ndarray
+    bands: tuple[tuple[int, int, int, np.ndarray], ...]
+
+    def span(self) -> tuple[int, int]:
+        """The range of input pixels read, as ``(first, last + 1)``."""
+        return int(self.index.min()), int(self.index.max()) + 1
+
+
+_BAND = 8
+
+
+def _bands(index: np.ndarray, weights: np.ndarray) -> tuple[tuple[int, int, int, np.ndarray], ...]:
+    bands = []
+    for start in range(0, len(index), _BAND):
+        stop = min(start + _BAND, len(index))
+        rows, taps = index[start:stop], weights[start:stop]
+        first = int(rows.min())
+        matrix = np.zeros((stop - start, int(rows.max()) + 1 - first), dtype=np.float32)
+        # Clamped edge taps land on the same input pixel, so accumulate.
+        np.add.at(matrix, (np.arange(stop - start).repeat(rows.shape[1]), (rows - first).ravel()), taps.ravel())
+        matrix.flags.writeable = False
+        bands.append((start, stop, first, matrix))
+    return tuple(bands)
+
+
+@functools.lru_cache(maxsize=256)
+def kernel(
+    source: int,
+    target: int,
+    filter: str = "bilinear",
+    window: tuple[float, float] | None = None,
+    outputs: tuple[int, int] | None = None,
+) -> Kernel:
+    """The kernel scaling ``source`` input pixels to ``target`` outputs, built once and cached.
+
+    Args:
+        source: Number of input pixels along the axis.
+        target: Number of output pixels.
+        filter: One of :data:`FILTERS`.
+        window: ``(start, length)`` of the crop window to scale, in
+            (fractional) input pixels; the whole input by default.
+        outputs: ``(start, stop)`` to compute only those output pixels;
+            all of them by default.
+
+    Kernels are shared, so treat the arrays as read-only.
+    """
+    if filter not in FILTERS:
+        raise ValueError(f"unknown filter {filter!r}; expected one of {FILTERS}")
+    if source < 1 or target < 1:
+        raise ValueError("kernel sizes must be positive")
+    start, length = window if window is not None else (0.0, float(source))
+    if not (0 <= start and 0 < length and start + length <= source):
+        raise ValueError(f"crop window [{start}, {start + length}) does not lie within {source} pixels")
+    lo, hi = outputs if outputs is not None else (0, target)
+    if not 0 <= lo < hi <= target:
+        raise ValueError(f"outputs [{lo}, {hi}) do not lie within {target} pixels")
+    scale = length / target
+    centres = start + (np.arange(lo, hi) + 0.5) * scale
+    if filter == "nearest":
+        index = np.clip(np.floor(centres).astype(np.intp), 0, source - 1)[:, None]
+        weights = np.ones(index.shape, dtype=np.float32)
+    else:
+        support, function = _SUPPORT[filter]
+        stretch = max(scale, 1.0)
+        taps = 2 * math.ceil(support * stretch) + 1
+        first = np.floor(centres - 0.5 - support * stretch).astype(np.intp) + 1
+        positions = first[:, None] + np.arange(taps)
+        weights = function((positions + 0.5 - centres[:, None]) / stretch)
+        weights = (weights / weights.sum(axis=1, keepdims=True)).astype(np.float32)
+        index = np.clip(positions, 0, source - 1)
+    index.flags.writeable = False
+    weights.flags.writeable = False
+    return Kernel(index, weights, _bands(index, weights))
+
+
+def _along(plane: np.ndarray, k: Kernel, offset: int) -> np.ndarray:
+    """Apply ``k`` down the rows of a ``float32`` plane whose first row is input pixel ``offset``."""
+    out = np.empty((len(k.index), plane.shape[1]), dtype=np.float32)
+    for start, stop, first, matrix in k.bands:
+        first -= offset
+        np.matmul(matrix, plane[first : first + matrix.shape[1]], out=out[start:stop])
+    return out
+
+
+def resample(frames: np.ndarray, rows: Kernel, columns: Kernel, out: np.ndarray | None = None) -> np.ndarray:
+    """Apply a row and a column kernel to a frame ``(H, W, C)`` or a batch ``(N, H, W, C)``.
+
+    ``uint8`` input gives rounded ``uint8`` output, ``float32`` input
+    ``float32`` output clipped to ``[0, 1]``.  ``frames`` only needs to
+    cover the input pixels the kernels read, starting from the first of them
+    (see :meth:`Kernel.span`), so a crop passes just that part of the frame.
+    """
+    if frames.dtype not in (np.uint8, np.float32):
+        raise TypeError(f"unsupported frame dtype {frames.dtype}; expected uint8 or float32")
+    if frames.ndim not in (3, 4):
+        raise ValueError(f"expected a (H, W, C) frame or an (N, H, W, C) batch, not shape {frames.shape}")
+    top, bottom = rows.span()
+    left, right = columns.span()
+    height, width, channels = frames.shape[-3:]
+    if height < bottom - top or width < right - left:
+        raise ValueError("frames do not cover the input the kernels read")
+    shape = (*frames.shape[:-3], len(rows.index), len(columns.index), channels)
+    if out is None:
+        out = np.empty(shape, dtype=frames.dtype)
+    elif out.shape != shape or out.dtype != frames.dtype:
+        raise ValueError(f"out has shape {out.shape} {out.dtype}, expected {shape} {frames.dtype}")
+    if rows.index.shape[1] == 1 and columns.index.shape[1] == 1:
+        out[...] = frames[..., rows.index - top, columns.index[:, 0] - left, :]
+        return out
+    batch = zip(frames, out) if frames.ndim == 4 else [(frames, out)]
+    for image, target in batch:
+        for channel in range(channels):
+            # Both passes multiply from the left, down the rows, with a transpose in between.
+            down = _along(image[..., channel].astype(np.float32), rows, top)
+            result = _along(np.ascontiguousarray(down.T), columns, left)
+            if target.dtype == np.uint8:
+                np.clip(np.rint(result, out=result), 0.0, 255.0, out=result)
+            else:
+                np.clip(result, 0.0, 1.0, out=result)
+            target[..., channel] = result.T
+    return out
+
+
+def resize(
+    frames: np.ndarray,
+    width: int,
+    height: int,
+    filter: str = "bilinear",
+    *,
+    crop: tuple[float, float, float, float] | None = None,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """Resize a frame ``(H, W, C)`` or a batch ``(N, H, W, C)`` to ``width`` x ``height``.
+
+    Args:
+        frames: ``uint8`` or ``float32`` frames.
+        width: Output width.
+        height: Output height.
+        filter: One of :data:`FILTERS`.
+        crop: ``(x, y, width, height)`` of the window of the input to scale,
+            in input pixels; the whole frame by default.
+        out: Optional output array.
+    """
+    in_height, in_width = frames.shape[-3:-1]
+    x, y, w, h = crop if crop is not None else (0.0, 0.0, in_width, in_height)
+    rows = kernel(in_height, height, filter, (y, h))
+    columns = kernel(in_width, width, filter, (x, w))
+    top, bottom = rows.span()
+    left, right = columns.span()
+    return resample(frames[..., top:bottom, left:right, :], rows, columns, out)
@@ -0,0 +1,188 @@
+"""Shot-boundary detection from colour histograms of heavily downscaled frames.
+
+Every frame is scaled to :data:`ANALYSIS_SIZE` while it is converted out of the
+decoder, reduced to a joint RGB histogram of :data:`HISTOGRAM_BINS` bins (three
+bits per channel) and compared with the previous frame.  The score of frame
+``i`` is half the L1 distance between the normalised histograms of frames
+``i - 1`` and ``i``: 0 for identical colour distributions, 1 for disjoint ones.
+Histograms are computed for a whole batch of frames at once with a single
+``bincount``.
+
+Sources are split into keyframe-aligned chunks analysed in parallel by worker
+processes.  The per-frame scores, not the cuts, are saved in a ``.scenes.npz``
+sidecar next to the media file, so changing the threshold never needs
+another decode.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from .decoder import decode_from
+from .keyframes import KeyframeIndex
+from .media import open_container, video_stream
+from .sidecar import Sidecar, load_or_build
+
+SIDECAR_SUFFIX = ".scenes.npz"
+ANALYSIS_SIZE = (64, 36)
+HISTOGRAM_BINS = 512
+DEFAULT_CHUNK_FRAMES = 1500
+DEFAULT_THRESHOLD = 0.35
+DEFAULT_MIN_SCENE_FRAMES = 12
+_BATCH = 64
+_SIDECAR = Sidecar(SIDECAR_SUFFIX, version=1, params=(*ANALYSIS_SIZE, HISTOGRAM_BINS))
+
+
+def sidecar_path(path: str | os.PathLike) -> str:
+    """Return the sidecar file used to persist the scene scores of ``path``."""
+    return _SIDECAR.path(path)
+
+
+def histograms(frames: np.ndarray) -> np.ndarray:
+    """Normalised joint RGB histograms of a ``(N, H, W, 3)`` ``uint8`` batch, shaped ``(N, 512)``."""
+    n = len(frames)
+    q = frames.reshape(n, -1, 3) >> 5
+    codes = (q[..., 0].astype(np.int32) << 6) | (q[..., 1].astype(np.int32) << 3) | q[..., 2]
+    codes += (np.arange(n, dtype=np.int32) * HISTOGRAM_BINS)[:, None]
+    counts = np.bincount(codes.reshape(-1), minlength=n * HISTOGRAM_BINS).reshape(n, HISTOGRAM_BINS)
+    return counts.astype(np.float32) / codes.shape[1]
+
+
+def _distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return 0.5 * np.abs(a - b).sum(axis=-1)
+
+
+def _analyse_chunk(path: str, start: int, stop: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Scores of frames ``start + 1`` to ``stop - 1`` and the histograms of the first and last frame.
+
+    A chunk that decodes no frames gives three empty arrays.
+    """
+    width, height = ANALYSIS_SIZE
+    index = KeyframeIndex.for_source(path)
+    batch = np.empty((_BATCH, height, width, 3), dtype=np.uint8)
+    hists: list[np.ndarray] = []
+    filled = 0
+    with open_container(path) as container:
+        stream = video_stream(container)
+        stream.thread_type = "AUTO"
+        for position, frame in decode_from(container, stream, start, index):
+            if position >= stop:
+                break
+            batch[filled] = frame.to_ndarray(width=width, height=height, format="rgb24")
+            filled += 1
+            if filled == _BATCH:
+                hists.append(histograms(batch))
+                filled = 0
+        if filled:
+            hists.append(histograms(batch[:filled]))
+    if not hists:
+        empty = np.empty(0, dtype=np.float32)
+        return empty, empty, empty
+    h = np.concatenate(hists)
+    return _distance(h[1:], h[:-1]).astype(np.float32), h[0], h[-1]
+
+
+def _chunks(index: KeyframeIndex, chunk_frames: int) -> list[tuple[int, int]]:
+    bounds = [0]
+    for keyframe in index.keyframes[1:].tolist():
+        if keyframe - bounds[-1] >= chunk_frames:
+            bounds.append(keyframe)
+    bounds.append(len(index))
+    return list(zip(bounds, bounds[1:]))
+
+
+@dataclass(frozen=True, eq=False)
+class SceneScores:
+    """Per-frame histogram differences of a video stream.
+
+    Attributes:
+        scores: ``float32`` score of every frame against the one before it;
+            ``scores[0]`` is 0.
+    """
+
+    scores: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @classmethod
+    def build(
+        cls, path: str | os.PathLike, *, workers: int | None = None, chunk_frames: int = DEFAULT_CHUNK_FRAMES
+    ) -> SceneScores:
+        """Decode ``path`` in keyframe-aligned chunks of about ``chunk_frames`` frames and score every frame.
+
+        ``workers=None`` uses one process per CPU and ``1`` analyses in the
+        calling process.
+        """
+        path = os.fspath(path)
+        chunks = _chunks(KeyframeIndex.for_source(path), chunk_frames)
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+        if workers == 1:
+            results = [_analyse_chunk(path, lo, hi) for lo, hi in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_analyse_chunk, *zip(*((path, lo, hi) for lo, hi in chunks))))
+        parts = [np.zeros(0, dtype=np.float32)]
+        previous = None
+        for scores, first, last in results:
+            if not len(first):
+                continue  # Nothing decoded; the next chunk is scored against the one before.
+            if previous is None:
+                parts.append(np.zeros(1, dtype=np.float32))
+            else:
+                parts.append(_distance(first, previous).astype(np.float32).reshape(1))
+            parts.append(scores)
+            previous = last
+        return cls(np.concatenate(parts))
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> SceneScores | None:
+        """Load the sidecar of ``path`` if it exists and still matches the media file."""
+        return _SIDECAR.load(path, lambda data: cls(data["scores"]))
+
+    def save(self, path: str | os.PathLike) -> None:
+        """Write the scores of ``path`` to its sidecar file, atomically."""
+        _SIDECAR.save(path, scores=self.scores)
+
+    @classmethod
+    def for_source(
+        cls, path: str | os.PathLike, *, persist: bool = True, workers: int | None = None
+    ) -> SceneScores:
+        """Return the scores of ``path``, loading its sidecar or building (and saving) them."""
+        return load_or_build(
+            lambda: cls.load(path), lambda: cls.build(path, workers=workers), lambda scores: scores.save(path), persist
+        )
+
+    def cuts(
+        self, threshold: float = DEFAULT_THRESHOLD, *, min_scene_frames: int = DEFAULT_MIN_SCENE_FRAMES
+    ) -> list[int]:
+        """Frames that start a new shot: scores above ``threshold``, at least ``min_scene_frames`` apart."""
+        cuts: list[int] = []
+        last = 0
+        for frame in np.flatnonzero(self.scores > threshold).tolist():
+            if frame - last >= min_scene_frames:
+                cuts.append(frame)
+                last = frame
+        return cuts
+
+    def scenes(
+        self, threshold: float = DEFAULT_THRESHOLD, *, min_scene_frames: int = DEFAULT_MIN_SCENE_FRAMES
+    ) -> list[tuple[int, int]]:
+        """The shots of the source as half-open ``(start, stop)`` frame ranges."""
+        bounds = [0, *self.cuts(threshold, min_scene_frames=min_scene_frames), len(self.scores)]
+        return list(zip(bounds, bounds[1:]))
+
+
+def detect_scenes(
+    path: str | os.PathLike,
+    threshold: float = DEFAULT_THRESHOLD,
+    *,
+    min_scene_frames: int = DEFAULT_MIN_SCENE_FRAMES,
+    workers: int | None = None,
+) -> list[tuple[int, int]]:
+    """Split ``path`` into shots, analysing it once and reusing the cached scores afterwards."""
+    return SceneScores.for_source(path, workers=workers).scenes(threshold, min_scene_frames=min_scene_frames)
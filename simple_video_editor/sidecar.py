@@ -0,0 +1,77 @@
+"""``.npz`` sidecar files that cache data derived from a media file next to it.
+
+Keyframe indexes, audio peaks and scene scores are each expensive to compute
+and small to store, so they are saved as ``<media><suffix>`` and reused by
+later sessions.  Every sidecar carries a fingerprint of the media file (its
+size and modification time) together with a format version and whatever
+analysis parameters shape its contents; a sidecar whose fingerprint no longer
+matches is ignored and rebuilt.  Sidecars are written to a temporary file and
+renamed into place, so readers never see a partial one.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Callable, Mapping, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Sidecar:
+    """One kind of sidecar file.
+
+    Attributes:
+        suffix: Appended to the media path to name the sidecar.
+        version: Format version; bump it when the stored arrays change.
+        params: Analysis parameters stored in the fingerprint, so sidecars
+            built with other ones are rebuilt.
+    """
+
+    suffix: str
+    version: int
+    params: tuple[int, ...] = ()
+
+    def path(self, media: str | os.PathLike) -> str:
+        """Return the sidecar file of ``media``."""
+        return os.fspath(media) + self.suffix
+
+    def fingerprint(self, media: str | os.PathLike) -> np.ndarray:
+        st = os.stat(media)
+        return np.array([self.version, st.st_size, st.st_mtime_ns, *self.params], dtype=np.int64)
+
+    def load(self, media: str | os.PathLike, parse: Callable[[Mapping[str, np.ndarray]], T]) -> T | None:
+        """``parse`` the arrays of the sidecar of ``media``, or ``None`` if it is missing, stale or unreadable."""
+        try:
+            with np.load(self.path(media)) as data:
+                if not np.array_equal(data["fingerprint"], self.fingerprint(media)):
+                    return None
+                return parse(data)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, media: str | os.PathLike, **arrays: np.ndarray) -> None:
+        """Write ``arrays`` to the sidecar of ``media``, atomically."""
+        target = self.path(media)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            np.savez(fh, fingerprint=self.fingerprint(media), **arrays)
+        os.replace(tmp, target)
+
+
+def load_or_build(
+    load: Callable[[], T | None], build: Callable[[], T], save: Callable[[T], None], persist: bool = True
+) -> T:
+    """Return what ``load`` finds, or ``build`` it and, if ``persist``, ``save`` it where possible."""
+    value = load()
+    if value is None:
+        value = build()
+        if persist:
+            try:
+                save(value)
+            except OSError:
+                pass  # Read-only media directories still get an in-memory result.
+    return value
@@ -0,0 +1,105 @@
+"""Random access to the frames of one media file."""
+
+from __future__ import annotations
+
+import os
+from typing import Iterator
+
+import av
+import numpy as np
+
+from .cache import FrameCache
+from .decoder import decode_from
+from .errors import MediaError
+from .keyframes import KeyframeIndex
+from .media import VideoInfo, open_container, probe_video, video_stream
+
+
+class VideoSource:
+    """Frame-accurate random access to a video file.
+
+    ``frame(i)`` seeks to the keyframe preceding ``i`` through the source's
+    :class:`KeyframeIndex` and decodes forward from there, unless the open
+    decoder is already positioned between that keyframe and ``i``, in which
+    case it simply keeps decoding.  Every frame decoded on the way is put in
+    ``cache`` when one is given, so scrubbing back over the same region is
+    served from memory.
+
+    A ``VideoSource`` holds an open container; close it (or use it as a context
+    manager) when done.  It is not safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        *,
+        cache: FrameCache | None = None,
+        index: KeyframeIndex | None = None,
+    ):
+        self.path = os.fspath(path)
+        self.info: VideoInfo = probe_video(self.path)
+        self.index = index if index is not None else KeyframeIndex.for_source(self.path)
+        self.cache = cache
+        self._container: av.container.InputContainer | None = None
+        self._decoded: Iterator[tuple[int, av.VideoFrame]] | None = None
+        self._next = 0
+
+    def __enter__(self) -> VideoSource:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def close(self) -> None:
+        if self._container is not None:
+            self._container.close()
+        self._container = None
+        self._decoded = None
+
+    def frame(self, index: int) -> np.ndarray:
+        """Return frame ``index`` as an ``(height, width, 3)`` ``uint8`` array.
+
+        Frames served through a cache are read-only.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(f"frame {index} out of range for {len(self)} frames")
+        if self.cache is not None:
+            image = self.cache.get(self.path, index)
+            if image is not None:
+                return image
+        return self._decode_to(index)
+
+    def frame_at(self, seconds: float) -> np.ndarray:
+        """Return the frame displayed at ``seconds``."""
+        return self.frame(self.index.frame_at(seconds))
+
+    def _decode_to(self, target: int) -> np.ndarray:
+        keyframe = self.index.keyframe_before(target)
+        if self._decoded is None or not keyframe <= self._next <= target:
+            self._seek(target)
+        try:
+            for position, frame in self._decoded:
+                self._next = position + 1
+                if position < target and self.cache is None:
+                    continue
+                image = frame.to_ndarray(format="rgb24")
+                if self.cache is not None:
+                    image = self.cache.put(self.path, position, image, copy=False)
+                if position >= target:
+                    return image
+        except av.FFmpegError as exc:
+            self.close()
+            raise MediaError(f"failed to decode {self.path!r}: {exc}") from exc
+        self.close()
+        raise MediaError(f"{self.path!r} ended before frame {target}")
+
+    def _seek(self, target: int) -> None:
+        if self._container is None:
+            self._container = open_container(self.path)
+            video_stream(self._container).thread_type = "AUTO"
+        stream = video_stream(self._container)
+        self._next = self.index.keyframe_before(target)
+        self._decoded = decode_from(self._container, stream, self._next, self.index)
@@ -0,0 +1,273 @@
+"""Timeline filmstrip thumbnails decoded from keyframes only, stored as sprite sheets.
+
+A :class:`ThumbnailCache` makes one thumbnail per keyframe of a source (or
+per ``every``-th keyframe).  For each one it seeks straight to the keyframe
+and decodes that single frame with the decoder told to skip every non-key
+frame, scaling it down as it is converted out of the decoder, so the cost is
+one intra-frame decode per thumbnail however long the GOPs are.
+
+Thumbnails are grouped into sprite sheets of ``sheet_tiles`` tiles (a grid
+``SHEET_COLUMNS`` wide), each stored as a ``.npy`` file under a directory
+named after the source's identity and the thumbnail settings.  Sheets are
+generated by background threads from a priority queue: sheets in the visible
+timeline region first, then the others by distance from it, and
+:meth:`ThumbnailCache.set_visible` re-ranks pending work as the view scrolls.
+
+Lookups are cheap enough to make for every tile of a redraw: the thumbnail
+frames and tile size of a source and its loaded sheets are kept in memory,
+and are dropped when the source's size or modification time changes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from .keyframes import KeyframeIndex
+from .media import open_container, probe_video, video_stream
+from .proxy import proxy_size
+
+DEFAULT_THUMBNAIL_HEIGHT = 72
+DEFAULT_SHEET_TILES = 64
+SHEET_COLUMNS = 8
+
+
+class _Source(NamedTuple):
+    """What :class:`ThumbnailCache` knows about one version of a source file."""
+
+    fingerprint: tuple[int, int]
+    directory: str
+    frames: np.ndarray
+    tile_size: tuple[int, int]
+    sheets: dict[int, np.ndarray]
+
+
+def _load_sheet(path: str) -> np.ndarray:
+    return np.load(path, mmap_mode="r")
+
+
+def _tile_of(frames: np.ndarray, frame: int) -> int:
+    """Thumbnail shown for source ``frame``: the last one at or before it."""
+    return max(int(np.searchsorted(frames, frame, side="right")) - 1, 0)
+
+
+class ThumbnailCache:
+    """Build and look up keyframe thumbnails of sources, in the background.
+
+    Args:
+        directory: Where sprite sheets are stored.
+        height: Thumbnail height in pixels; the width follows the source's
+            aspect ratio.
+        every: Use every ``every``-th keyframe.
+        sheet_tiles: Thumbnails per sprite sheet.
+        workers: Number of background generator threads.
+        on_ready: Called as ``on_ready(source, sheet)`` on a generator thread
+            when a sheet has been written.  Exceptions it raises are
+            re-raised by :meth:`wait`, like generator errors.
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        *,
+        height: int = DEFAULT_THUMBNAIL_HEIGHT,
+        every: int = 1,
+        sheet_tiles: int = DEFAULT_SHEET_TILES,
+        workers: int = 1,
+        on_ready: Callable[[str, int], None] | None = None,
+    ):
+        if every < 1 or sheet_tiles < 1:
+            raise ValueError("every and sheet_tiles must be positive")
+        self.directory = os.fspath(directory)
+        self.height = height
+        self.every = every
+        self.sheet_tiles = sheet_tiles
+        self.on_ready = on_ready
+        self._lock = threading.Condition()
+        self._queue: list[tuple[int, int, str, int]] = []
+        self._rank: dict[tuple[str, int], int] = {}
+        self._building: set[tuple[str, int]] = set()
+        self._order = itertools.count()
+        self._closed = False
+        self._busy = 0
+        self._errors: list[BaseException] = []
+        self._sources: dict[str, _Source] = {}
+        self._sources_lock = threading.Lock()  # Not self._lock, which workers wait on.
+        os.makedirs(self.directory, exist_ok=True)
+        self._threads = [
+            threading.Thread(target=self._work, name=f"sve-thumbnails-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self) -> ThumbnailCache:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the generator threads; unfinished sheets are built on a later request."""
+        with self._lock:
+            self._closed = True
+            self._queue.clear()
+            self._lock.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def frames(self, source: str | os.PathLike) -> np.ndarray:
+        """Source frame numbers of the thumbnails of ``source``, in order."""
+        return self._source(source).frames
+
+    def sheet_count(self, source: str | os.PathLike) -> int:
+        return -(-len(self.frames(source)) // self.sheet_tiles)
+
+    def sheet_path(self, source: str | os.PathLike, sheet: int) -> str:
+        return os.path.join(self._source(source).directory, f"sheet-{sheet:05d}.npy")
+
+    def tile_size(self, source: str | os.PathLike) -> tuple[int, int]:
+        """``(width, height)`` of the thumbnails of ``source``."""
+        return self._source(source).tile_size
+
+    def sheet(self, source: str | os.PathLike, sheet: int) -> np.ndarray | None:
+        """Sprite sheet ``sheet`` of ``source`` (memory-mapped), or ``None`` if it is not built yet."""
+        state = self._source(source)
+        image = state.sheets.get(sheet)
+        if image is None:
+            try:
+                image = _load_sheet(os.path.join(state.directory, f"sheet-{sheet:05d}.npy"))
+            except (OSError, ValueError):
+                return None
+            # Sheets are written once per source version, so a loaded one stays valid until the source changes.
+            state.sheets[sheet] = image
+        return image
+
+    def thumbnail(self, source: str | os.PathLike, frame: int) -> np.ndarray | None:
+        """The thumbnail shown for source ``frame`` (the nearest one at or before it).
+
+        Returns ``None`` and schedules its sheet with top priority when the
+        sheet is not built yet.
+        """
+        tile = _tile_of(self.frames(source), frame)
+        sheet, slot = divmod(tile, self.sheet_tiles)
+        image = self.sheet(source, sheet)
+        if image is None:
+            self._schedule(os.fspath(source), {sheet: 0})
+            return None
+        width, height = self.tile_size(source)
+        row, column = divmod(slot, SHEET_COLUMNS)
+        return image[row * height : (row + 1) * height, column * width : (column + 1) * width]
+
+    def request(self, source: str | os.PathLike, start: int = 0, stop: int | None = None) -> None:
+        """Build every missing sheet of ``source``, those covering source frames ``start`` to ``stop`` first."""
+        self.set_visible(source, start, stop)
+
+    def set_visible(self, source: str | os.PathLike, start: int, stop: int | None = None) -> None:
+        """Re-rank the pending sheets of ``source`` by their distance from the visible frames."""
+        frames = self.frames(source)
+        count = -(-len(frames) // self.sheet_tiles)
+        first = _tile_of(frames, start) // self.sheet_tiles
+        last = count - 1 if stop is None else max(_tile_of(frames, stop - 1) // self.sheet_tiles, first)
+        ranks = {sheet: max(first - sheet, sheet - last, 0) for sheet in range(count)}
+        self._schedule(os.fspath(source), ranks)
+
+    def wait(self) -> None:
+        """Block until every scheduled sheet is built; re-raises the first generator error."""
+        with self._lock:
+            while self._queue or self._busy:
+                self._lock.wait()
+            if self._errors:
+                raise self._errors.pop(0)
+
+    def _source(self, source: str | os.PathLike) -> _Source:
+        """The thumbnail frames, tile size and loaded sheets of ``source``, rebuilt when the file changes."""
+        path = os.path.abspath(source)
+        st = os.stat(path)
+        fingerprint = (st.st_size, st.st_mtime_ns)
+        with self._sources_lock:
+            state = self._sources.get(path)
+        if state is None or state.fingerprint != fingerprint:
+            # Probed and indexed without holding the lock; threads racing on a new source build equal states.
+            key = f"{path}\0{st.st_size}\0{st.st_mtime_ns}\0{self.height}\0{self.every}\0{self.sheet_tiles}"
+            digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+            info = probe_video(path)
+            state = _Source(
+                fingerprint,
+                os.path.join(self.directory, digest),
+                KeyframeIndex.for_source(path).keyframes[:: self.every],
+                proxy_size(info.width, info.height, self.height),
+                {},
+            )
+            with self._sources_lock:
+                self._sources[path] = state
+        return state
+
+    def _schedule(self, source: str, ranks: dict[int, int]) -> None:
+        # Touch the disk before taking the lock, so workers waiting on it are not held up.
+        missing = {sheet: rank for sheet, rank in ranks.items() if not os.path.exists(self.sheet_path(source, sheet))}
+        with self._lock:
+            for sheet, rank in missing.items():
+                key = (source, sheet)
+                if self._rank.get(key) == rank or key in self._building:
+                    continue
+                self._rank[key] = rank
+                heapq.heappush(self._queue, (rank, next(self._order), source, sheet))
+            self._lock.notify_all()
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                while not self._queue and not self._closed:
+                    self._lock.wait()
+                if self._closed:
+                    return
+                rank, _, source, sheet = heapq.heappop(self._queue)
+                if self._rank.get((source, sheet)) != rank:
+                    continue  # Superseded by a higher-priority entry, or already built.
+                del self._rank[(source, sheet)]
+                self._building.add((source, sheet))
+                self._busy += 1
+            try:
+                self._build(source, sheet)
+                if self.on_ready is not None:
+                    self.on_ready(source, sheet)
+            except Exception as exc:
+                # Errors, the callback's included, are re-raised by wait(); the thread carries on.
+                with self._lock:
+                    self._errors.append(exc)
+            finally:
+                with self._lock:
+                    self._building.discard((source, sheet))
+                    self._busy -= 1
+                    self._lock.notify_all()
+
+    def _build(self, source: str, sheet: int) -> None:
+        target = self.sheet_path(source, sheet)
+        if os.path.exists(target):
+            return
+        index = KeyframeIndex.for_source(source)
+        frames = self.frames(source)[sheet * self.sheet_tiles : (sheet + 1) * self.sheet_tiles]
+        width, height = self.tile_size(source)
+        rows = -(-self.sheet_tiles // SHEET_COLUMNS)
+        image = np.zeros((rows * height, SHEET_COLUMNS * width, 3), dtype=np.uint8)
+        with open_container(source) as container:
+            stream = video_stream(container)
+            stream.codec_context.skip_frame = "NONKEY"
+            for slot, frame in enumerate(frames.tolist()):
+                row, column = divmod(slot, SHEET_COLUMNS)
+                tile = image[row * height : (row + 1) * height, column * width : (column + 1) * width]
+                container.seek(int(index.pts[frame]), stream=stream, backward=True, any_frame=False)
+                decoded = next(iter(container.decode(stream)), None)
+                if decoded is not None:
+                    tile[...] = decoded.to_ndarray(width=width, height=height, format="rgb24")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as fh:
+            np.save(fh, image)
+        os.replace(tmp, target)
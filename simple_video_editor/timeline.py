@@ -0,0 +1,311 @@
+"""Timeline model: clips of source media placed on numbered tracks.
+
+All positions are frame numbers at the timeline's frame rate.  A clip shows
+source frames ``in_frame`` to ``out_frame - 1`` starting at timeline frame
+``start``; where clips on different tracks overlap, higher tracks are drawn
+over lower ones.  A clip fills the frame and hides what is below it unless it
+is given a ``box`` or an ``opacity`` below 1, and a :class:`Transition`
+dissolves from the clips below into the highest one
+(see :mod:`~simple_video_editor.composite`).
+
+A clip also plays the first audio stream of its source, scaled by its
+``gain``, and audio of all tracks is mixed; during a transition the two
+clips crossfade.
+
+Clips and transitions compare by identity, so they can be used as dict keys
+while being edited.  They are slotted dataclasses and envelopes keep their
+points in two NumPy arrays, so timelines of hundreds of thousands of clips
+or envelope points stay small and cheap for the garbage collector.
+
+The timeline keeps an :class:`~simple_video_editor.intervals.IntervalTree` of
+its clips and transitions for :meth:`Timeline.active` and the other overlap
+queries.  :meth:`Timeline.add` and :meth:`Timeline.remove` update it; after
+changing the position or length of a clip or transition in place, call
+:meth:`Timeline.moved`.  The ``clips`` and ``transitions`` lists count their
+changes, so items added, removed, replaced or reordered through the lists
+directly are picked up by a rebuild on the next query.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass, field
+from fractions import Fraction
+from typing import Iterable
+
+import numpy as np
+
+from .effects import Effect
+from .intervals import IntervalTree
+
+
+class _ItemList(list):
+    """A list that counts the changes made to it in ``version``, so the timeline can tell when its index is stale."""
+
+    version = 0
+
+
+def _counting(name: str):
+    method = getattr(list, name)
+
+    def counted(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    counted.__name__ = name
+    return counted
+
+
+_MUTATORS = (
+    "__setitem__", "__delitem__", "__iadd__", "__imul__", "append", "extend", "insert", "pop", "remove", "clear",
+    "sort", "reverse",
+)
+for _name in _MUTATORS:
+    setattr(_ItemList, _name, _counting(_name))
+
+
+class Envelope:
+    """A piecewise-linear curve through ``(frame, value)`` points, constant beyond its ends.
+
+    Frames are clip-local and may be fractional, so audio can evaluate the
+    curve at every sample.  The points are stored as a ``float64`` array of
+    frames and a ``float32`` array of values, sorted by frame.
+    """
+
+    __slots__ = ("frames", "values")
+
+    def __init__(self, points: Iterable[tuple[float, float]]):
+        pairs = np.array(list(points), dtype=np.float64).reshape(-1, 2)
+        self._set(pairs[:, 0], pairs[:, 1])
+
+    @classmethod
+    def from_arrays(cls, frames: np.ndarray, values: np.ndarray) -> Envelope:
+        """An envelope through ``(frames[i], values[i])``, without building a tuple per point."""
+        frames = np.asarray(frames, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if frames.ndim != 1 or frames.shape != values.shape:
+            raise ValueError("frames and values must be 1-D arrays of the same length")
+        envelope = cls.__new__(cls)
+        envelope._set(frames, values)
+        return envelope
+
+    def _set(self, frames: np.ndarray, values: np.ndarray) -> None:
+        if not len(frames):
+            raise ValueError("an envelope needs at least one point")
+        order = np.lexsort((values, frames))
+        self.frames = frames[order]
+        self.values = values[order].astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __repr__(self) -> str:
+        return f"Envelope({list(zip(self.frames.tolist(), self.values.tolist()))})"
+
+    def __call__(self, frames: np.ndarray) -> np.ndarray:
+        """Values of the curve at ``frames``, as ``float32``."""
+        return np.interp(frames, self.frames, self.values).astype(np.float32)
+
+    def over(self, start: float, stop: float, step: float = 1.0) -> np.ndarray:
+        """Values of the curve at frames ``start``, ``start + step``, ... up to (not including) ``stop``."""
+        count = max(math.ceil((stop - start) / step), 0)
+        return self(start + step * np.arange(count, dtype=np.float64))
+
+
+@dataclass(eq=False, slots=True)
+class Clip:
+    """A range of frames of one source placed on the timeline.
+
+    ``effects`` are applied in order to every frame of the clip.  ``gain``
+    scales the clip's audio, either by a constant or along an
+    :class:`Envelope` over clip-local frames.
+
+    ``box`` places the clip in a rectangle of the frame, ``(x, y, width,
+    height)`` in fractions of the frame size, instead of filling it; the
+    source is scaled to the rectangle.  ``opacity`` blends the clip over the
+    tracks below it.
+    """
+
+    source: str
+    in_frame: int
+    out_frame: int
+    start: int = 0
+    track: int = 0
+    effects: list[Effect] = field(default_factory=list)
+    gain: float | Envelope = 1.0
+    opacity: float = 1.0
+    box: tuple[float, float, float, float] | None = None
+
+    def __post_init__(self) -> None:
+        self.source = os.fspath(self.source)
+        if self.in_frame < 0 or self.out_frame <= self.in_frame:
+            raise ValueError(f"invalid source range [{self.in_frame}, {self.out_frame})")
+        if self.start < 0:
+            raise ValueError("clip start must not be negative")
+        if not 0 <= self.opacity <= 1:
+            raise ValueError(f"clip opacity must lie in [0, 1], not {self.opacity}")
+        if self.box is not None:
+            x, y, width, height = self.box = tuple(float(v) for v in self.box)
+            if not (0 <= x and 0 <= y and 0 < width and 0 < height) or x + width > 1 or y + height > 1:
+                raise ValueError(f"clip box {self.box} must be a non-empty rectangle within the frame")
+
+    @property
+    def duration(self) -> int:
+        return self.out_frame - self.in_frame
+
+    @property
+    def end(self) -> int:
+        """Timeline frame one past the last frame of the clip."""
+        return self.start + self.duration
+
+    def covers(self, frame: int) -> bool:
+        return self.start <= frame < self.end
+
+    def source_frame(self, frame: int) -> int:
+        """Source frame shown at timeline ``frame``."""
+        return self.in_frame + frame - self.start
+
+
+@dataclass(eq=False, slots=True)
+class Transition:
+    """A cross-dissolve over timeline frames ``start`` to ``stop - 1``."""
+
+    start: int
+    stop: int
+
+    def __post_init__(self) -> None:
+        if self.start < 0 or self.stop <= self.start:
+            raise ValueError(f"invalid transition range [{self.start}, {self.stop})")
+
+    def covers(self, frame: int) -> bool:
+        return self.start <= frame < self.stop
+
+    def weights(self, frames: np.ndarray) -> np.ndarray:
+        """Weight of the incoming clip at each timeline frame in ``frames``."""
+        return (np.asarray(frames) - self.start + 1) / (self.stop - self.start + 1)
+
+
+@dataclass
+class Timeline:
+    """An ordered collection of clips rendered at a fixed size and frame rate.
+
+    ``clips`` and ``transitions`` are copied into lists that count their
+    changes when they are assigned.
+    """
+
+    width: int
+    height: int
+    fps: Fraction
+    clips: list[Clip] = field(default_factory=list)
+    transitions: list[Transition] = field(default_factory=list)
+    _clip_index: IntervalTree | None = field(default=None, init=False, repr=False, compare=False)
+    _transition_index: IntervalTree | None = field(default=None, init=False, repr=False, compare=False)
+    # The list versions the indexes reflect.
+    _clip_version: int = field(default=-1, init=False, repr=False, compare=False)
+    _transition_version: int = field(default=-1, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.fps = Fraction(self.fps)
+
+    def __setattr__(self, name: str, value) -> None:
+        if name in ("clips", "transitions") and not isinstance(value, _ItemList):
+            value = _ItemList(value)
+        super().__setattr__(name, value)
+
+    def _clips(self) -> IntervalTree:
+        if self._clip_index is None or self._clip_version != self.clips.version:
+            self._clip_index = IntervalTree()
+            for clip in self.clips:
+                self._clip_index.add(clip, clip.start, clip.end)
+            self._clip_version = self.clips.version
+        return self._clip_index
+
+    def _transitions(self) -> IntervalTree:
+        if self._transition_index is None or self._transition_version != self.transitions.version:
+            self._transition_index = IntervalTree()
+            for transition in self.transitions:
+                self._transition_index.add(transition, transition.start, transition.stop)
+            self._transition_version = self.transitions.version
+        return self._transition_index
+
+    @property
+    def duration(self) -> int:
+        """Number of frames up to the end of the last clip."""
+        return max((clip.end for clip in self.clips), default=0)
+
+    def add(self, clip: Clip) -> Clip:
+        index = self._clips()
+        self.clips.append(clip)
+        index.add(clip, clip.start, clip.end)
+        self._clip_version = self.clips.version
+        return clip
+
+    def append(
+        self,
+        source: str | os.PathLike,
+        in_frame: int,
+        out_frame: int,
+        *,
+        track: int = 0,
+        effects: list[Effect] | None = None,
+    ) -> Clip:
+        """Add a clip directly after the last clip on ``track``."""
+        start = max((clip.end for clip in self.clips if clip.track == track), default=0)
+        return self.add(Clip(source, in_frame, out_frame, start=start, track=track, effects=list(effects or [])))
+
+    def remove(self, clip: Clip) -> None:
+        index = self._clips()
+        self.clips.remove(clip)
+        index.remove(clip)
+        self._clip_version = self.clips.version
+
+    def moved(self, item: Clip | Transition) -> None:
+        """Update the index after the start or length of ``item`` changed in place."""
+        if isinstance(item, Clip):
+            self._clips().move(item, item.start, item.end)
+        else:
+            self._transitions().move(item, item.start, item.stop)
+
+    def add_transition(self, start: int, stop: int) -> Transition:
+        index = self._transitions()
+        transition = Transition(start, stop)
+        self.transitions.append(transition)
+        index.add(transition, start, stop)
+        self._transition_version = self.transitions.version
+        return transition
+
+    def remove_transition(self, transition: Transition) -> None:
+        index = self._transitions()
+        self.transitions.remove(transition)
+        index.remove(transition)
+        self._transition_version = self.transitions.version
+
+    def transition_at(self, frame: int) -> Transition | None:
+        index = self._transitions()
+        return min(index.at(frame), key=index.order, default=None)
+
+    def active(self, frame: int) -> list[Clip]:
+        """Clips covering ``frame``, bottom track first."""
+        return self.overlapping(frame, frame + 1)
+
+    def overlapping(self, start: int, stop: int) -> list[Clip]:
+        """Clips overlapping timeline frames ``start`` to ``stop - 1``, bottom track first.
+
+        Clips on the same track keep the order in which they were added.
+        """
+        index = self._clips()
+        return sorted(index.overlapping(start, stop), key=lambda clip: (clip.track, index.order(clip)))
+
+    def transitions_overlapping(self, start: int, stop: int) -> list[Transition]:
+        return self._transitions().overlapping(start, stop)
+
+    def cut_points(self) -> list[int]:
+        """Sorted timeline frames at which the active clips or transition change, including 0 and the end."""
+        duration = self.duration
+        points = {0, duration}
+        for item in self.clips:
+            points.update((item.start, item.end))
+        for item in self.transitions:
+            points.update(p for p in (item.start, item.stop) if p < duration)
+        return sorted(points)
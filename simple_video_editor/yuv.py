@@ -0,0 +1,93 @@
+"""Planar YUV 4:2:0 frames, so renders that only trim, fade, blend and scale stay in YUV.
+
+A ``yuv420p`` frame is held the way FFmpeg lays it out, in one ``uint8`` array
+shaped ``(height * 3 // 2, width)``: the full-size Y plane, then the
+quarter-size U and V planes, each packed two plane rows per array row.
+Batches add a leading frame axis, just like ``rgb24`` batches shaped
+``(N, height, width, 3)``.  :func:`planes` gives views of the three planes.
+A ``yuv420p`` frame takes half the memory of the same frame in ``rgb24`` and
+goes from the decoder to the encoder without any colour conversion.
+
+Every :class:`~simple_video_editor.effects.Effect` lists the pixel formats
+it can work on in ``formats``;
+:func:`~simple_video_editor.effects.apply_chain` converts a ``yuv420p``
+batch to ``rgb24`` only for the effects that need it.  Conversions go through
+libswscale, as decoding to and encoding from ``rgb24`` always did.
+
+``yuv420p`` needs an even width and height.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import av
+import numpy as np
+
+RGB24 = "rgb24"
+YUV420P = "yuv420p"
+PIXEL_FORMATS = (RGB24, YUV420P)
+
+BLACK_LUMA = 16
+NEUTRAL_CHROMA = 128
+
+
+def frame_shape(width: int, height: int, pixel_format: str = RGB24) -> tuple[int, ...]:
+    """Array shape of one ``width`` x ``height`` frame in ``pixel_format``."""
+    if pixel_format == RGB24:
+        return (height, width, 3)
+    if pixel_format == YUV420P:
+        if width % 2 or height % 2:
+            raise ValueError(f"yuv420p needs an even frame size, not {width}x{height}")
+        return (height * 3 // 2, width)
+    raise ValueError(f"unsupported pixel format {pixel_format!r}; expected one of {PIXEL_FORMATS}")
+
+
+def frame_size(frames: np.ndarray, pixel_format: str) -> tuple[int, int]:
+    """``(width, height)`` of the frames of a batch in ``pixel_format``."""
+    if pixel_format == YUV420P:
+        return frames.shape[-1], frames.shape[-2] * 2 // 3
+    return frames.shape[-2], frames.shape[-3]
+
+
+class Planes(NamedTuple):
+    """Views of the Y, U and V planes of a ``yuv420p`` frame or batch."""
+
+    y: np.ndarray
+    u: np.ndarray
+    v: np.ndarray
+
+
+def planes(frames: np.ndarray) -> Planes:
+    """Split a ``yuv420p`` frame or batch into plane views, shaped ``(..., h, w)`` and ``(..., h/2, w/2)``."""
+    rows, width = frames.shape[-2:]
+    height = rows * 2 // 3
+    lead = frames.shape[:-2]
+    chroma = (*lead, height // 2, width // 2)
+    u = frames[..., height : height + height // 4, :].reshape(chroma)
+    v = frames[..., height + height // 4 :, :].reshape(chroma)
+    return Planes(frames[..., :height, :], u, v)
+
+
+def fill_black(frames: np.ndarray) -> np.ndarray:
+    """Set a ``yuv420p`` frame or batch to black, in place."""
+    height = frames.shape[-2] * 2 // 3
+    frames[..., :height, :] = BLACK_LUMA
+    frames[..., height:, :] = NEUTRAL_CHROMA
+    return frames
+
+
+def convert(frames: np.ndarray, source: str, target: str, out: np.ndarray | None = None) -> np.ndarray:
+    """Convert a batch between pixel formats, frame by frame through libswscale."""
+    if source == target:
+        if out is None:
+            return frames
+        out[...] = frames
+        return out
+    width, height = frame_size(frames, source)
+    if out is None:
+        out = np.empty((len(frames), *frame_shape(width, height, target)), dtype=np.uint8)
+    for image, dst in zip(frames, out):
+        frame = av.VideoFrame.from_ndarray(np.ascontiguousarray(image), format=source)
+        dst[...] = frame.to_ndarray(format=target)
+    return out
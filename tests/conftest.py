@@ -0,0 +1,85 @@
+import shutil
+
+import av
+import numpy as np
+import pytest
+
+from simple_video_editor.bench import make_test_clip
+
+
+@pytest.fixture(scope="session")
+def media(tmp_path_factory):
+    return tmp_path_factory.mktemp("media")
+
+
+@pytest.fixture(scope="session")
+def clip(media):
+    """A 160x120, 24 fps clip of 48 frames with a keyframe every 12."""
+    return make_test_clip(str(media / "clip.mp4"), width=160, height=120, frames=48, fps=24, gop_size=12)
+
+
+@pytest.fixture(scope="session")
+def large_clip(media):
+    """A 320x240 version of :func:`clip`, for scaling."""
+    return make_test_clip(str(media / "large.mp4"), width=320, height=240, frames=48, fps=24, gop_size=12)
+
+
+@pytest.fixture
+def own_clip(clip, tmp_path):
+    """A private copy of :func:`clip`, for tests that write or change sidecars."""
+    return shutil.copy(clip, tmp_path / "clip.mp4")
+
+
+def tone_pcm(start: int, stop: int) -> np.ndarray:
+    """Samples ``start`` to ``stop`` of the left channel of :func:`tone` and :func:`talking_clip`, as ``int16``."""
+    t = np.arange(start, stop) / 48000
+    return np.round(0.5 * 32767 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+
+@pytest.fixture(scope="session")
+def tone(media):
+    """A 1.5 s stereo WAV at 48 kHz: a 0.5 amplitude sine on the left, silence on the right."""
+    path = str(media / "tone.wav")
+    rate, samples = 48000, 72000
+    pcm = np.zeros((1, samples * 2), dtype=np.int16)
+    pcm[0, 0::2] = tone_pcm(0, samples)
+    with av.open(path, "w") as output:
+        stream = output.add_stream("pcm_s16le", rate=rate, layout="stereo")
+        for start in range(0, samples, 1000):
+            frame = av.AudioFrame.from_ndarray(pcm[:, start * 2 : (start + 1000) * 2], format="s16", layout="stereo")
+            frame.sample_rate = rate
+            frame.pts = start
+            output.mux(stream.encode(frame))
+        output.mux(stream.encode())
+    return path
+
+
+@pytest.fixture
+def own_tone(tone, tmp_path):
+    """A private copy of :func:`tone`, for tests that write or change sidecars."""
+    return shutil.copy(tone, tmp_path / "tone.wav")
+
+
+@pytest.fixture(scope="session")
+def talking_clip(media):
+    """A 160x120, 24 fps clip of 48 frames with the audio of :func:`tone` for its 2 s."""
+    path = str(media / "talking.mkv")
+    rate, samples = 48000, 96000
+    pcm = np.zeros((1, samples * 2), dtype=np.int16)
+    pcm[0, 0::2] = tone_pcm(0, samples)
+    with av.open(path, "w") as output:
+        video = output.add_stream("libx264", rate=24)
+        video.width, video.height, video.pix_fmt = 160, 120, "yuv420p"
+        audio = output.add_stream("pcm_s16le", rate=rate, layout="stereo")
+        for i in range(48):
+            frame = av.VideoFrame.from_ndarray(np.full((120, 160, 3), i * 5, dtype=np.uint8), format="rgb24")
+            frame.pts = i
+            output.mux(video.encode(frame))
+            start = i * 2000
+            chunk = av.AudioFrame.from_ndarray(pcm[:, start * 2 : (start + 2000) * 2], format="s16", layout="stereo")
+            chunk.sample_rate = rate
+            chunk.pts = start
+            output.mux(audio.encode(chunk))
+        output.mux(video.encode())
+        output.mux(audio.encode())
+    return path
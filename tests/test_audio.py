@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from conftest import tone_pcm
+
+from simple_video_editor import AudioMixer, Clip, Envelope, Timeline
+
+
+def mix(timeline, **kwargs):
+    mixer = AudioMixer(timeline, **kwargs)
+    return np.concatenate([block.copy() for block in mixer.blocks()], axis=1)
+
+
+def tone(start, stop):
+    return tone_pcm(start, stop) / np.float32(32768)
+
+
+def test_blocks_have_block_samples_until_the_last(talking_clip):
+    timeline = Timeline(width=160, height=120, fps=24)
+    timeline.append(talking_clip, 0, 25)
+    mixer = AudioMixer(timeline, block_samples=1536)
+    sizes = [block.shape for block in mixer.blocks()]
+    assert mixer.samples == mixer.sample_of(25) == 50000
+    assert sizes[:-1] == [(2, 1536)] * (len(sizes) - 1)
+    assert sum(size[1] for size in sizes) == 50000
+
+
+def test_cuts_are_sample_accurate(talking_clip):
+    timeline = Timeline(width=160, height=120, fps=24)
+    timeline.append(talking_clip, 0, 24)
+    timeline.append(talking_clip, 30, 48)
+    out = mix(timeline, block_samples=1000)
+    assert out.shape == (2, 42 * 2000)
+    np.testing.assert_allclose(out[0, :48000], tone(0, 48000), atol=1e-6)
+    np.testing.assert_allclose(out[0, 48000:], tone(60000, 96000), atol=1e-6)
+    assert not out[1].any()
+
+
+def test_gaps_and_sources_without_audio_are_silent(talking_clip, clip):
+    timeline = Timeline(width=160, height=120, fps=24)
+    timeline.add(Clip(talking_clip, 0, 12, start=12))
+    timeline.add(Clip(clip, 0, 12, start=24))
+    out = mix(timeline, block_samples=4096)
+    assert out.shape == (2, 72000)
+    assert not out[:, :24000].any()
+    np.testing.assert_allclose(out[0, 24000:48000], tone(0, 24000), atol=1e-6)
+    assert not out[:, 48000:].any()
+
+
+@pytest.mark.parametrize("gain", [0.5, np.float32(0.5)])
+def test_gain(talking_clip, gain):
+    timeline = Timeline(width=160, height=120, fps=24)
+    timeline.add(Clip(talking_clip, 0, 12, gain=gain))
+    timeline.add(Clip(talking_clip, 0, 12, start=12, gain=Envelope([(0, 0.0), (12, 1.0)])))
+    out = mix(timeline, block_samples=1000)
+    np.testing.assert_allclose(out[0, :24000], 0.5 * tone(0, 24000), atol=1e-6)
+    ramp = np.arange(24000) / 2000 / 12
+    np.testing.assert_allclose(out[0, 24000:], ramp * tone(0, 24000), atol=1e-6)
+
+
+def test_transitions_crossfade_with_equal_power(talking_clip):
+    timeline = Timeline(width=160, height=120, fps=24)
+    timeline.add(Clip(talking_clip, 0, 24))
+    timeline.add(Clip(talking_clip, 12, 48, start=12, track=1))
+    timeline.add_transition(12, 24)
+    out = mix(timeline, block_samples=1000)
+    angle = (np.arange(24000) + 0.5) / 24000 * (np.pi / 2)
+    np.testing.assert_allclose(out[0, 24000:48000], (np.cos(angle) + np.sin(angle)) * tone(24000, 48000), atol=1e-5)
+    np.testing.assert_allclose(out[0, 48000:], tone(48000, 96000), atol=1e-6)
+
+
+def test_frames_are_timestamped_in_samples(talking_clip):
+    timeline = Timeline(width=160, height=120, fps=24)
+    timeline.append(talking_clip, 0, 12)
+    frames = list(AudioMixer(timeline, block_samples=5000).frames(start=1000))
+    assert [frame.pts for frame in frames] == [1000, 6000, 11000, 16000, 21000]
+    assert frames[-1].samples == 3000
+    assert all(frame.sample_rate == 48000 for frame in frames)
+
+
+def test_block_samples_must_be_positive():
+    with pytest.raises(ValueError):
+        AudioMixer(Timeline(width=160, height=120, fps=24), block_samples=0)
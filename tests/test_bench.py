@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+from simple_video_editor import bench
+
+
+def test_compare_reports_positive_changes_for_faster_runs():
+    old = {"results": {"decode_fps": 100.0, "seek_p50_ms": 20.0, "export_workers1_s": 4.0, "frames": 240}}
+    new = {"results": {"decode_fps": 150.0, "seek_p50_ms": 10.0, "export_workers1_s": 5.0, "frames": 240}}
+    changes = bench.compare(old, new)
+    assert changes == pytest.approx({"decode_fps": 0.5, "seek_p50_ms": 1.0, "export_workers1_s": -0.2})
+
+
+def test_main_writes_a_report_and_compares_it(tmp_path, capsys):
+    argv = ["--width", "64", "--height", "48", "--seconds", "1", "--fps", "12", "--workers", "1"]
+    assert bench.main([*argv, "--output", str(tmp_path / "old.json")]) == 0
+    report = json.loads((tmp_path / "old.json").read_text())
+    assert report["config"]["width"] == 64
+    results = report["results"]
+    assert results["frames"] == 12 and results["export_frames"] == 11
+    assert all(value > 0 for value in results.values())
+    assert bench.main([*argv, "--output", str(tmp_path / "new.json"), "--compare", str(tmp_path / "old.json")]) == 0
+    assert "decode_fps" in capsys.readouterr().err
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from simple_video_editor.cache import FrameCache
+
+
+def _frame(value, nbytes=100):
+    return np.full(nbytes, value, dtype=np.uint8)
+
+
+def test_evicts_least_recently_used_frames_to_stay_within_budget():
+    cache = FrameCache(max_bytes=300)
+    for i in range(3):
+        cache.put("a.mp4", i, _frame(i))
+    assert cache.get("a.mp4", 0) is not None  # Frame 0 is now the most recent.
+    cache.put("a.mp4", 3, _frame(3))
+    assert ("a.mp4", 1) not in cache
+    assert [("a.mp4", i) in cache for i in (0, 2, 3)] == [True, True, True]
+    assert cache.nbytes == 300
+    stats = cache.stats
+    assert (stats.hits, stats.evictions, stats.entries) == (1, 1, 3)
+
+
+def test_budget_counts_bytes_not_entries():
+    cache = FrameCache(max_bytes=1000)
+    for i in range(5):
+        cache.put("a.mp4", i, _frame(i, 100))
+    cache.put("b.mp4", 0, _frame(9, 700))
+    assert cache.nbytes <= 1000
+    assert ("b.mp4", 0) in cache and len(cache) == 4  # Two 100-byte frames made room.
+    cache.put("c.mp4", 0, _frame(1, 1001))  # Larger than the budget: returned, never cached.
+    assert ("c.mp4", 0) not in cache and ("b.mp4", 0) in cache
+
+
+def test_replacing_a_frame_updates_its_size_and_stored_frames_are_read_only():
+    cache = FrameCache(max_bytes=1000)
+    cache.put("a.mp4", 0, _frame(1, 400))
+    stored = cache.put("a.mp4", 0, _frame(2, 100))
+    assert cache.nbytes == 100
+    with pytest.raises(ValueError):
+        stored[0] = 0
+
+
+def test_invalidate_drops_only_the_requested_range():
+    cache = FrameCache()
+    for i in range(10):
+        cache.put("a.mp4", i, _frame(i))
+        cache.put("b.mp4", i, _frame(i))
+    assert cache.invalidate("a.mp4", 2, 5) == 3
+    assert [("a.mp4", i) in cache for i in range(6)] == [True, True, False, False, False, True]
+    assert cache.invalidate("b.mp4") == 10
+    assert len(cache) == 7
+
+
+def test_get_or_load_loads_once():
+    cache = FrameCache()
+    calls = []
+    for _ in range(3):
+        image = cache.get_or_load("a.mp4", 5, lambda: calls.append(1) or _frame(5))
+    assert calls == [1] and image[0] == 5
+    assert cache.stats.hit_rate == pytest.approx(2 / 3)
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+import simple_video_editor.render as render
+from simple_video_editor import Clip, FrameDecoder, Region, Timeline
+from simple_video_editor.composite import Layer, alpha, draw, over, place, stack
+from simple_video_editor.timeline import Transition
+from simple_video_editor.yuv import YUV420P, planes
+
+
+def _clip(track=0, box=None, opacity=1.0):
+    return Clip("a.mp4", 0, 10, track=track, box=box, opacity=opacity)
+
+
+def test_place():
+    assert place(_clip(), 160, 120) == Region.full(160, 120)
+    assert place(_clip(box=(0.1, 0.2, 0.3, 0.4)), 160, 120) == Region(16, 24, 64, 72)
+    assert place(_clip(box=(0.01, 0.01, 0.5, 0.5)), 170, 110) == Region(2, 1, 87, 56)
+    even = place(_clip(box=(0.01, 0.01, 0.5, 0.5)), 170, 110, YUV420P)
+    assert even == Region(2, 2, 86, 56)
+    assert place(_clip(box=(0.999, 0.5, 0.001, 0.5)), 160, 120).width == 0
+
+
+def test_opaque_layers_hide_what_is_below():
+    clips = [_clip(track=t) for t in range(5)]
+    assert [layer.clip for layer in stack(clips, 160, 120)] == clips[-1:]
+    clips[-1].opacity = 0.5
+    assert [layer.clip for layer in stack(clips, 160, 120)] == clips[-2:]
+    assert [layer.opaque for layer in stack(clips, 160, 120)] == [True, False]
+
+
+def test_boxes_hide_only_the_layers_inside_them():
+    bottom = _clip()
+    small = _clip(track=1, box=(0.1, 0.1, 0.2, 0.2))
+    large = _clip(track=2, box=(0.0, 0.0, 0.5, 0.5))
+    beside = _clip(track=3, box=(0.5, 0.5, 0.5, 0.5))
+    layers = stack([bottom, small, large, beside], 160, 120)
+    assert [layer.clip for layer in layers] == [bottom, large, beside]
+    assert layers[1].region == Region(0, 0, 80, 60)
+    empty = _clip(track=4, box=(0.999, 0.0, 0.001, 1.0))
+    assert empty not in [layer.clip for layer in stack([bottom, empty], 160, 120)]
+
+
+def test_a_fading_clip_hides_nothing():
+    bottom, top = _clip(), _clip(track=1)
+    layers = stack([bottom, top], 160, 120, fading=top)
+    assert layers == [Layer(bottom, Region.full(160, 120), True), Layer(top, Region.full(160, 120), False)]
+    top.opacity = 0.5
+    weights = alpha(layers[1], np.array([10, 11, 12]), Transition(10, 13))
+    np.testing.assert_allclose(weights, 0.5 * np.array([1, 2, 3]) / 4)
+
+
+def test_over():
+    rng = np.random.default_rng(0)
+    dst = rng.random((3, 8, 8, 3), dtype=np.float32)
+    src = rng.random((3, 8, 8, 3), dtype=np.float32) * 0.5
+    a = np.array([0.0, 0.5, 1.0], dtype=np.float32)
+    expected = src + dst * (1 - a)[:, None, None, None]
+    np.testing.assert_allclose(over(dst, src, a), expected, rtol=1e-6)
+    dst8, src8 = (dst * 255).astype(np.uint8), (src * 255).astype(np.uint8)
+    blended = over(dst8, src8, a)
+    reference = np.rint(src8 + dst8.astype(np.float64) * (1 - a)[:, None, None, None]).clip(0, 255)
+    np.testing.assert_array_equal(blended, reference)
+    with pytest.raises(ValueError):
+        over(dst8, src8[:, :4], a)
+
+
+def test_draw_blends_only_inside_the_box():
+    rng = np.random.default_rng(1)
+    canvas = rng.integers(0, 256, size=(2, 40, 60, 3), dtype=np.uint8)
+    before = canvas.copy()
+    layer = rng.integers(0, 256, size=(2, 20, 30, 3), dtype=np.uint8)
+    region = Region(10, 6, 40, 26)
+    draw(canvas, layer.copy(), region, np.array([1.0, 0.25], dtype=np.float32))
+    inside = region.slices()
+    np.testing.assert_array_equal(canvas[0][inside], layer[0])
+    blend = 0.25 * layer[1].astype(float) + 0.75 * before[1][inside]
+    assert np.abs(canvas[1][inside] - blend).max() <= 1
+    outside = np.ones((40, 60), dtype=bool)
+    outside[inside] = False
+    np.testing.assert_array_equal(canvas[:, outside], before[:, outside])
+
+
+def test_draw_yuv_blends_towards_black_level():
+    canvas = np.random.default_rng(2).integers(0, 256, size=(1, 60, 40), dtype=np.uint8)
+    before = canvas.copy()
+    black = np.empty((1, 30, 20), dtype=np.uint8)
+    black[:, :20], black[:, 20:] = 16, 128
+    draw(canvas, black, Region(10, 20, 30, 40), np.array([0.5], dtype=np.float32), YUV420P)
+    y, u, v = planes(canvas)
+    y0, u0, v0 = planes(before)
+    np.testing.assert_array_equal(y[:, 20:40, 10:30], np.rint(16 + (y0[:, 20:40, 10:30] - 16.0) / 2))
+    np.testing.assert_array_equal(u[:, 10:20, 5:15], np.rint(128 + (u0[:, 10:20, 5:15] - 128.0) / 2))
+    np.testing.assert_array_equal(v[:, :10], v0[:, :10])
+    np.testing.assert_array_equal(y[:, :20], y0[:, :20])
+
+
+@pytest.mark.parametrize("pixel_format", ["rgb24", YUV420P])
+def test_rendered_stacks(clip, pixel_format, monkeypatch):
+    timeline = Timeline(160, 120, 24)
+    for track in range(4):
+        timeline.add(Clip(clip, track, track + 12, track=track))
+    timeline.add(Clip(clip, 20, 32, track=4, box=(0.5, 0.5, 0.25, 0.5)))
+    decoded = []
+    clip_frames = render._clip_frames
+    monkeypatch.setattr(render, "_clip_frames", lambda t, c, *args: decoded.append(c) or clip_frames(t, c, *args))
+    rendered = np.concatenate([b.copy() for b in render.render_batches(timeline, pixel_format=pixel_format)])
+    assert decoded == timeline.clips[3:]
+    with FrameDecoder(clip, start=3, stop=15, pixel_format=pixel_format) as decoder:
+        top = np.stack([frame.image.copy() for frame in decoder])
+    with FrameDecoder(clip, start=20, stop=32, pixel_format=pixel_format, size=(40, 60)) as decoder:
+        boxed = np.stack([frame.image.copy() for frame in decoder])
+    if pixel_format == YUV420P:
+        for whole, box, scale in zip(planes(rendered), planes(boxed), (1, 2, 2)):
+            np.testing.assert_array_equal(whole[:, 60 // scale :, 80 // scale : 120 // scale], box)
+        np.testing.assert_array_equal(planes(rendered).y[:, :60], planes(top).y[:, :60])
+    else:
+        np.testing.assert_array_equal(rendered[:, 60:, 80:120], boxed)
+        np.testing.assert_array_equal(rendered[:, :60], top[:, :60])
@@ -0,0 +1,83 @@
+import threading
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from simple_video_editor import FrameDecoder, FrameRing, iter_frames
+from simple_video_editor import decoder as decoder_module
+from simple_video_editor.yuv import RGB24, YUV420P
+
+
+def _collect(path, timeout=30, **kwargs):
+    """Decode ``path`` on a helper thread, failing instead of hanging if the decoder deadlocks."""
+    result = []
+
+    def run():
+        result.extend((frame.index, frame.image.copy()) for frame in iter_frames(path, **kwargs))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "decoder did not finish"
+    return result
+
+
+@pytest.mark.parametrize("buffer_size", [1, 2, 4])
+def test_every_buffer_size_yields_the_same_frames(clip, buffer_size):
+    frames = _collect(clip, buffer_size=buffer_size)
+    reference = _collect(clip, buffer_size=8)
+    assert [i for i, _ in frames] == list(range(48))
+    assert all(np.array_equal(a, b) for (_, a), (_, b) in zip(frames, reference))
+
+
+def test_start_and_stop_select_frames(clip):
+    frames = _collect(clip, start=13, stop=20)
+    reference = _collect(clip)
+    assert [i for i, _ in frames] == list(range(13, 20))
+    assert all(np.array_equal(image, reference[i][1]) for i, image in frames)
+
+
+def test_memory_is_bounded_by_the_ring(clip):
+    with FrameDecoder(clip, buffer_size=3) as decoder:
+        assert decoder.ring.nbytes == 3 * 120 * 160 * 3
+
+
+@pytest.mark.parametrize("pixel_format", [RGB24, YUV420P])
+@pytest.mark.parametrize("size", [None, (90, 50)])
+def test_frames_are_copied_into_the_ring_slots(clip, monkeypatch, pixel_format, size):
+    def decode():
+        with FrameDecoder(clip, stop=6, pixel_format=pixel_format, size=size, buffer_size=2) as decoder:
+            return [frame.image.copy() for frame in decoder]
+
+    copied = decode()
+    monkeypatch.setattr(decoder_module, "_copy_frame", lambda frame, out: out.__setitem__(..., frame.to_ndarray()))
+    assert all(np.array_equal(a, b) for a, b in zip(copied, decode(), strict=True))
+
+
+@pytest.mark.parametrize("pixel_format", [RGB24, YUV420P])
+def test_frames_are_not_copied_through_a_temporary_array(large_clip, pixel_format):
+    with FrameDecoder(large_clip, pixel_format=pixel_format, buffer_size=2) as decoder:
+        tracemalloc.start()
+        try:
+            for frame in decoder:
+                frame.image.max()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    assert peak < frame.image.nbytes
+
+
+def test_ring_rejects_zero_depth():
+    with pytest.raises(ValueError):
+        FrameRing(0, (2, 2, 3))
+
+
+def test_reader_errors_reach_the_consumer(clip, monkeypatch):
+    class Broken:
+        def reformat(self, *args, **kwargs):
+            raise ValueError("broken scaler")
+
+    monkeypatch.setattr(decoder_module, "VideoReformatter", Broken)
+    with pytest.raises(ValueError, match="broken scaler"):
+        list(iter_frames(clip))
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from simple_video_editor import effects
+from simple_video_editor.effects import Brightness, Contrast, FadeIn, FadeOut, Gamma, apply_chain
+
+
+@pytest.fixture
+def batch():
+    return np.random.default_rng(0).integers(0, 256, size=(4, 12, 16, 3), dtype=np.uint8)
+
+
+def _reference(frames, curve):
+    """``curve`` applied to ``frames`` in float64, rounded back to uint8."""
+    return np.rint(np.clip(curve(frames / 255.0), 0, 1) * 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize(
+    "function, argument, curve",
+    [
+        (effects.brightness, 0.1, lambda x: x + 0.1),
+        (effects.contrast, 1.5, lambda x: (x - 0.5) * 1.5 + 0.5),
+        (effects.gamma, 2.2, lambda x: x ** (1 / 2.2)),
+    ],
+)
+def test_uint8_and_float32_effects_match_the_curve(batch, function, argument, curve):
+    assert np.array_equal(function(batch, argument), _reference(batch, curve))
+    floats = batch.astype(np.float32) / 255
+    assert np.allclose(function(floats, argument), np.clip(curve(floats.astype(np.float64)), 0, 1), atol=1e-6)
+
+
+def test_out_applies_in_place_and_is_checked(batch):
+    expected = effects.brightness(batch, -0.2)
+    frames = batch.copy()
+    assert effects.brightness(frames, -0.2, out=frames) is frames
+    assert np.array_equal(frames, expected)
+    with pytest.raises(ValueError):
+        effects.brightness(batch, 0.1, out=np.empty((1, 12, 16, 3), dtype=np.uint8))
+    with pytest.raises(TypeError):
+        effects.brightness(batch.astype(np.int16), 0.1)
+
+
+def test_fades_weight_each_frame(batch):
+    weights = np.array([0.0, 0.25, 0.5, 1.0], dtype=np.float32)
+    faded = effects.fade(batch, weights)
+    for n, weight in enumerate(weights):
+        assert np.array_equal(faded[n], _reference(batch[n], lambda x: x * weight))
+    positions = np.arange(4)
+    assert np.array_equal(FadeIn(3).apply(batch, positions, 10), effects.fade(batch, [0.25, 0.5, 0.75, 1.0]))
+    assert np.array_equal(FadeOut(3).apply(batch, positions + 6, 10), effects.fade(batch, [1.0, 0.75, 0.5, 0.25]))
+
+
+def test_cross_dissolve_blends_linearly(batch):
+    other = batch[::-1].copy()
+    mixed = effects.cross_dissolve(batch, other, [0.0, 1.0, 0.5, 0.5])
+    assert np.array_equal(mixed[0], batch[0]) and np.array_equal(mixed[1], other[1])
+    assert np.abs(mixed[2].astype(int) - (batch[2].astype(int) + other[2]) / 2).max() <= 0.5
+
+
+def test_apply_chain_runs_effects_in_order(batch):
+    chain = [Gamma(1.8), Brightness(0.05), Contrast(1.2)]
+    expected = batch.copy()
+    for effect in chain:
+        expected = effect.apply(expected, np.arange(4), 4)
+    assert np.array_equal(apply_chain(chain, batch.copy(), np.arange(4), 4), expected)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from simple_video_editor import Clip, Envelope, Project, Timeline
+from simple_video_editor.timeline import Transition
+
+
+def test_clip_records_have_no_instance_dict():
+    for item in (Clip("a.mp4", 0, 10), Transition(0, 5), Envelope([(0, 1.0)])):
+        assert not hasattr(item, "__dict__")
+        with pytest.raises(AttributeError):
+            item.label = "x"
+
+
+def test_envelope_interpolates_and_holds_its_ends():
+    envelope = Envelope([(10, 1.0), (0, 0.0), (20, 0.5)])
+    assert envelope.frames.tolist() == [0, 10, 20] and envelope.values.dtype == np.float32
+    values = envelope(np.array([-5, 0, 2.5, 10, 15, 20, 99]))
+    np.testing.assert_allclose(values, [0, 0, 0.25, 1, 0.75, 0.5, 0.5])
+    assert values.dtype == np.float32
+
+
+def test_from_arrays_matches_points():
+    frames = np.linspace(0, 1000, 5001)
+    values = np.sin(frames / 50)
+    built = Envelope.from_arrays(frames, values)
+    points = Envelope(zip(frames, values))
+    np.testing.assert_array_equal(built.frames, points.frames)
+    np.testing.assert_array_equal(built.values, points.values)
+    with pytest.raises(ValueError):
+        Envelope.from_arrays(frames, values[:-1])
+    with pytest.raises(ValueError):
+        Envelope.from_arrays([], [])
+
+
+def test_over_evaluates_a_run_of_frames():
+    envelope = Envelope([(0, 0.0), (24, 1.0)])
+    np.testing.assert_array_equal(envelope.over(6, 30, 0.5), envelope(np.arange(6, 30, 0.5)))
+    assert len(envelope.over(0, 1, 1 / 2000)) == 2000
+    assert len(envelope.over(5, 5)) == 0
+
+
+def test_projects_store_envelopes_as_arrays(tmp_path):
+    path = tmp_path / "edit.sve"
+    timeline = Timeline(160, 120, 24)
+    frames = np.arange(0, 48, 0.25)
+    timeline.add(Clip("a.mp4", 0, 48, gain=Envelope.from_arrays(frames, frames / 48)))
+    Project.create(path, timeline)
+    assert '"frames":[0.0,0.25,' in path.read_text()
+    gain = Project.open(path).timeline.clips[0].gain
+    np.testing.assert_array_equal(gain.frames, frames)
+    np.testing.assert_array_equal(gain.values, (frames / 48).astype(np.float32))
+
+
+def test_format_1_projects_load_and_upgrade_on_save(tmp_path):
+    path = tmp_path / "edit.sve"
+    path.write_text(
+        'SVE-PROJECT 1 {"width": 160, "height": 120, "fps": "24"}\n'
+        'C 0 0 24 0 {"source":"a.mp4","in":0,"out":24,"effects":[],"gain":{"envelope":[[0,0.0],[24,1.0]]}}\n'
+    )
+    project = Project.open(path)
+    np.testing.assert_array_equal(project.timeline.clips[0].gain.over(0, 25, 12), [0.0, 0.5, 1.0])
+    project.save()
+    assert path.read_text().startswith("SVE-PROJECT 2 ") and "envelope" not in path.read_text()
+    assert Project.open(path).timeline.clips[0].gain.frames.tolist() == [0, 24]
@@ -0,0 +1,61 @@
+import hashlib
+import importlib
+
+import numpy as np
+
+from simple_video_editor import ExportSettings, FadeIn, Timeline, export, iter_frames
+from simple_video_editor.export import plan_export
+from simple_video_editor.keyframes import KeyframeIndex
+
+export_module = importlib.import_module("simple_video_editor.export")
+
+
+def _digest(path):
+    with open(path, "rb") as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+def test_export_is_byte_identical_across_runs_and_worker_counts(clip, large_clip, tmp_path):
+    timeline = Timeline(width=160, height=120, fps=24)
+    timeline.append(large_clip, 0, 30, effects=[FadeIn(10)])
+    timeline.append(clip, 0, 30)
+    digests = []
+    for workers in (1, 1, 2, 1, 2, 1):
+        export(timeline, tmp_path / "out.mp4", workers=workers, max_segment_frames=12)
+        digests.append(_digest(tmp_path / "out.mp4"))
+    assert len(set(digests)) == 1
+
+
+def _frames(path):
+    return np.stack([frame.image.copy() for frame in iter_frames(path)])
+
+
+def test_stream_copy_is_planned_only_for_sources_matching_the_encoder(clip):
+    timeline = Timeline(width=160, height=120, fps=24)
+    timeline.append(clip, 0, 40)
+    # make_test_clip encodes with libx264's defaults, crf 23 among them.
+    matching = plan_export(timeline, ExportSettings(options={"crf": "23"}), max_segment_frames=12)
+    tail = KeyframeIndex.for_source(clip).keyframe_before(40)
+    assert [(s.start, s.stop, s.copy) for s in matching] == [(0, tail, True), (tail, 40, False)]
+    assert not any(s.copy for s in plan_export(timeline, ExportSettings(), max_segment_frames=12))
+
+
+def test_stream_copy_matches_re_encoding_and_encodes_once(clip, tmp_path, monkeypatch):
+    timeline = Timeline(width=160, height=120, fps=24)
+    timeline.append(clip, 0, 40)
+    settings = ExportSettings(options={"crf": "23"}, audio_codec=None)
+    calls = []
+    encode_all = export_module._encode_all
+    monkeypatch.setattr(export_module, "_encode_all", lambda *args: calls.append(args[1]) or encode_all(*args))
+
+    export(timeline, tmp_path / "copy.mp4", settings=settings, workers=1, max_segment_frames=12)
+    export(timeline, tmp_path / "encode.mp4", settings=settings, workers=1, max_segment_frames=12, stream_copy=False)
+
+    assert len(calls) == 2
+    tail = KeyframeIndex.for_source(clip).keyframe_before(40)
+    source = _frames(clip)[:40]
+    copied, encoded = _frames(tmp_path / "copy.mp4"), _frames(tmp_path / "encode.mp4")
+    assert copied.shape == encoded.shape == source.shape
+    assert np.array_equal(copied[:tail], source[:tail])
+    assert np.abs(encoded.astype(np.int16) - source).mean() < 3
+    assert np.abs(copied[tail:].astype(np.int16) - source[tail:]).mean() < 3
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import simple_video_editor.framestore as framestore
+from simple_video_editor import Brightness, SharedFrameStore, Timeline, render_parallel
+from simple_video_editor.render import render_range
+
+
+@pytest.mark.parametrize("backed_by_file", [False, True])
+def test_attached_views_share_memory_with_the_owner(tmp_path, backed_by_file):
+    path = tmp_path / "frames.raw" if backed_by_file else None
+    with SharedFrameStore(3, (4, 5, 3), path=path) as store:
+        with SharedFrameStore.attach(store.handle) as other:
+            assert len(other) == 3 and store.nbytes == 3 * 4 * 5 * 3
+            other[1] = np.full((4, 5, 3), 7, dtype=np.uint8)
+        assert np.all(store[1] == 7)
+        with SharedFrameStore.attach(store.handle) as again:  # Still there after another process unmaps it.
+            assert np.all(again[1] == 7)
+
+
+def test_workers_unmap_the_store_after_each_chunk(clip, monkeypatch):
+    timeline = Timeline(160, 120, 24)
+    timeline.append(clip, 0, 10)
+    closed = []
+    close = SharedFrameStore.close
+    monkeypatch.setattr(SharedFrameStore, "close", lambda self: closed.append(self.owner) or close(self))
+    monkeypatch.setattr(framestore, "_worker_state", (timeline, None))
+    with SharedFrameStore(10, (120, 160, 3)) as store:
+        assert framestore._render_into(0, 4, store.handle, 0) == 4
+        assert framestore._render_into(4, 10, store.handle, 4) == 6
+        assert closed == [False, False]
+        np.testing.assert_array_equal(store[:], np.stack([frame.copy() for frame in render_range(timeline)]))
+
+
+def test_render_parallel_yields_the_frames_in_order(clip, tmp_path):
+    timeline = Timeline(160, 120, 24)
+    timeline.append(clip, 0, 20, effects=[Brightness(0.1)])
+    timeline.append(clip, 30, 45)
+    expected = [frame.copy() for frame in render_range(timeline)]
+    for path in (None, tmp_path / "store.raw"):
+        frames = [frame.copy() for frame in render_parallel(timeline, workers=2, chunk_frames=4, path=path)]
+        assert len(frames) == len(expected)
+        assert all(np.array_equal(a, b) for a, b in zip(frames, expected))
+    partial = [frame.copy() for frame in render_parallel(timeline, 10, 25, workers=2, chunk_frames=4)]
+    assert all(np.array_equal(a, b) for a, b in zip(partial, expected[10:25]))
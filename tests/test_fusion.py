@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+import simple_video_editor.effects as effects
+from simple_video_editor import Brightness, Contrast, Crop, FadeIn, FadeOut, Gamma
+from simple_video_editor.effects import Effect, apply_chain, fuse
+from simple_video_editor.yuv import RGB24, YUV420P
+
+
+class Invert(Effect):
+    """A pointwise effect without a lookup table."""
+
+    pointwise = True
+
+    def apply(self, frames, positions, length, out=None):
+        return np.subtract(255, frames, out=frames if out is None else out)
+
+
+def sequential(effects, frames, positions, length):
+    for effect in effects:
+        frames = effect.apply(frames, positions, length, out=frames)
+    return frames
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return np.random.default_rng(0).integers(0, 256, size=(6, 24, 32, 3), dtype=np.uint8)
+
+
+def test_runs_of_table_effects_are_merged():
+    chain = [Brightness(0.1), Contrast(1.2), Crop(0, 0, 0.5, 0.5), Gamma(0.9), Invert(), FadeIn(3), FadeOut(3)]
+    fused = fuse(chain)
+    assert [type(effect).__name__ for effect in fused] == ["_Fused", "Crop", "Gamma", "Invert", "_Fused"]
+    assert fused[0].effects == chain[:2] and fused[4].effects == chain[5:]
+    assert fused[0].formats == (RGB24,) and fused[4].formats == (RGB24, YUV420P)
+    assert fuse([]) == []
+
+
+@pytest.mark.parametrize(
+    "chain",
+    [
+        [Brightness(0.1), Contrast(1.3)],
+        [Contrast(0.7), Gamma(2.2), Brightness(-0.2), FadeIn(4), FadeOut(3)],
+        [Gamma(0.45), Gamma(2.2)],
+        [Brightness(0.3), Brightness(0.3), Brightness(-0.6)],
+    ],
+)
+def test_fused_rgb_matches_sequential(frames, chain):
+    positions = np.arange(6)
+    (fused,) = fuse(chain)
+    expected = sequential(chain, frames.copy(), positions, 8)
+    np.testing.assert_array_equal(fused.apply(frames.copy(), positions, 8), expected)
+    np.testing.assert_array_equal(apply_chain(chain, frames.copy(), positions, 8), expected)
+
+
+def test_fused_yuv_matches_sequential():
+    planar = np.random.default_rng(1).integers(0, 256, size=(6, 36, 32), dtype=np.uint8)
+    chain = [FadeIn(4), FadeOut(4), FadeIn(2)]
+    positions = np.arange(6)
+    expected = sequential(chain, planar.copy(), positions, 8)
+    np.testing.assert_array_equal(fuse(chain)[0].apply(planar.copy(), positions, 8), expected)
+    np.testing.assert_array_equal(apply_chain(chain, planar.copy(), positions, 8, pixel_format=YUV420P), expected)
+
+
+def test_float_frames_go_through_each_effect(frames):
+    chain = [Brightness(0.1), Gamma(1.5), FadeOut(4)]
+    floats = frames.astype(np.float32) / 255
+    positions = np.arange(6)
+    expected = sequential(chain, floats.copy(), positions, 8)
+    np.testing.assert_array_equal(fuse(chain)[0].apply(floats.copy(), positions, 8), expected)
+
+
+def test_a_single_table_pass(frames, monkeypatch):
+    calls = []
+    apply_lut = effects.apply_lut
+    monkeypatch.setattr(effects, "apply_lut", lambda *args: calls.append(1) or apply_lut(*args))
+    apply_chain([Brightness(0.1), Contrast(1.3), Gamma(1.1), FadeIn(2)], frames.copy(), np.arange(6), 8)
+    assert len(calls) == len(frames)
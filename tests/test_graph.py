@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from simple_video_editor import Brightness, Clip, Timeline, TimelineGraph
+from simple_video_editor.graph import intersect_ranges, merge_ranges, subtract_ranges
+
+
+def test_range_helpers():
+    assert merge_ranges([(5, 8), (0, 2), (2, 4), (7, 9), (3, 3)]) == [(0, 4), (5, 9)]
+    assert subtract_ranges([(0, 10), (20, 30)], [(2, 4), (8, 22)]) == [(0, 2), (4, 8), (22, 30)]
+    assert intersect_ranges([(0, 10), (20, 30)], [(5, 25)]) == [(5, 10), (20, 25)]
+
+
+@pytest.fixture
+def timeline(clip):
+    timeline = Timeline(160, 120, 24)
+    timeline.add(Clip(clip, 0, 30, start=0))
+    timeline.add(Clip(clip, 10, 30, start=20, track=1))
+    timeline.add(Clip(clip, 0, 10, start=0, track=2, box=(0.5, 0.5, 0.25, 0.25)))
+    return timeline
+
+
+def test_edits_return_the_frames_they_change(timeline, clip):
+    bottom, top, boxed = timeline.clips
+    with TimelineGraph(timeline) as graph:
+        assert graph.footprint(bottom) == [(0, 20)]  # Frames 20-29 are hidden by the clip above.
+        assert graph.update_clip(top, effects=[Brightness(0.1)]) == [(20, 40)]
+        assert graph.update_clip(boxed, start=5) == [(0, 15)]
+        assert graph.update_clip(top, start=25) == [(20, 45)]
+        hidden = graph.add_clip(Clip(clip, 0, 5, start=30, track=0))
+        assert hidden == []  # Entirely under the opaque clip on track 1.
+        transition, dirty = graph.add_transition(24, 28)
+        assert dirty == [(24, 28)]
+        assert graph.remove_transition(transition) == [(24, 28)]
+
+
+def test_only_invalidated_frames_are_evaluated_again(timeline):
+    top = timeline.clips[1]
+    with TimelineGraph(timeline) as graph:
+        before = {f: graph.frame(f).copy() for f in range(0, 40, 3)}
+        dirty = graph.update_clip(top, effects=[Brightness(0.2)])
+        kept = [f for f in before if not any(lo <= f < hi for lo, hi in dirty)]
+        for f in before:
+            assert ((graph, f) in graph.cache) == (f in kept)
+        for f in kept:
+            assert np.array_equal(graph.frame(f), before[f])
+        changed = graph.frame(30)
+        assert changed.astype(int).sum() > before[30].astype(int).sum()
+
+
+def test_covered_clips_are_not_decoded(timeline, monkeypatch):
+    bottom = timeline.clips[0]
+    with TimelineGraph(timeline) as graph:
+        assert graph.node(25) is graph.clip_node(timeline.clips[1])
+        evaluated = []
+        node = graph.clip_node(bottom)
+        monkeypatch.setattr(node, "evaluate", lambda *args: evaluated.append(args))
+        graph.frame(25)
+        assert evaluated == []
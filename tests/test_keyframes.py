@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from simple_video_editor import FrameCache, VideoSource, iter_frames
+from simple_video_editor.keyframes import KeyframeIndex
+
+
+@pytest.fixture(scope="module")
+def decoded(clip):
+    return np.stack([frame.image.copy() for frame in iter_frames(clip)])
+
+
+def test_index_lists_every_frame_and_its_keyframes(clip):
+    index = KeyframeIndex.build(clip)
+    assert len(index) == 48
+    assert np.all(np.diff(index.pts) > 0)
+    keyframes = index.keyframes.tolist()
+    assert keyframes[0] == 0
+    for frame in range(48):
+        before = index.keyframe_before(frame)
+        assert before == max(k for k in keyframes if k <= frame)
+        assert index.keyframe_after(frame) == min([k for k in keyframes if k >= frame], default=48)
+        assert index.is_keyframe(frame) == (frame in keyframes)
+        assert index.frame_at(index.time_of(frame)) == frame
+        assert index.frame_of_pts(int(index.pts[frame])) == frame
+    with pytest.raises(IndexError):
+        index.keyframe_before(48)
+
+
+def test_random_access_matches_sequential_decoding(clip, decoded):
+    order = np.random.default_rng(0).permutation(48).tolist() + [47, 0, 1, 2, 30, 31]
+    with VideoSource(clip) as source:
+        assert len(source) == 48
+        for frame in order:
+            assert np.array_equal(source.frame(frame), decoded[frame]), frame
+
+
+def test_cache_serves_frames_decoded_on_the_way(clip, decoded):
+    cache = FrameCache()
+    with VideoSource(clip, cache=cache) as source:
+        source.frame(20)
+        misses = cache.stats.misses
+        for frame in range(KeyframeIndex.for_source(clip).keyframe_before(20), 21):
+            assert np.array_equal(source.frame(frame), decoded[frame])
+        assert cache.stats.misses == misses
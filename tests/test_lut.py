@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from simple_video_editor import ColorLUT
+from simple_video_editor.lut import LUT3D, load_lut
+
+
+def _write_cube(path, size, transform=lambda rgb: rgb):
+    lattice = np.linspace(0.0, 1.0, size)
+    lines = [f"LUT_3D_SIZE {size}"]
+    for b in lattice:
+        for g in lattice:
+            for r in lattice:
+                lines.append("%.6f %.6f %.6f" % tuple(transform(np.array([r, g, b]))))
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+@pytest.fixture(scope="module")
+def identity_cube(tmp_path_factory):
+    return _write_cube(tmp_path_factory.mktemp("luts") / "identity.cube", 17)
+
+
+@pytest.fixture
+def frames():
+    return np.random.default_rng(0).integers(0, 256, size=(2, 24, 32, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("method", ["tetrahedral", "trilinear"])
+def test_identity_lut_leaves_frames_unchanged(identity_cube, frames, method):
+    lut = LUT3D.load(identity_cube)
+    assert np.array_equal(lut.apply(frames, method), frames)
+    floats = frames.astype(np.float32) / 255
+    assert np.allclose(lut.apply(floats, method), floats, atol=1e-6)
+
+
+@pytest.mark.parametrize("apply", [LUT3D.apply, LUT3D.apply_u8])
+def test_strided_out_receives_the_result(identity_cube, frames, apply):
+    lut = LUT3D.load(_write_cube(identity_cube.parent / "invert.cube", 5, lambda rgb: 1 - rgb))
+    canvas = np.zeros((2, 48, 32, 3), dtype=np.uint8)
+    out = canvas[:, ::2]
+    assert apply(lut, frames, out=out) is out
+    np.testing.assert_array_equal(out, 255 - frames)
+    assert not canvas[:, 1::2].any()
+
+
+def test_lut_reads_red_fastest(tmp_path):
+    swap = LUT3D.load(_write_cube(tmp_path / "swap.cube", 2, lambda rgb: rgb[::-1]))
+    colour = np.array([[255, 128, 0]], dtype=np.uint8)
+    assert swap.apply(colour).tolist() == [[0, 128, 255]]
+
+
+def test_u8_table_is_built_once_and_shared_through_the_sidecar(identity_cube, frames):
+    lut = LUT3D.load(identity_cube)
+    assert not lut.has_table_u8()
+    assert np.array_equal(lut.apply_u8(frames), frames)
+    codes = np.arange(0, 256**3, 4099)
+    assert np.array_equal(lut.table_u8()[codes], np.stack([codes >> 16, (codes >> 8) & 255, codes & 255], axis=1))
+    other = LUT3D.load(identity_cube)  # Another process, as far as the LUT can tell.
+    assert other.has_table_u8()
+    assert not other.has_table_u8("trilinear")
+
+
+def test_color_lut_interpolates_short_renders_without_building_the_table(tmp_path, frames):
+    cube = _write_cube(tmp_path / "warm.cube", 9, lambda rgb: np.clip(rgb * [1.1, 1.0, 0.9], 0, 1))
+    effect = ColorLUT(str(cube))
+    graded = effect.apply(frames, np.arange(len(frames)), len(frames))
+    assert np.array_equal(graded, load_lut(cube).apply(frames))
+    assert not load_lut(cube).has_table_u8()
@@ -0,0 +1,60 @@
+import tracemalloc
+
+import numpy as np
+
+from simple_video_editor.peaks import BASE_BUCKET, LEVEL_FACTOR, PeakSummary, _Builder, _reduce
+
+
+def _reference(pcm):
+    """Level-0 peaks of planar ``pcm`` computed directly."""
+    buckets = -(-pcm.shape[1] // BASE_BUCKET)
+    out = np.empty((buckets, pcm.shape[0], 2), dtype=np.int16)
+    for b in range(buckets):
+        block = np.clip(pcm[:, b * BASE_BUCKET : (b + 1) * BASE_BUCKET], -1, 1) * 32767.0
+        out[b, :, 0] = np.floor(block.min(axis=1))
+        out[b, :, 1] = np.ceil(block.max(axis=1))
+    return out
+
+
+def test_builder_matches_reference_for_any_frame_sizes():
+    rng = np.random.default_rng(1)
+    pcm = rng.uniform(-1.1, 1.1, size=(2, 400_003)).astype(np.float32)
+    builder = _Builder(48000, 2)
+    position = 0
+    while position < pcm.shape[1]:
+        size = int(rng.integers(1, 3000))
+        builder.add(pcm[:, position : position + size])
+        position += size
+    summary = builder.finish()
+    assert summary.samples == pcm.shape[1]
+    assert np.array_equal(summary.levels[0], _reference(pcm))
+    for finer, coarser in zip(summary.levels, summary.levels[1:]):
+        assert np.array_equal(coarser, _reduce(np.asarray(finer), LEVEL_FACTOR))
+    assert len(summary.levels[-1]) == 1
+    assert np.array_equal(summary.levels[-1][0, :, 0], summary.levels[0][:, :, 0].min(axis=0))
+    assert np.array_equal(summary.levels[-1][0, :, 1], summary.levels[0][:, :, 1].max(axis=0))
+
+
+def test_builder_memory_does_not_grow_with_the_track():
+    frame = np.random.default_rng(2).uniform(-1, 1, size=(1, 4097)).astype(np.float32)
+    builder = _Builder(48000, 1)
+    tracemalloc.start()
+    try:
+        for _ in range(2000):
+            builder.add(frame)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # 8M samples make 32k level-0 buckets (128 KiB); none of them stay in memory.
+    assert peak < 64 * 1024
+    summary = builder.finish()
+    assert [len(peaks) for peaks in summary.levels] == [32008, 8002, 2001, 501, 126, 32, 8, 2, 1]
+
+
+def test_summary_of_a_tone(tone):
+    [summary] = PeakSummary.build(tone)
+    assert (summary.sample_rate, summary.samples, summary.channels) == (48000, 72000, 2)
+    assert len(summary.levels[0]) == -(-72000 // BASE_BUCKET)
+    peaks = summary.waveform(0.0, summary.duration, columns=10)
+    assert np.allclose(peaks[:, 0, 1], 0.5, atol=0.01) and np.allclose(peaks[:, 0, 0], -0.5, atol=0.01)
+    assert np.all(peaks[:, 1] == 0)
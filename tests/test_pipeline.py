@@ -0,0 +1,31 @@
+import threading
+
+import pytest
+
+from simple_video_editor.pipeline import DEFAULT_PIPELINE_DEPTH, pipeline
+
+
+def test_stages_run_in_order_and_keep_items_in_order():
+    double = lambda items: (2 * x for x in items)
+    inc = lambda items: (x + 1 for x in items)
+    assert list(pipeline(range(100), double, inc, depth=2)) == [2 * x + 1 for x in range(100)]
+    assert list(pipeline(range(5), depth=DEFAULT_PIPELINE_DEPTH)) == list(range(5))
+
+
+def test_stage_errors_reach_the_consumer():
+    def broken(items):
+        for x in items:
+            if x == 3:
+                raise ValueError("stage failed")
+            yield x
+
+    with pytest.raises(ValueError, match="stage failed"):
+        list(pipeline(range(10), broken, depth=1))
+
+
+def test_closing_early_stops_the_stage_threads():
+    before = threading.active_count()
+    items = pipeline(iter(range(10**9)), lambda xs: (x for x in xs), depth=2)
+    assert next(items) == 0
+    items.close()
+    assert threading.active_count() == before
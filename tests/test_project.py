@@ -0,0 +1,94 @@
+import pytest
+
+from simple_video_editor import Brightness, Clip, Project, Timeline
+from simple_video_editor.project import ProjectError
+
+
+def _timeline(clips=20):
+    timeline = Timeline(160, 120, 24)
+    for i in range(clips):
+        timeline.add(Clip(f"clip{i}.mp4", 0, 30, start=30 * i, track=i % 2, effects=[Brightness(0.01 * i)]))
+    timeline.add_transition(25, 35)
+    return timeline
+
+
+def _state(timeline):
+    clips = sorted((c.source, c.start, c.end, c.track, c.effects) for c in timeline.clips)
+    return clips, sorted((t.start, t.stop) for t in timeline.transitions)
+
+
+def _lines(path):
+    with open(path, encoding="utf-8") as fh:
+        return fh.read().splitlines()
+
+
+def test_saves_append_changes_and_replay_to_the_same_timeline(tmp_path):
+    path = tmp_path / "edit.sve"
+    project = Project.create(path, _timeline())
+    timeline = project.timeline
+    written = len(_lines(path))
+    clip = timeline.clips[3]
+    project.update_clip(clip, start=clip.start + 12, effects=[Brightness(0.5)])
+    project.remove_clip(timeline.clips[0])
+    project.add_transition(100, 110)
+    assert project.save() == 3
+    assert len(_lines(path)) == written + 3
+    assert _state(Project.open(path).timeline) == _state(timeline)
+
+
+def test_clips_between_parses_only_visible_clips(tmp_path):
+    path = tmp_path / "edit.sve"
+    Project.create(path, _timeline())
+    project = Project.open(path)
+    assert len(project.placements()) == 20
+    visible = project.clips_between(0, 45)
+    assert sorted(c.source for c in visible) == ["clip0.mp4", "clip1.mp4"]
+    assert sum(r.clip is not None for r in project._records.values()) == 2
+
+
+def test_log_is_compacted_once_it_outgrows_the_project(tmp_path):
+    path = tmp_path / "edit.sve"
+    project = Project.create(path, _timeline(clips=5), compact_after=10)
+    clip = project.timeline.clips[0]
+    for step in range(1, 30):
+        project.update_clip(clip, start=step)
+        project.save()
+        assert len(_lines(path)) - 1 <= max(10, 2 * 6) + 1
+    assert _state(Project.open(path).timeline) == _state(project.timeline)
+
+
+def test_torn_last_line_is_ignored_and_rewritten(tmp_path):
+    path = tmp_path / "edit.sve"
+    project = Project.create(path, _timeline(clips=3))
+    expected = _state(project.timeline)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write('C 0 999 1029 0 {"source":"clip0.mp4","in":0,"ou')
+    reopened = Project.open(path)
+    assert _state(reopened.timeline) == expected
+    reopened.update_clip(reopened.timeline.clips[1], track=4)
+    reopened.save()
+    assert all(line.count("{") == line.count("}") for line in _lines(path))
+    assert _state(Project.open(path).timeline) == _state(reopened.timeline)
+
+
+def test_replayed_transition_records_replace_earlier_ones(tmp_path):
+    path = tmp_path / "edit.sve"
+    project = Project.create(path, _timeline(clips=2))
+    transition = project.timeline.transitions[0]
+    for stop in (40, 45, 50):
+        transition.stop = stop
+        project.touch(transition)
+        project.save()
+    reopened = Project.open(path)
+    assert [(t.start, t.stop) for t in reopened.transitions()] == [(25, 50)]
+    assert len([item for item in reopened._ids if not isinstance(item, Clip)]) == 1
+    reopened.remove_transition(reopened.timeline.transitions[0])
+    reopened.save()
+    assert Project.open(path).transitions() == []
+
+
+def test_rejects_files_that_are_not_projects(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("hello\n")
+    with pytest.raises(ProjectError):
+        Project.open(path)
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pytest
+
+from simple_video_editor import ProxyManager
+from simple_video_editor.errors import MediaError
+from simple_video_editor.keyframes import KeyframeIndex
+from simple_video_editor.media import probe_video
+
+
+def test_proxies_keep_every_frame_as_a_small_keyframe(own_clip, tmp_path):
+    ready = []
+    with ProxyManager(tmp_path / "proxies", workers=2, chunk_frames=20) as proxies:
+        assert proxies.resolve(own_clip) == str(own_clip)
+        paths = proxies.generate([own_clip, own_clip], on_ready=ready.append).wait()
+    proxy = paths[str(own_clip)]
+    assert ready == [str(own_clip)]
+    assert proxies.has_proxy(own_clip) and proxies.resolve(own_clip) == proxy
+    assert proxies.resolve(own_clip, preview=False) == str(own_clip)
+    index = KeyframeIndex.for_source(proxy)
+    assert len(index) == 48
+    assert np.array_equal(index.keyframes, np.arange(48))
+    assert probe_video(proxy).height == 120  # Never scaled up past the source.
+
+
+def test_changing_the_source_needs_a_new_proxy(own_clip, tmp_path):
+    with ProxyManager(tmp_path / "proxies", workers=1) as proxies:
+        proxies.generate([own_clip]).wait()
+        with open(own_clip, "ab") as fh:
+            fh.write(b"\0")
+        assert not proxies.has_proxy(own_clip)
+        assert proxies.resolve(own_clip) == str(own_clip)
+
+
+def test_generate_leaves_all_the_work_to_the_pool(own_clip, tmp_path, monkeypatch):
+    caller = os.getpid()
+    for_source = KeyframeIndex.for_source.__func__
+
+    def off_the_caller(cls, path, **kwargs):
+        assert os.getpid() != caller, "indexed on the calling process"
+        return for_source(cls, path, **kwargs)
+
+    monkeypatch.setattr(KeyframeIndex, "for_source", classmethod(off_the_caller))
+    ready = []
+    missing = str(tmp_path / "missing.mp4")
+    with open(missing, "wb") as fh:
+        fh.write(b"not a video")
+    with ProxyManager(tmp_path / "proxies", workers=2) as proxies:
+        job = proxies.generate([missing, own_clip], on_ready=ready.append)
+        with pytest.raises(MediaError):
+            job.wait()
+        assert job.futures[str(own_clip)].result() == proxies.proxy_path(own_clip)
+        assert ready == [str(own_clip)]  # Called before the future completed.
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from simple_video_editor import Brightness, Clip, Contrast, Crop, FadeIn, Gamma, Region, Timeline, TimelineGraph
+from simple_video_editor.effects import Effect, apply_chain, chain_region
+
+REGIONS = [Region(0, 0, 80, 60), Region(37, 11, 121, 97), Region(150, 100, 160, 120), Region(0, 0, 160, 120)]
+
+
+class Mirror(Effect):
+    """Not pointwise and without its own region support."""
+
+    def apply(self, frames, positions, length, out=None):
+        out = frames if out is None else out
+        out[...] = frames[:, :, ::-1].copy()
+        return out
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return np.random.default_rng(0).integers(0, 256, size=(3, 120, 160, 3), dtype=np.uint8)
+
+
+def test_chain_region():
+    region = Region(10, 20, 30, 40)
+    assert chain_region([Brightness(0.1), Gamma(1.2)], region, 160, 120) == region
+    assert chain_region([Mirror(), Brightness(0.1)], region, 160, 120) == Region.full(160, 120)
+    needed = chain_region([Crop(0.5, 0.5, 0.5, 0.5), Brightness(0.1)], region, 160, 120)
+    assert Region(80, 60, 160, 120).contains(needed) and needed.width < 20
+
+
+@pytest.mark.parametrize("filter", ["nearest", "bilinear", "bicubic", "lanczos"])
+@pytest.mark.parametrize("region", REGIONS)
+def test_region_of_a_chain_is_the_crop_of_the_full_render(frames, region, filter):
+    effects = [Brightness(0.05), Crop(0.2, 0.1, 0.5, 0.6, filter), Contrast(1.3), FadeIn(4), Mirror(), Gamma(0.8)]
+    positions = np.arange(3)
+    full = apply_chain(effects, frames.copy(), positions, 10)
+    batch = frames[(slice(None), *chain_region(effects, region, 160, 120).slices())].copy()
+    part = apply_chain(effects, batch, positions, 10, region=region, size=(160, 120))
+    np.testing.assert_array_equal(part, full[(slice(None), *region.slices())])
+
+
+def test_graph_regions_match_the_full_frame(clip, large_clip):
+    timeline = Timeline(160, 120, 24)
+    timeline.add(Clip(large_clip, 0, 30, effects=[Crop(0.25, 0.25, 0.5, 0.5, "bicubic"), Brightness(0.05)]))
+    timeline.add(Clip(clip, 0, 30, start=20, track=1, effects=[Contrast(1.2)]))
+    timeline.add(Clip(clip, 5, 40, track=2, box=(0.5, 0.25, 0.25, 0.5), opacity=0.6))
+    timeline.add_transition(20, 26)
+    with TimelineGraph(timeline) as graph:
+        for frame in (3, 22, 28):
+            whole = graph.frame(frame).copy()
+            for region in REGIONS:
+                np.testing.assert_array_equal(graph.frame(frame, region), whole[region.slices()])
+
+
+def test_graph_rejects_regions_outside_the_frame(clip):
+    timeline = Timeline(160, 120, 24)
+    timeline.add(Clip(clip, 0, 10))
+    with TimelineGraph(timeline) as graph:
+        with pytest.raises(ValueError):
+            graph.frame(0, Region(100, 0, 200, 50))
+        with pytest.raises(ValueError):
+            graph.frame(0, Region(10, 10, 10, 20))
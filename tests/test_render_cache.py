@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+
+from simple_video_editor import Brightness, Clip, Effect, FadeIn, RenderCache, Timeline
+from simple_video_editor.render import render_batches
+from simple_video_editor.render_cache import frame_key
+
+
+def _render(timeline, cache=None):
+    return np.concatenate([b.copy() for b in render_batches(timeline, batch_size=5, render_cache=cache)])
+
+
+def test_keys_change_with_everything_that_affects_the_output(clip):
+    a = Clip(clip, 0, 20, effects=[Brightness(0.1)])
+    keys = {
+        frame_key(a, 3, (160, 120)),
+        frame_key(a, 4, (160, 120)),
+        frame_key(a, 3, (80, 60)),
+        frame_key(a, 3, (160, 120), pixel_format="yuv420p"),
+        frame_key(a, 3, (160, 120), scale_filter="lanczos"),
+        frame_key(Clip(clip, 0, 20, effects=[Brightness(0.2)]), 3, (160, 120)),
+        frame_key(Clip(clip, 0, 21, effects=[Brightness(0.1)]), 3, (160, 120)),
+    }
+    assert len(keys) == 7 and None not in keys
+    assert frame_key(Clip(clip, 0, 20, effects=[Brightness(0.1)]), 3, (160, 120)) in keys
+
+    class Opaque(Effect):
+        def apply(self, frames, positions, length, out=None):
+            return frames
+
+    assert frame_key(Clip(clip, 0, 20, effects=[Opaque()]), 3, (160, 120)) is None
+
+
+def test_second_render_is_read_from_the_cache(clip, tmp_path):
+    timeline = Timeline(160, 120, 24)
+    timeline.add(Clip(clip, 0, 20, effects=[FadeIn(8), Brightness(0.1)]))
+    timeline.add(Clip(clip, 20, 30, start=20))
+    cache = RenderCache(tmp_path / "cache")
+    first = _render(timeline, cache)
+    assert np.array_equal(first, _render(timeline))
+    assert cache.hits == 0 and len(os.listdir(cache.directory)) > 0
+    second = _render(timeline, cache)
+    assert np.array_equal(first, second)
+    assert cache.hits == 20
+
+
+def test_prune_removes_oldest_entries_first(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    image = np.zeros((10, 10, 3), dtype=np.uint8)
+    keys = [f"{i:02x}" * 32 for i in range(4)]
+    for age, key in enumerate(keys):
+        cache.write(key, image)
+        os.utime(cache.path(key), ns=(age * 10**9, age * 10**9))
+    size = cache.nbytes() // 4
+    assert cache.prune(2 * size) == 2
+    assert [key in cache for key in keys] == [False, False, True, True]
+    out = np.empty_like(image)
+    assert cache.read(keys[3], out) and not cache.read(keys[0], out)
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from simple_video_editor.scale import FILTERS, kernel, resample, resize
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return np.random.default_rng(0).integers(0, 256, size=(2, 90, 120, 3), dtype=np.uint8)
+
+
+def _dense(k, inputs):
+    matrix = np.zeros((len(k.index), inputs))
+    for i, (index, weights) in enumerate(zip(k.index, k.weights)):
+        np.add.at(matrix[i], index, weights)
+    return matrix
+
+
+def test_kernels_are_cached_and_read_only():
+    k = kernel(1920, 640, "lanczos", (100.0, 960.0))
+    assert kernel(1920, 640, "lanczos", (100.0, 960.0)) is k
+    assert not k.weights.flags.writeable and not k.index.flags.writeable
+    with pytest.raises(ValueError):
+        k.weights[0, 0] = 1.0
+
+
+@pytest.mark.parametrize("filter", FILTERS)
+def test_kernel_weights(filter):
+    for source, target in [(120, 120), (120, 47), (47, 120)]:
+        k = kernel(source, target, filter)
+        np.testing.assert_allclose(k.weights.sum(axis=1), 1.0, rtol=1e-6)
+        assert k.index.min() >= 0 and k.index.max() < source
+        for start, stop, first, matrix in k.bands:
+            np.testing.assert_allclose(matrix, _dense(k, source)[start:stop, first : first + matrix.shape[1]])
+
+
+@pytest.mark.parametrize("filter", FILTERS)
+def test_same_size_is_identity(frames, filter):
+    np.testing.assert_array_equal(resize(frames, 120, 90, filter), frames)
+
+
+@pytest.mark.parametrize("filter", FILTERS)
+def test_resample_matches_dense_weights(frames, filter):
+    rows, columns = kernel(90, 37, filter), kernel(120, 203, filter)
+    down = np.einsum("ij,njkc->nikc", _dense(rows, 90), frames.astype(np.float64))
+    expected = np.einsum("nikc,lk->nilc", down, _dense(columns, 120))
+    result = resize(frames.astype(np.float32) / 255, 203, 37, filter)
+    np.testing.assert_allclose(result, np.clip(expected / 255, 0, 1), atol=1e-5)
+
+
+def test_downscaling_averages_every_input_pixel():
+    checker = np.indices((64, 64)).sum(axis=0) % 2 * 255
+    image = np.repeat(checker[..., None], 3, axis=2).astype(np.uint8)
+    for filter in ("bilinear", "bicubic", "lanczos"):
+        assert np.abs(resize(image, 16, 16, filter)[2:-2, 2:-2].astype(int) - 128).max() <= 1
+
+
+@pytest.mark.parametrize("filter", FILTERS)
+def test_crop_reads_only_the_window(frames, filter):
+    image = frames[0].astype(np.float32) / 255
+    x, y, w, h = 40, 30, 48, 36
+    rows, columns = kernel(90, 72, filter, (y, h)), kernel(120, 96, filter, (x, w))
+    (top, bottom), (left, right) = rows.span(), columns.span()
+    poisoned = np.full_like(image, np.nan)
+    poisoned[top:bottom, left:right] = image[top:bottom, left:right]
+    cropped = resize(poisoned, 96, 72, filter, crop=(x, y, w, h))
+    assert not np.isnan(cropped).any()
+    np.testing.assert_array_equal(cropped, resize(image, 96, 72, filter, crop=(x, y, w, h)))
+    # Away from the window edges (where a crop still reads its neighbours), it is a resize of the slice.
+    sliced = resize(image[y : y + h, x : x + w], 96, 72, filter)
+    np.testing.assert_allclose(cropped[8:-8, 8:-8], sliced[8:-8, 8:-8], atol=1e-6)
+    if filter == "nearest":
+        np.testing.assert_array_equal(cropped, sliced)
+
+
+@pytest.mark.parametrize("filter", FILTERS)
+def test_output_ranges_match_the_full_kernel(frames, filter):
+    full = resize(frames, 200, 150, filter)
+    rows = kernel(90, 150, filter, outputs=(40, 77))
+    columns = kernel(120, 200, filter, outputs=(13, 200))
+    (top, bottom), (left, right) = rows.span(), columns.span()
+    part = resample(frames[:, top:bottom, left:right], rows, columns)
+    np.testing.assert_array_equal(part, full[:, 40:77, 13:200])
+
+
+def test_invalid_arguments(frames):
+    with pytest.raises(ValueError):
+        kernel(120, 60, "area")
+    with pytest.raises(ValueError):
+        kernel(120, 60, window=(100.0, 40.0))
+    with pytest.raises(ValueError):
+        kernel(120, 60, outputs=(50, 61))
+    with pytest.raises(ValueError):
+        resize(frames, 60, 45, out=np.empty((2, 45, 61, 3), dtype=np.uint8))
+    with pytest.raises(TypeError):
+        resize(frames.astype(np.int16), 60, 45)
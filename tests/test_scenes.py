@@ -0,0 +1,74 @@
+import os
+
+import av
+import numpy as np
+import pytest
+
+import simple_video_editor.scenes as scenes
+from simple_video_editor import detect_scenes
+from simple_video_editor.scenes import HISTOGRAM_BINS, SceneScores, histograms, sidecar_path
+
+
+@pytest.fixture
+def shots(tmp_path):
+    """36 frames in three solid-colour shots of 12 frames each."""
+    path = str(tmp_path / "shots.mp4")
+    with av.open(path, "w") as output:
+        stream = output.add_stream("libx264", rate=24)
+        stream.width, stream.height, stream.pix_fmt = 160, 120, "yuv420p"
+        for i in range(36):
+            image = np.zeros((120, 160, 3), dtype=np.uint8)
+            image[..., i // 12] = 200
+            frame = av.VideoFrame.from_ndarray(image, format="rgb24")
+            frame.pts = i
+            output.mux(stream.encode(frame))
+        output.mux(stream.encode())
+    return path
+
+
+def test_histograms():
+    frames = np.zeros((2, 4, 4, 3), dtype=np.uint8)
+    frames[1, :2] = (255, 0, 0)
+    h = histograms(frames)
+    assert h.shape == (2, HISTOGRAM_BINS)
+    np.testing.assert_allclose(h.sum(axis=1), 1.0)
+    assert h[0, 0] == 1.0
+    assert h[1, 0] == h[1, 7 << 6] == 0.5
+
+
+def test_cuts_and_scenes():
+    scores = SceneScores(np.array([0, 0.1, 0.9, 0, 0.5, 0, 0, 0.6, 0, 0], dtype=np.float32))
+    assert scores.cuts(0.4, min_scene_frames=1) == [2, 4, 7]
+    assert scores.cuts(0.4, min_scene_frames=3) == [4, 7]
+    assert scores.scenes(0.4, min_scene_frames=3) == [(0, 4), (4, 7), (7, 10)]
+    assert scores.scenes(0.95) == [(0, 10)]
+
+
+def test_detects_hard_cuts(shots):
+    assert detect_scenes(shots, workers=1, min_scene_frames=6) == [(0, 12), (12, 24), (24, 36)]
+    assert os.path.exists(sidecar_path(shots))
+
+
+def test_chunks_and_workers_do_not_change_scores(clip):
+    whole = SceneScores.build(clip, workers=1, chunk_frames=1000).scores
+    assert len(whole) == 48 and whole[0] == 0
+    np.testing.assert_array_equal(SceneScores.build(clip, workers=1, chunk_frames=1).scores, whole)
+    np.testing.assert_array_equal(SceneScores.build(clip, workers=2, chunk_frames=1).scores, whole)
+
+
+def test_chunks_without_frames_are_skipped(clip, monkeypatch):
+    scores, first, last = scenes._analyse_chunk(clip, 48, 60)
+    assert scores.size == first.size == last.size == 0
+    whole = SceneScores.build(clip, workers=1, chunk_frames=1000).scores
+    monkeypatch.setattr(scenes, "_chunks", lambda index, chunk_frames: [(48, 60), (0, 24), (48, 60), (24, 48)])
+    np.testing.assert_array_equal(SceneScores.build(clip, workers=1).scores, whole)
+
+
+def test_scores_are_reused_from_the_sidecar(own_clip):
+    built = SceneScores.for_source(own_clip, workers=1)
+    loaded = SceneScores.load(own_clip)
+    assert loaded is not None
+    np.testing.assert_array_equal(loaded.scores, built.scores)
+    with open(own_clip, "ab") as fh:
+        fh.write(b"\0")
+    assert SceneScores.load(own_clip) is None
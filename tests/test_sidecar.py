@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pytest
+
+from simple_video_editor.keyframes import KeyframeIndex
+from simple_video_editor.peaks import PeakSummary, data_path
+from simple_video_editor.scenes import SceneScores
+from simple_video_editor.sidecar import Sidecar, load_or_build
+
+
+def _touch(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_sidecar_is_ignored_once_the_media_or_parameters_change(tmp_path):
+    media = tmp_path / "media.bin"
+    media.write_bytes(b"frames")
+    sidecar = Sidecar(".test.npz", version=1, params=(64, 36))
+    sidecar.save(media, values=np.arange(3))
+    assert sidecar.path(media) == f"{media}.test.npz"
+    assert sidecar.load(media, lambda data: data["values"].tolist()) == [0, 1, 2]
+    assert Sidecar(".test.npz", version=2, params=(64, 36)).load(media, dict) is None
+    assert Sidecar(".test.npz", version=1, params=(32, 18)).load(media, dict) is None
+    assert sidecar.load(media, lambda data: data["missing"]) is None
+    _touch(media)
+    assert sidecar.load(media, dict) is None
+
+
+def test_load_or_build_saves_only_what_it_builds():
+    saved = []
+    assert load_or_build(lambda: "cached", lambda: "built", saved.append) == "cached"
+    assert load_or_build(lambda: None, lambda: "built", saved.append) == "built"
+    assert load_or_build(lambda: None, lambda: "built", saved.append, persist=False) == "built"
+    assert saved == ["built"]
+
+
+@pytest.mark.parametrize(
+    "load, for_source, fields",
+    [
+        (KeyframeIndex.load, KeyframeIndex.for_source, ("pts", "keyframes")),
+        (SceneScores.load, lambda path: SceneScores.for_source(path, workers=1), ("scores",)),
+    ],
+)
+def test_video_sidecars_round_trip_and_are_rebuilt_after_changes(own_clip, load, for_source, fields):
+    assert load(own_clip) is None
+    built = for_source(own_clip)
+    loaded = load(own_clip)
+    for name in fields:
+        assert np.array_equal(getattr(loaded, name), getattr(built, name))
+    _touch(own_clip)
+    assert load(own_clip) is None
+    for_source(own_clip)
+    assert load(own_clip) is not None
+
+
+def test_peak_sidecar_round_trips(own_tone):
+    assert PeakSummary.load(own_tone) is None
+    built = PeakSummary.for_source(own_tone)
+    loaded = PeakSummary.load(own_tone)
+    assert [(s.sample_rate, s.samples) for s in loaded] == [(s.sample_rate, s.samples) for s in built]
+    assert all(np.array_equal(a, b) for s, t in zip(loaded, built) for a, b in zip(s.levels, t.levels))
+    assert all(isinstance(peaks, np.memmap) for s in loaded for peaks in s.levels)
+    with open(data_path(own_tone), "r+b") as fh:
+        fh.truncate(10)
+    assert PeakSummary.load(own_tone) is None
+    _touch(own_tone)
+    assert PeakSummary.load(own_tone) is None
@@ -0,0 +1,89 @@
+import os
+import threading
+
+import numpy as np
+
+from simple_video_editor import thumbnails
+from simple_video_editor.keyframes import KeyframeIndex
+from simple_video_editor.thumbnails import ThumbnailCache
+
+
+def test_thumbnails_are_keyframes_scaled_to_height(own_clip, tmp_path):
+    with ThumbnailCache(tmp_path / "thumbs", height=30, sheet_tiles=2) as thumbs:
+        assert thumbs.thumbnail(own_clip, 0) is None
+        thumbs.request(own_clip)
+        thumbs.wait()
+        keyframes = KeyframeIndex.for_source(own_clip).keyframes
+        assert np.array_equal(thumbs.frames(own_clip), keyframes)
+        assert thumbs.sheet_count(own_clip) == -(-len(keyframes) // 2)
+        image = thumbs.thumbnail(own_clip, int(keyframes[-1]))
+        assert image.shape == (30, 40, 3)
+        assert image.any()
+
+
+def test_lookups_are_memoised_until_the_source_changes(own_clip, tmp_path, monkeypatch):
+    with ThumbnailCache(tmp_path / "thumbs", height=30) as thumbs:
+        thumbs.request(own_clip)
+        thumbs.wait()
+        probes = []
+        probe_video = thumbnails.probe_video
+        monkeypatch.setattr(thumbnails, "probe_video", lambda path: probes.append(path) or probe_video(path))
+        loads = []
+        load = thumbnails._load_sheet
+        monkeypatch.setattr(thumbnails, "_load_sheet", lambda path: loads.append(path) or load(path))
+
+        first = thumbs.thumbnail(own_clip, 0)
+        for frame in range(48):
+            assert thumbs.thumbnail(own_clip, frame) is not None
+        assert probes == [] and len(loads) <= 1
+
+        st = os.stat(own_clip)
+        os.utime(own_clip, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert thumbs.thumbnail(own_clip, 0) is None  # A new version of the source has no sheets yet.
+        assert len(probes) == 1
+        thumbs.wait()
+        assert np.array_equal(thumbs.thumbnail(own_clip, 0), first)
+
+
+def test_on_ready_errors_are_reported_and_do_not_stop_the_workers(own_clip, tmp_path):
+    ready = []
+
+    def on_ready(source, sheet):
+        ready.append(sheet)
+        if sheet == 0:
+            raise RuntimeError("redraw failed")
+
+    with ThumbnailCache(tmp_path / "thumbs", height=30, sheet_tiles=1, on_ready=on_ready) as thumbs:
+        thumbs.request(own_clip)
+        try:
+            thumbs.wait()
+        except RuntimeError as exc:
+            assert str(exc) == "redraw failed"
+        else:
+            raise AssertionError("on_ready error was not reported")
+        thumbs.wait()
+        assert sorted(ready) == list(range(thumbs.sheet_count(own_clip)))
+
+
+def test_sources_are_resolved_outside_the_worker_lock(own_clip, tmp_path):
+    held = []
+
+    def lock_is_free():
+        if thumbs._lock.acquire(timeout=0):
+            thumbs._lock.release()
+            return True
+        return False
+
+    with ThumbnailCache(tmp_path / "thumbs", height=30, workers=0) as thumbs:
+        resolve = thumbs._source
+
+        def source(path):
+            checker = threading.Thread(target=lambda: held.append(not lock_is_free()))
+            checker.start()
+            checker.join()
+            return resolve(path)
+
+        thumbs._source = source
+        thumbs.request(own_clip)
+        assert held and not any(held)
+        assert len(thumbs._queue) == thumbs.sheet_count(own_clip)
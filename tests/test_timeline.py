@@ -0,0 +1,92 @@
+import pickle
+import random
+
+from simple_video_editor import Clip, Timeline
+from simple_video_editor.intervals import IntervalTree
+from simple_video_editor.timeline import Transition
+
+
+def _brute(timeline, start, stop):
+    hits = [c for c in timeline.clips if c.start < stop and start < c.end]
+    return sorted(hits, key=lambda c: (c.track, timeline.clips.index(c)))
+
+
+def _check(timeline):
+    for start in range(0, timeline.duration + 5, 7):
+        assert timeline.overlapping(start, start + 9) == _brute(timeline, start, start + 9)
+        assert timeline.active(start) == _brute(timeline, start, start + 1)
+
+
+def _clip(start, length, track=0):
+    return Clip("a.mp4", 0, length, start=start, track=track)
+
+
+def test_interval_tree_matches_brute_force_after_random_edits():
+    rng = random.Random(0)
+    tree, spans = IntervalTree(), {}
+    for step in range(2000):
+        if spans and rng.random() < 0.4:
+            item = rng.choice(sorted(spans))
+            if rng.random() < 0.5:
+                tree.remove(item)
+                del spans[item]
+            else:
+                start = rng.randrange(1000)
+                spans[item] = (start, start + rng.randrange(1, 50))
+                tree.move(item, *spans[item])
+        else:
+            start = rng.randrange(1000)
+            spans[step] = (start, start + rng.randrange(1, 50))
+            tree.add(step, *spans[step])
+        if step % 100 == 0:
+            assert len(tree) == len(spans)
+            for lo in range(0, 1050, 37):
+                hits = {i for i, (a, b) in spans.items() if a < lo + 20 and lo < b}
+                assert set(tree.overlapping(lo, lo + 20)) == hits
+                assert set(tree.at(lo)) == {i for i, (a, b) in spans.items() if a <= lo < b}
+
+
+def test_index_follows_timeline_edits_and_moved():
+    timeline = Timeline(160, 120, 24)
+    clips = [timeline.add(_clip(10 * i, 15, track=i % 3)) for i in range(30)]
+    _check(timeline)
+    timeline.remove(clips[4])
+    clips[7].start += 100
+    timeline.moved(clips[7])
+    transition = timeline.add_transition(20, 30)
+    assert timeline.transition_at(25) is transition
+    transition.start = 40
+    transition.stop = 50
+    timeline.moved(transition)
+    assert timeline.transition_at(25) is None and timeline.transition_at(45) is transition
+    _check(timeline)
+
+
+def test_index_follows_direct_list_changes():
+    timeline = Timeline(160, 120, 24)
+    for i in range(10):
+        timeline.add(_clip(10 * i, 10))
+    _check(timeline)
+    timeline.clips[3] = _clip(500, 10)  # Same length, same last clip.
+    _check(timeline)
+    timeline.clips[0], timeline.clips[1] = timeline.clips[1], timeline.clips[0]
+    _check(timeline)
+    timeline.clips.append(_clip(5, 10, track=1))
+    del timeline.clips[2]
+    _check(timeline)
+    timeline.clips.sort(key=lambda c: -c.start)
+    _check(timeline)
+    timeline.clips = [_clip(0, 30), _clip(10, 5, track=2)]
+    _check(timeline)
+    assert timeline.transition_at(4) is None
+    timeline.transitions.append(Transition(2, 8))
+    assert timeline.transition_at(4) is timeline.transitions[0]
+
+
+def test_timeline_pickles_with_its_index():
+    timeline = Timeline(160, 120, 24, [_clip(0, 10), _clip(5, 10, track=1)])
+    _check(timeline)
+    copy = pickle.loads(pickle.dumps(timeline))
+    assert [(c.start, c.end) for c in copy.active(6)] == [(0, 10), (5, 15)]
+    copy.clips[0] = _clip(100, 10)
+    assert [(c.start, c.end) for c in copy.active(6)] == [(5, 15)]
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from simple_video_editor import Brightness, Clip, FadeIn, FrameDecoder, Gamma, Timeline
+from simple_video_editor.effects import apply_chain, fade_planar
+from simple_video_editor.render import render_batches
+from simple_video_editor.yuv import RGB24, YUV420P, convert, fill_black, frame_shape, frame_size, planes
+
+
+@pytest.fixture(scope="module")
+def yuv(clip):
+    with FrameDecoder(clip, pixel_format=YUV420P, stop=4) as decoder:
+        return np.stack([frame.image.copy() for frame in decoder])
+
+
+def test_frame_layout():
+    assert frame_shape(160, 120, YUV420P) == (180, 160)
+    assert frame_shape(160, 120) == (120, 160, 3)
+    assert frame_size(np.empty((2, 180, 160)), YUV420P) == (160, 120)
+    with pytest.raises(ValueError):
+        frame_shape(161, 120, YUV420P)
+    frames = np.zeros((2, 180, 160), dtype=np.uint8)
+    y, u, v = planes(frames)
+    assert y.shape == (2, 120, 160) and u.shape == v.shape == (2, 60, 80)
+    u[1, 59, 79] = 7
+    v[0, 0, 0] = 9
+    assert frames[1, 149, 159] == 7 and frames[0, 150, 0] == 9
+    fill_black(frames)
+    assert (y == 16).all() and (u == 128).all() and (v == 128).all()
+
+
+def test_convert_round_trip(yuv):
+    rgb = convert(yuv, YUV420P, RGB24)
+    assert rgb.shape == (4, 120, 160, 3)
+    back = convert(rgb, RGB24, YUV420P)
+    assert np.abs(back.astype(int) - yuv).max() <= 2
+    assert convert(yuv, YUV420P, YUV420P) is yuv
+
+
+def test_decoder_yuv_matches_rgb(clip, yuv):
+    with FrameDecoder(clip, stop=4) as decoder:
+        rgb = np.stack([frame.image.copy() for frame in decoder])
+    np.testing.assert_array_equal(convert(yuv, YUV420P, RGB24), rgb)
+
+
+def test_fade_planar(yuv):
+    black = fade_planar(yuv, 0.0)
+    assert (planes(black).y == 16).all() and (black[:, 120:] == 128).all()
+    np.testing.assert_array_equal(fade_planar(yuv, 1.0), yuv)
+    half = fade_planar(yuv, 0.5)
+    np.testing.assert_array_equal(half[:, :120], np.rint(16 + (yuv[:, :120] - 16.0) * 0.5).astype(np.uint8))
+    with pytest.raises(ValueError):
+        fade_planar(np.zeros((1, 4, 4, 3), dtype=np.uint8), 0.5)
+
+
+def test_chain_converts_only_for_rgb_effects(yuv):
+    positions = np.arange(4)
+    frames = apply_chain([FadeIn(8), Gamma(1.4), Brightness(0.1)], yuv.copy(), positions, 20, pixel_format=YUV420P)
+    faded = fade_planar(yuv, (positions + 1) / 9)
+    rgb = convert(faded, YUV420P, RGB24)
+    apply_chain([Gamma(1.4), Brightness(0.1)], rgb, positions, 20)
+    np.testing.assert_array_equal(frames, convert(rgb, RGB24, YUV420P))
+
+
+def test_render_batches_in_yuv(clip, yuv):
+    timeline = Timeline(160, 120, 24)
+    timeline.add(Clip(clip, 0, 4, start=2))
+    batches = [batch.copy() for batch in render_batches(timeline, pixel_format=YUV420P, batch_size=3)]
+    frames = np.concatenate(batches)
+    assert frames.shape == (6, 180, 160)
+    assert (planes(frames[:2]).y == 16).all() and (frames[:2, 120:] == 128).all()
+    np.testing.assert_array_equal(frames[2:], yuv)